@@ -36,6 +36,7 @@ export const ProductCard = ({ product }: ProductCardProps) => {
   const subTextColor = useColorModeValue('gray.600', 'gray.400');
   const borderColor = useColorModeValue('gray.200', 'gray.700');
   const hoverBg = useColorModeValue('gray.50', 'gray.700');
+  const primarySrcset = product.primary_image_srcset || product.images?.[0]?.srcset;
 
   const handleWishlistClick = async (e: React.MouseEvent) => {
     e.preventDefault(); // Prevent navigation to product detail
@@ -128,7 +129,9 @@ export const ProductCard = ({ product }: ProductCardProps) => {
       {/* Image Container */}
       <Box position="relative" paddingTop="100%" overflow="hidden">
         <Image
-          src={product.images[0]?.image || '/placeholder.jpg'}
+          src={product.primary_image || product.images?.[0]?.image || '/placeholder.jpg'}
+          srcSet={primarySrcset?.webp || primarySrcset?.jpeg}
+          sizes="(min-width: 62em) 25vw, (min-width: 48em) 33vw, 50vw"
           alt={product.name}
           position="absolute"
           top={0}
@@ -184,6 +184,8 @@ export const ProductDetailsPage = () => {
         <Box>
           <Image
             src={product.images?.[0]?.image || '/placeholder-image.jpg'}
+            srcSet={product.images?.[0]?.srcset?.webp || product.images?.[0]?.srcset?.jpeg}
+            sizes="(min-width: 48em) 50vw, 100vw"
             alt={product.name}
             borderRadius="lg"
             objectFit="cover"
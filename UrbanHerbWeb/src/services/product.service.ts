@@ -20,7 +20,7 @@ export class ProductService {
           const apiKey = {
             minPrice: 'price_min',
             maxPrice: 'price_max',
-            minRating: 'rating_min',
+            minRating: 'min_rating',
             inStock: 'in_stock',
             sortBy: 'sort',
             searchQuery: 'search'
@@ -300,9 +300,12 @@ export class ProductService {
   static async getProductReviews(slug: string) {
     console.log('ProductService: Getting reviews for product', slug);
     try {
-      const response = await api.get(`/api/v1/products/${slug}/reviews/`);
+      const response = await api.get(`/api/v1/products/${slug}/reviews/`, {
+        params: { page_size: 50 }
+      });
       console.log('ProductService: Got reviews:', response.data);
-      return response.data;
+      // Reviews are cursor-paginated, newest first
+      return response.data.results;
     } catch (error) {
       console.error('ProductService: Error getting reviews:', error);
       throw error;
@@ -10,6 +10,11 @@ export interface ProductImage {
   image: string;
   alt_text?: string;
   is_primary: boolean;
+  width?: number | null;
+  height?: number | null;
+  blurhash?: string;
+  // Variant format -> "url 320w, url 640w, ..."; empty until the image is processed
+  srcset?: { webp?: string; jpeg?: string };
 }
 
 export interface ProductReview {
@@ -54,9 +59,13 @@ export interface Product {
   featured: boolean;
   average_rating: number;
   review_count: number;
+  rating_distribution?: Record<1 | 2 | 3 | 4 | 5, number>;
   usage_instructions?: string;
   warning?: string;
   images: ProductImage[];
+  // List and card responses carry only the primary image
+  primary_image?: string | null;
+  primary_image_srcset?: ProductImage['srcset'];
   effects: ProductEffect[];
   brand?: ProductBrand;
 }
@@ -3,11 +3,25 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
+from django.views.decorators.http import condition
+import hashlib
 
 User = get_user_model()
 
+def profile_etag(request):
+    """ETag over the profile fields of the already-authenticated user (no queries)."""
+    user = request.user
+    values = [
+        user.id, user.email, user.first_name, user.last_name,
+        user.date_joined, user.last_login, getattr(user, 'is_email_verified', None),
+    ]
+    return hashlib.md5(repr(values).encode()).hexdigest()
+
+# ETag only: no User column changes on every profile edit, so a Last-Modified
+# date could answer If-Modified-Since with 304 for an edited profile
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@condition(etag_func=profile_etag)
 def get_user_profile(request):
     """Get the current user's profile"""
     user = request.user
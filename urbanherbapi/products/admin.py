@@ -1,10 +1,13 @@
+from django import forms
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Product, Brand, ProductImage, Review, Cart, CartItem, Wishlist
+from .models import Product, Brand, ProductImage, Review, Cart, CartItem, Wishlist, InventoryMovement
+from .stock import append_movement, available_stock, with_available_stock
 
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 1
+    readonly_fields = ['width', 'height', 'processing_status']
 
 class ReviewInline(admin.TabularInline):
     model = Review
@@ -27,11 +30,58 @@ class BrandAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'brand', 'price', 'stock', 'rating', 'created_at']
+    list_display = ['name', 'category', 'brand', 'price', 'available_stock', 'rating', 'created_at']
     list_filter = ['category', 'brand', 'lab_tested', 'featured']
     search_fields = ['name', 'description', 'brand__name']
     inlines = [ProductImageInline, ReviewInline]
-    readonly_fields = ['rating', 'review_count']
+    readonly_fields = [
+        'rating', 'rating_total', 'review_count', 'rating_1_count', 'rating_2_count',
+        'rating_3_count', 'rating_4_count', 'rating_5_count',
+        'thc_value', 'thc_unit', 'cbd_value', 'cbd_unit'
+    ]
+
+    def get_queryset(self, request):
+        return with_available_stock(super().get_queryset(request))
+
+    def get_readonly_fields(self, request, obj=None):
+        # Once a product exists its stock only changes through inventory movements
+        if obj is not None:
+            return [*self.readonly_fields, 'stock']
+        return self.readonly_fields
+
+    @admin.display(ordering='available_stock')
+    def available_stock(self, obj):
+        return obj.available_stock
+
+class InventoryMovementForm(forms.ModelForm):
+    class Meta:
+        model = InventoryMovement
+        fields = ['product', 'kind', 'quantity', 'note']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        product, quantity = cleaned_data.get('product'), cleaned_data.get('quantity')
+        if product and quantity is not None and available_stock(product.pk) + quantity < 0:
+            raise forms.ValidationError('Not enough stock available')
+        return cleaned_data
+
+@admin.register(InventoryMovement)
+class InventoryMovementAdmin(admin.ModelAdmin):
+    form = InventoryMovementForm
+    list_display = ['product', 'kind', 'quantity', 'note', 'created_at', 'compacted_at']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['product__name', 'note']
+    raw_id_fields = ['product']
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        # The same checked append checkouts use
+        append_movement(obj)
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import reinstall_sqlite_search_index
+
+        post_migrate.connect(reinstall_sqlite_search_index, sender=self, dispatch_uid='products_search_index')
@@ -0,0 +1,82 @@
+"""BlurHash encoder (https://blurha.sh) for image placeholders.
+
+Pure Python, so it is meant to run on a small thumbnail (32x32 is plenty):
+the cost is pixels x components.
+"""
+import math
+
+BASE83_CHARACTERS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def encode_base83(value, length):
+    return ''.join(
+        BASE83_CHARACTERS[value // 83 ** (length - position) % 83]
+        for position in range(1, length + 1)
+    )
+
+
+def srgb_to_linear(value):
+    value = value / 255
+    if value <= 0.04045:
+        return value / 12.92
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def encode_blurhash(pixels, width, height, x_components=4, y_components=3):
+    """Encode row-major (r, g, b) pixels into a BlurHash string."""
+    if not 1 <= x_components <= 9 or not 1 <= y_components <= 9:
+        raise ValueError('BlurHash components must be between 1 and 9')
+
+    linear = [(srgb_to_linear(r), srgb_to_linear(g), srgb_to_linear(b)) for r, g, b in pixels]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[i][x] * cos_y[j][y]
+                    pr, pg, pb = linear[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    blurhash = encode_base83((x_components - 1) + (y_components - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(component) for factor in ac for component in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        blurhash += encode_base83(quantised_max, 1)
+    else:
+        max_value = 1
+        blurhash += encode_base83(0, 1)
+
+    dc_value = (linear_to_srgb(dc[0]) << 16) + (linear_to_srgb(dc[1]) << 8) + linear_to_srgb(dc[2])
+    blurhash += encode_base83(dc_value, 4)
+
+    for factor in ac:
+        r, g, b = (
+            max(0, min(18, int(math.floor(sign_pow(component / max_value, 0.5) * 9 + 9.5))))
+            for component in factor
+        )
+        blurhash += encode_base83(r * 19 * 19 + g * 19 + b, 2)
+    return blurhash
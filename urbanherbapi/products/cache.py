@@ -0,0 +1,113 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Brand, Product
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_MODIFIED_KEY = 'catalog:modified'
+
+
+def seed_catalog_version():
+    """Where a missing version counter starts: the time in microseconds.
+
+    A counter lost to eviction or a cache restart must not count back up
+    through versions it already handed out, or clients holding their ETags
+    would get 304s for a newer catalog. Restarting from the clock moves past
+    all of them; the last catalog write (Max(updated_at)) is the floor in
+    case this server's clock is behind the one that served those versions.
+    """
+    return int(max(timezone.now(), get_catalog_last_modified()).timestamp() * 1_000_000)
+
+
+def get_catalog_version():
+    """Return the current catalog version, seeding the counter if it is missing."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, seed_catalog_version(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Move every catalog cache entry to a new version once the current transaction commits.
+
+    Entries are keyed by version, so old ones are never read again and simply
+    expire; nothing has to be scanned or deleted.
+    """
+    transaction.on_commit(_incr_catalog_version)
+
+
+def _incr_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Evicted: a fresh seed is already past every version handed out
+        cache.add(CATALOG_VERSION_KEY, seed_catalog_version(), timeout=None)
+    cache.set(CATALOG_MODIFIED_KEY, timezone.now(), timeout=None)
+
+
+def get_catalog_last_modified():
+    """Return when the catalog last changed, seeding the cache from updated_at maxima."""
+    modified = cache.get(CATALOG_MODIFIED_KEY)
+    if modified is None:
+        candidates = [
+            Product.objects.aggregate(modified=Max('updated_at'))['modified'],
+            Brand.objects.aggregate(modified=Max('updated_at'))['modified'],
+        ]
+        modified = max((value for value in candidates if value), default=None) or timezone.now()
+        cache.add(CATALOG_MODIFIED_KEY, modified, timeout=None)
+    return modified
+
+
+def catalog_cache_key(prefix, *parts):
+    return ':'.join(['catalog', prefix, str(get_catalog_version()), *map(str, parts)])
+
+
+def catalog_cached(view_method):
+    """Cache a read-only catalog action's response data under the catalog version.
+
+    The key covers the absolute URL (path, query string and host, since
+    pagination links are absolute) and the current catalog version, so a
+    catalog write makes every cached response unreachable at once.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return view_method(self, request, *args, **kwargs)
+
+        url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        cache_key = catalog_cache_key('response', url_hash)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, settings.CACHE_TTL)
+        return response
+    return wrapper
+
+
+def catalog_etag(request, *args, **kwargs):
+    # The same URL always renders the same body for a given catalog version
+    return hashlib.md5(f'{get_catalog_version()}:{request.build_absolute_uri()}'.encode()).hexdigest()
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return get_catalog_last_modified()
+
+
+# Answers If-None-Match / If-Modified-Since with 304 before the view runs
+catalog_conditional = method_decorator(
+    condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
+)
@@ -0,0 +1,367 @@
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from .cache import catalog_cache_key
+from .models import Cart, CartItem, Product, cart_line_subtotal
+from .serializers import ProductCardSerializer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Batch cart operations (cart/batch/)
+CART_ADD = 'add'
+CART_REMOVE = 'remove'
+CART_SET = 'set'
+
+# Users whose Redis cart has changes not yet written to Cart/CartItem
+DIRTY_CARTS_KEY = 'carts:dirty'
+FLUSH_BATCH_SIZE = 200
+
+# Every script gets KEYS = [cart hash, dirty set] and ARGV = [now, ttl, user id, ...].
+# The cart hash holds 'cart' (Cart pk), 'created', 'updated', 'seq' and, per
+# product, 'q:<id>' (quantity) and 'o:<id>' (position, so items keep their order).
+# -1 means the cart is not in Redis yet and has to be loaded from the database.
+_REQUIRE_LOADED = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -1 end
+"""
+_TOUCH = """
+redis.call('HSET', KEYS[1], 'updated', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[3])
+return redis.call('HGETALL', KEYS[1])
+"""
+CART_SCRIPTS = {
+    'read': _REQUIRE_LOADED + """
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return redis.call('HGETALL', KEYS[1])
+""",
+    'add': _REQUIRE_LOADED + """
+local field = 'q:' .. ARGV[4]
+if redis.call('HEXISTS', KEYS[1], field) == 0 then
+    redis.call('HSET', KEYS[1], 'o:' .. ARGV[4], redis.call('HINCRBY', KEYS[1], 'seq', 1))
+end
+redis.call('HINCRBY', KEYS[1], field, ARGV[5])
+""" + _TOUCH,
+    'remove': _REQUIRE_LOADED + """
+redis.call('HDEL', KEYS[1], 'q:' .. ARGV[4], 'o:' .. ARGV[4])
+""" + _TOUCH,
+    # -2: the product is not in the cart
+    'set_quantity': _REQUIRE_LOADED + """
+if redis.call('HEXISTS', KEYS[1], 'q:' .. ARGV[4]) == 0 then return -2 end
+redis.call('HSET', KEYS[1], 'q:' .. ARGV[4], ARGV[5])
+""" + _TOUCH,
+    'clear': _REQUIRE_LOADED + """
+for _, field in ipairs(redis.call('HKEYS', KEYS[1])) do
+    local prefix = string.sub(field, 1, 2)
+    if prefix == 'q:' or prefix == 'o:' then
+        redis.call('HDEL', KEYS[1], field)
+    end
+end
+""" + _TOUCH,
+    # ARGV[4:] = op, product id, quantity, ... (quantity is ignored for remove)
+    'batch': _REQUIRE_LOADED + """
+for i = 4, #ARGV, 3 do
+    local field = 'q:' .. ARGV[i + 1]
+    if ARGV[i] == 'remove' then
+        redis.call('HDEL', KEYS[1], field, 'o:' .. ARGV[i + 1])
+    else
+        if redis.call('HEXISTS', KEYS[1], field) == 0 then
+            redis.call('HSET', KEYS[1], 'o:' .. ARGV[i + 1], redis.call('HINCRBY', KEYS[1], 'seq', 1))
+        end
+        if ARGV[i] == 'add' then
+            redis.call('HINCRBY', KEYS[1], field, ARGV[i + 2])
+        else
+            redis.call('HSET', KEYS[1], field, ARGV[i + 2])
+        end
+    end
+end
+""" + _TOUCH,
+    # ARGV = [ttl, field, value, ...]; a concurrent load or mutation wins
+    'load': """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+""",
+}
+
+
+class CartNotFound(Exception):
+    pass
+
+
+class CartItemNotFound(Exception):
+    pass
+
+
+class CartState:
+    """A cart as held in Redis: its ids, timestamps and product id -> quantity in the order added."""
+    def __init__(self, user_id, fields):
+        self.user_id = user_id
+        self.cart_id = int(fields['cart'])
+        self.created_at = parse_datetime(fields['created'])
+        self.updated_at = parse_datetime(fields['updated'])
+        positions = {int(name[2:]): int(value) for name, value in fields.items() if name.startswith('o:')}
+        quantities = {int(name[2:]): int(value) for name, value in fields.items() if name.startswith('q:')}
+        self.quantities = dict(sorted(quantities.items(), key=lambda item: positions.get(item[0], 0)))
+
+
+def cart_fields(cart):
+    """Redis hash fields for a database cart."""
+    fields = {
+        'cart': cart.pk,
+        'created': cart.created_at.isoformat(),
+        'updated': cart.updated_at.isoformat(),
+    }
+    position = 0
+    for product_id, quantity in cart.items.order_by('id').values_list('product_id', 'quantity'):
+        if f'q:{product_id}' not in fields:
+            position += 1
+            fields[f'o:{product_id}'] = position
+        fields[f'q:{product_id}'] = fields.get(f'q:{product_id}', 0) + quantity
+    fields['seq'] = position
+    return fields
+
+
+def sync_cart_items(cart, items, quantities, updated_at):
+    """Make the cart's CartItem rows (`items`, already loaded) match product id -> quantity, in bulk."""
+    existing = {}
+    stale = []
+    for item in items:
+        # Duplicate rows for one product are folded into the first
+        if item.product_id in existing or item.product_id not in quantities:
+            stale.append(item.pk)
+        else:
+            existing[item.product_id] = item
+    CartItem.objects.filter(pk__in=stale).delete()
+
+    changed = []
+    for product_id, item in existing.items():
+        if item.quantity != quantities[product_id]:
+            item.quantity = quantities[product_id]
+            item.updated_at = updated_at
+            changed.append(item)
+    CartItem.objects.bulk_update(changed, ['quantity', 'updated_at'])
+
+    added = [product_id for product_id in quantities if product_id not in existing]
+    # Products deleted since they were added are dropped, as the FK cascade would have
+    live = set(Product.objects.filter(pk__in=added).values_list('pk', flat=True))
+    CartItem.objects.bulk_create([
+        CartItem(cart=cart, product_id=product_id, quantity=quantities[product_id])
+        for product_id in added
+        if product_id in live
+    ])
+
+
+def save_cart_items(state):
+    """Write a Redis cart to Cart/CartItem. Returns False if the database already has a newer state."""
+    with transaction.atomic():
+        cart = Cart.objects.select_for_update().filter(pk=state.cart_id).first()
+        if cart is None or cart.updated_at > state.updated_at:
+            return False
+        sync_cart_items(cart, cart.items.all(), state.quantities, state.updated_at)
+        # update() rather than save(), so updated_at stays the time of the last cart tap
+        Cart.objects.filter(pk=cart.pk).update(updated_at=state.updated_at)
+    return True
+
+
+def fold_cart_operations(quantities, operations):
+    """Apply add/remove/set operations, in order, to a product id -> quantity dict."""
+    quantities = dict(quantities)
+    for operation in operations:
+        product_id = operation['product_id']
+        if operation['op'] == CART_REMOVE:
+            quantities.pop(product_id, None)
+        elif operation['op'] == CART_ADD:
+            quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+        else:
+            quantities[product_id] = operation['quantity']
+    return quantities
+
+
+def apply_cart_operations(user, operations):
+    """Apply a batch of operations to the user's database cart in one transaction."""
+    with transaction.atomic():
+        Cart.objects.get_or_create(user=user)
+        # Concurrent batches for the same cart apply one after the other
+        cart = Cart.objects.select_for_update().get(user=user)
+        items = list(cart.items.order_by('id'))
+        current = {}
+        for item in items:
+            current.setdefault(item.product_id, item.quantity)
+        now = timezone.now()
+        sync_cart_items(cart, items, fold_cart_operations(current, operations), now)
+        Cart.objects.filter(pk=cart.pk).update(updated_at=now)
+    return cart
+
+
+def with_cart_totals(queryset):
+    """Annotate carts with items_total and prefetch their items with line_subtotal, both summed in SQL."""
+    totals = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart').annotate(
+        total=Sum(cart_line_subtotal())
+    ).values('total')
+    items = CartItem.objects.annotate(line_subtotal=cart_line_subtotal()).select_related(
+        'product__brand', 'product__primary_image'
+    ).order_by('id')
+    return queryset.annotate(
+        items_total=Coalesce(Subquery(totals), Value(Decimal('0')), output_field=DecimalField(max_digits=10, decimal_places=2))
+    ).prefetch_related(Prefetch('items', queryset=items))
+
+
+def get_product_cards(product_ids):
+    """product id -> (effective price, card data), from the catalog cache where possible."""
+    prefix = catalog_cache_key('cart-card')
+    keys = {f'{prefix}:{product_id}': product_id for product_id in product_ids}
+    cards = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [product_id for product_id in product_ids if product_id not in cards]
+    if missing:
+        fresh = {
+            product.pk: (str(product.effective_price), ProductCardSerializer(product).data)
+            for product in Product.objects.filter(pk__in=missing).select_related('brand', 'primary_image')
+        }
+        cache.set_many({f'{prefix}:{product_id}': value for product_id, value in fresh.items()}, settings.CACHE_TTL)
+        cards.update(fresh)
+    return cards
+
+
+def render_cart(state, cards=None):
+    """The CartSerializer representation of a Redis cart, built without touching Cart/CartItem.
+
+    Items have no id until the cart is flushed; clients address them by product id.
+    `cards` are product cards the caller already fetched; only the rest are read.
+    """
+    money = serializers.DecimalField(max_digits=10, decimal_places=2)
+    timestamp = serializers.DateTimeField()
+    cards = dict(cards or {})
+    missing = [product_id for product_id in state.quantities if product_id not in cards]
+    if missing:
+        cards.update(get_product_cards(missing))
+    items = []
+    total = Decimal('0')
+    for product_id, quantity in state.quantities.items():
+        if product_id not in cards:
+            continue
+        effective_price, card = cards[product_id]
+        subtotal = Decimal(effective_price) * quantity
+        total += subtotal
+        items.append({
+            'id': None,
+            'cart': state.cart_id,
+            'product': card,
+            'quantity': quantity,
+            'subtotal': money.to_representation(subtotal),
+        })
+    return {
+        'id': state.cart_id,
+        'user': state.user_id,
+        'items': items,
+        'total': money.to_representation(total),
+        'created_at': timestamp.to_representation(state.created_at),
+        'updated_at': timestamp.to_representation(state.updated_at),
+    }
+
+
+class RedisCartStore:
+    """Active carts as Redis hashes; each mutation is one script call, written back to the database later."""
+    def __init__(self, client):
+        self.client = client
+        self.scripts = {name: client.register_script(source) for name, source in CART_SCRIPTS.items()}
+
+    def key(self, user_id):
+        return f'cart:{user_id}'
+
+    def run(self, script, user, *args, create=False):
+        keys = [self.key(user.pk), DIRTY_CARTS_KEY]
+        argv = [timezone.now().isoformat(), settings.CART_REDIS_TTL, user.pk, *args]
+        # A second miss means the hash expired right after loading; load again
+        for _ in range(3):
+            result = self.scripts[script](keys=keys, args=argv)
+            if result == -1:
+                self.load(user, create)
+            elif result == -2:
+                raise CartItemNotFound(args[0])
+            else:
+                return CartState(user.pk, dict(zip(result[::2], result[1::2])))
+        raise RuntimeError(f'Could not load the cart of user {user.pk} into Redis')
+
+    def load(self, user, create):
+        if create:
+            cart, _ = Cart.objects.get_or_create(user=user)
+        else:
+            cart = Cart.objects.filter(user=user).first()
+            if cart is None:
+                raise CartNotFound(user.pk)
+        fields = [value for item in cart_fields(cart).items() for value in item]
+        self.scripts['load'](keys=[self.key(user.pk)], args=[settings.CART_REDIS_TTL, *fields])
+
+    def read(self, user):
+        return self.run('read', user, create=True)
+
+    def add(self, user, product_id, quantity):
+        return self.run('add', user, product_id, quantity, create=True)
+
+    def remove(self, user, product_id):
+        return self.run('remove', user, product_id)
+
+    def set_quantity(self, user, product_id, quantity):
+        return self.run('set_quantity', user, product_id, quantity)
+
+    def clear(self, user):
+        return self.run('clear', user)
+
+    def apply(self, user, operations):
+        args = [
+            value
+            for operation in operations
+            for value in (operation['op'], operation['product_id'], operation.get('quantity', 0))
+        ]
+        return self.run('batch', user, *args, create=True)
+
+    def flush(self, user_id):
+        """Write one user's Redis cart to the database now (before checkout, for instance)."""
+        fields = self.client.hgetall(self.key(user_id))
+        if not fields:
+            return False
+        return save_cart_items(CartState(user_id, fields))
+
+    def flush_dirty(self, limit=FLUSH_BATCH_SIZE):
+        """Write back up to `limit` changed carts. Returns how many were flushed."""
+        flushed = 0
+        for user_id in self.client.spop(DIRTY_CARTS_KEY, limit) or []:
+            try:
+                self.flush(int(user_id))
+                flushed += 1
+            except Exception as e:
+                logger.error("Flushing the cart of user %s failed: %s", user_id, e)
+                self.client.sadd(DIRTY_CARTS_KEY, user_id)
+        return flushed
+
+
+_store = None
+
+
+def get_cart_store():
+    """The Redis cart store when CART_STORE is 'redis', else None (carts live in the database)."""
+    global _store
+    if settings.CART_STORE != 'redis':
+        return None
+    if _store is None:
+        if not REDIS_AVAILABLE:
+            raise ImproperlyConfigured("CART_STORE = 'redis' needs the redis package")
+        _store = RedisCartStore(redis.Redis.from_url(settings.CART_REDIS_URL, decode_responses=True))
+    return _store
@@ -0,0 +1,83 @@
+from django.db.models import Count, Q
+
+from .models import Product
+
+# Inclusive lower bound, exclusive upper bound; None means unbounded
+PRICE_BUCKETS = [(0, 25), (25, 50), (50, 100), (100, None)]
+
+
+def category_facet(queryset):
+    labels = dict(Product.CATEGORY_CHOICES)
+    rows = queryset.values('category').annotate(count=Count('id', distinct=True)).order_by('category')
+    return [
+        {'value': row['category'], 'label': labels.get(row['category'], row['category']), 'count': row['count']}
+        for row in rows
+    ]
+
+
+def strain_facet(queryset):
+    labels = dict(Product.STRAIN_CHOICES)
+    rows = queryset.values('strain').annotate(count=Count('id', distinct=True)).order_by('strain')
+    return [
+        {'value': row['strain'], 'label': labels.get(row['strain'], row['strain']), 'count': row['count']}
+        for row in rows
+    ]
+
+
+def brand_facet(queryset):
+    rows = queryset.values('brand', 'brand__name').annotate(count=Count('id', distinct=True)).order_by('brand__name')
+    return [
+        {'value': row['brand'], 'label': row['brand__name'], 'count': row['count']}
+        for row in rows
+    ]
+
+
+def effect_facet(queryset):
+    rows = (
+        queryset.filter(effects__isnull=False)
+        .values('effects', 'effects__name')
+        .annotate(count=Count('id', distinct=True))
+        .order_by('effects__name')
+    )
+    return [
+        {'value': row['effects'], 'label': row['effects__name'], 'count': row['count']}
+        for row in rows
+    ]
+
+
+def price_facet(queryset):
+    """Count every price bucket with one conditional aggregate."""
+    aggregates = {}
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        condition = Q(effective_price__gte=low)
+        if high is not None:
+            condition &= Q(effective_price__lt=high)
+        aggregates[f'bucket_{index}'] = Count('id', filter=condition, distinct=True)
+    counts = queryset.aggregate(**aggregates)
+    return [
+        {'min': low, 'max': high, 'count': counts[f'bucket_{index}']}
+        for index, (low, high) in enumerate(PRICE_BUCKETS)
+    ]
+
+
+# Facet name -> (query parameters that filter on it, counting function)
+FACETS = {
+    'category': (['category'], category_facet),
+    'strain': (['strain'], strain_facet),
+    'brand': (['brand'], brand_facet),
+    'effect': (['effects'], effect_facet),
+    'price': (['min_price', 'max_price'], price_facet),
+}
+
+
+def compute_facets(filtered_queryset):
+    """Compute every facet.
+
+    ``filtered_queryset(exclude)`` must return the product queryset with all
+    current filters applied except the query parameters in ``exclude``, so
+    each facet shows the options still reachable by changing only that facet.
+    """
+    return {
+        name: count(filtered_queryset(params).order_by())
+        for name, (params, count) in FACETS.items()
+    }
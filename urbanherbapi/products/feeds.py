@@ -0,0 +1,113 @@
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+FEED_CHUNK_SIZE = 2000
+# Lines are written out in blocks of roughly this many bytes
+FEED_BLOCK_SIZE = 64 * 1024
+
+# (column name, values() lookup)
+FEED_COLUMNS = [
+    ('id', 'id'),
+    ('slug', 'slug'),
+    ('name', 'name'),
+    ('brand', 'brand__name'),
+    ('category', 'category'),
+    ('strain', 'strain'),
+    ('thc_content', 'thc_content'),
+    ('cbd_content', 'cbd_content'),
+    ('price', 'price'),
+    ('discount_price', 'discount_price'),
+    ('effective_price', 'effective_price'),
+    ('stock', 'stock'),
+    ('rating', 'rating'),
+    ('review_count', 'review_count'),
+    ('image', 'primary_image__image'),
+    ('updated_at', 'updated_at'),
+]
+
+FEED_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+
+def iter_feed_rows(queryset, chunk_size=FEED_CHUNK_SIZE):
+    """Yield one plain dict per product without instantiating models."""
+    rows = queryset.order_by('id').values_list(*(lookup for _, lookup in FEED_COLUMNS))
+    names = [name for name, _ in FEED_COLUMNS]
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(names, row))
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+class _LineBuffer:
+    """File-like object that hands back what csv.writer writes instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow([name for name, _ in FEED_COLUMNS])
+    for row in rows:
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else ('' if value is None else value)
+            for value in row.values()
+        ])
+
+
+def render_feed(queryset, fmt, chunk_size=FEED_CHUNK_SIZE):
+    """Yield the feed as text lines in the given format ('ndjson' or 'csv')."""
+    rows = iter_feed_rows(queryset, chunk_size)
+    return csv_lines(rows) if fmt == 'csv' else ndjson_lines(rows)
+
+
+def encode_lines(lines, block_size=FEED_BLOCK_SIZE):
+    """Encode text lines and join them into blocks of about block_size bytes."""
+    pending = []
+    pending_size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= block_size:
+            yield b''.join(pending)
+            pending, pending_size = [], 0
+    if pending:
+        yield b''.join(pending)
+
+
+def accepts_gzip(header):
+    """Whether an Accept-Encoding header allows gzip; 'gzip;q=0' refuses it, '*' stands in for it."""
+    weights = {}
+    for part in header.split(','):
+        coding, *params = [piece.strip() for piece in part.split(';')]
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+    weight = weights.get('gzip', weights.get('x-gzip', weights.get('*', 0.0)))
+    return weight > 0
+
+
+def gzip_stream(blocks):
+    """Gzip an iterable of byte strings on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
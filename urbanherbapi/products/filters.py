@@ -0,0 +1,63 @@
+import json
+
+from django import forms
+from django.db import connections
+from django_filters import rest_framework as filters
+
+from .models import Product
+from .potency import parse_potency
+
+
+class PotencyField(forms.CharField):
+    """Accepts "15", "15%" or "500mg" and cleans to a (value, unit) pair."""
+
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        amount, unit = parse_potency(value)
+        if amount is None:
+            # django-filter %-formats messages, so the examples go in as a param
+            raise forms.ValidationError(
+                'Enter a potency such as %(examples)s.',
+                code='invalid',
+                params={'examples': '15, 15% or 500mg'}
+            )
+        return amount, unit
+
+
+class PotencyFilter(filters.Filter):
+    """Range filter on a parsed potency column; only products in the same unit match."""
+    field_class = PotencyField
+
+    def filter(self, qs, value):
+        if value is None:
+            return qs
+        amount, unit = value
+        return qs.filter(**{
+            f'{self.field_name}_unit': unit,
+            f'{self.field_name}_value__{self.lookup_expr}': amount,
+        })
+
+
+class ProductFilter(filters.FilterSet):
+    min_price = filters.NumberFilter(field_name='effective_price', lookup_expr='gte')
+    max_price = filters.NumberFilter(field_name='effective_price', lookup_expr='lte')
+    # "4 stars and up"
+    min_rating = filters.NumberFilter(field_name='rating', lookup_expr='gte')
+    benefit = filters.CharFilter(method='filter_benefit')
+    min_thc = PotencyFilter(field_name='thc', lookup_expr='gte')
+    max_thc = PotencyFilter(field_name='thc', lookup_expr='lte')
+    min_cbd = PotencyFilter(field_name='cbd', lookup_expr='gte')
+    max_cbd = PotencyFilter(field_name='cbd', lookup_expr='lte')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'strain', 'featured', 'brand', 'effects']
+
+    def filter_benefit(self, queryset, name, value):
+        if connections[queryset.db].features.supports_json_field_contains:
+            # benefits @> '["value"]', served by the GIN index on PostgreSQL
+            return queryset.filter(benefits__contains=[value])
+        # SQLite has no JSON containment; match the quoted element in the stored text
+        return queryset.filter(benefits__icontains=json.dumps(value))
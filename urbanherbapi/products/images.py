@@ -0,0 +1,224 @@
+import io
+import ipaddress
+import logging
+import socket
+import urllib.parse
+import urllib.request
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .blurhash import encode_blurhash
+from .cache import bump_catalog_version
+from .models import CatalogChange, Product, ProductImage, ProductImageVariant
+from .sync import record_catalog_changes
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+    logger.warning("Pillow is not installed. Product image variants will not be generated.")
+
+# Widths generated for every image; wider than the original are skipped
+VARIANT_WIDTHS = (320, 640, 1024, 1600)
+# Variant format -> (Pillow format, save options)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+FETCH_TIMEOUT = 15
+MAX_SOURCE_BYTES = 25 * 1024 * 1024
+SOURCE_URL_SCHEMES = {'http', 'https'}
+BLURHASH_SIZE = 32
+# Seconds after which a PROCESSING claim is taken to belong to a crashed worker
+CLAIM_TIMEOUT = 30 * 60
+
+
+class ImageProcessingError(Exception):
+    pass
+
+
+def sync_primary_images(product_ids):
+    """Point Product.primary_image at each product's is_primary image, else its first, in one UPDATE."""
+    first_image = ProductImage.objects.filter(
+        product=OuterRef('pk')
+    ).order_by('-is_primary', 'id').values('pk')[:1]
+    return Product.objects.filter(pk__in=product_ids).update(primary_image=Subquery(first_image))
+
+
+def check_source_url(url):
+    """Raise ImageProcessingError unless url is http(s) on a public address.
+
+    Image URLs come from staff and imports; without this the worker could be
+    pointed at local files or at services only reachable from inside.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in SOURCE_URL_SCHEMES or not parts.hostname:
+        raise ImageProcessingError(f'Only http and https image URLs are fetched, not {url!r}')
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or parts.scheme, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, ValueError) as e:
+        raise ImageProcessingError(f'Could not resolve {parts.hostname!r}: {e}') from e
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split('%')[0])
+        if not address.is_global:
+            raise ImageProcessingError(f'{parts.hostname!r} resolves to non-public address {address}')
+
+
+class CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Applies check_source_url to every redirect, so a public URL cannot bounce inwards."""
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_source_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+source_opener = urllib.request.build_opener(CheckedRedirectHandler)
+
+
+def read_source(product_image):
+    """Return the original image bytes, from the upload or the remote URL."""
+    if product_image.upload:
+        with product_image.upload.open('rb') as source:
+            return source.read()
+    if not product_image.image:
+        raise ImageProcessingError('Image has neither an upload nor a URL')
+    check_source_url(product_image.image)
+    request = urllib.request.Request(product_image.image, headers={'User-Agent': 'UrbanHerb image worker'})
+    with source_opener.open(request, timeout=FETCH_TIMEOUT) as response:
+        data = response.read(MAX_SOURCE_BYTES + 1)
+    if len(data) > MAX_SOURCE_BYTES:
+        raise ImageProcessingError(f'Source is larger than {MAX_SOURCE_BYTES} bytes')
+    return data
+
+
+def get_variant_widths(original_width):
+    widths = [width for width in VARIANT_WIDTHS if width < original_width]
+    # Always keep one variant at (at most) the largest configured width
+    widths.append(min(original_width, VARIANT_WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def build_srcset(variants):
+    """Variant format -> "url 320w, url 640w, ..." for <img srcset> / <source srcset>."""
+    srcset = {}
+    for variant_format in VARIANT_FORMATS:
+        candidates = sorted(
+            (variant for variant in variants if variant.format == variant_format),
+            key=lambda variant: variant.width
+        )
+        if candidates:
+            srcset[variant_format] = ', '.join(f'{variant.file.url} {variant.width}w' for variant in candidates)
+    return srcset
+
+
+def render_variants(product_image, data):
+    """Decode the original and build (unsaved) variants plus its size and blurhash."""
+    try:
+        original = Image.open(io.BytesIO(data))
+        original = ImageOps.exif_transpose(original).convert('RGB')
+    except Exception as e:
+        raise ImageProcessingError(f'Could not decode image: {e}') from e
+
+    thumbnail = original.resize((BLURHASH_SIZE, BLURHASH_SIZE), Image.BILINEAR)
+    blurhash = encode_blurhash(list(thumbnail.getdata()), BLURHASH_SIZE, BLURHASH_SIZE)
+
+    variants = []
+    for width in get_variant_widths(original.width):
+        height = max(1, round(original.height * width / original.width))
+        resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+        for variant_format, (pillow_format, options) in VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pillow_format, **options)
+            variant = ProductImageVariant(
+                image=product_image, format=variant_format,
+                width=width, height=height, size=buffer.tell()
+            )
+            variant.file.save(
+                f'{product_image.product_id}-{product_image.pk}-{width}.{variant_format}',
+                ContentFile(buffer.getvalue()),
+                save=False
+            )
+            variants.append(variant)
+    return original.width, original.height, blurhash, variants
+
+
+def process_image(product_image):
+    """Generate and record the variants of one claimed image. Returns True on success."""
+    try:
+        width, height, blurhash, variants = render_variants(product_image, read_source(product_image))
+    except Exception as e:
+        logger.warning("Processing image %s failed: %s", product_image.pk, e)
+        ProductImage.objects.filter(pk=product_image.pk).update(processing_status=ProductImage.FAILED)
+        return False
+
+    srcset = build_srcset(variants)
+    largest_jpeg = max((v for v in variants if v.format == 'jpeg'), key=lambda v: v.width)
+    with transaction.atomic():
+        product_image.variants.all().delete()
+        ProductImageVariant.objects.bulk_create(variants)
+        # update() rather than save(), so the new URL does not re-queue the image
+        ProductImage.objects.filter(pk=product_image.pk).update(
+            image=product_image.image or largest_jpeg.file.url,
+            width=width,
+            height=height,
+            blurhash=blurhash,
+            srcset=srcset,
+            processing_status=ProductImage.READY,
+        )
+    return True
+
+
+def claimable_images(now=None):
+    """Pending images, plus those left PROCESSING longer than CLAIM_TIMEOUT by a crashed worker."""
+    stale = (now or timezone.now()) - timedelta(seconds=CLAIM_TIMEOUT)
+    return ProductImage.objects.filter(
+        Q(processing_status=ProductImage.PENDING)
+        | Q(processing_status=ProductImage.PROCESSING) & (Q(claimed_at__lt=stale) | Q(claimed_at__isnull=True))
+    )
+
+
+def claim_image(image_id):
+    """Mark a claimable image as processing; False if another worker claimed it first."""
+    now = timezone.now()
+    return claimable_images(now).filter(pk=image_id).update(
+        processing_status=ProductImage.PROCESSING, claimed_at=now
+    ) == 1
+
+
+def process_pending_images(limit=None):
+    """Process queued images one at a time. Returns (processed, failed)."""
+    if not PILLOW_AVAILABLE:
+        raise ImageProcessingError('Pillow is required to process product images')
+
+    pending = claimable_images().order_by('id')
+    image_ids = list(pending.values_list('id', flat=True)[:limit])
+    processed = failed = 0
+    product_ids = set()
+    for image_id in image_ids:
+        if not claim_image(image_id):
+            continue
+        product_image = ProductImage.objects.get(pk=image_id)
+        if process_image(product_image):
+            processed += 1
+            product_ids.add(product_image.product_id)
+        else:
+            failed += 1
+
+    if processed:
+        # update() sends no signals, so invalidate cached catalog responses here
+        bump_catalog_version()
+        record_catalog_changes(CatalogChange.PRODUCT, product_ids)
+    return processed, failed
+
+
+def requeue_images(statuses=(ProductImage.FAILED,)):
+    """Send failed (or stuck processing) images back to the queue."""
+    return ProductImage.objects.filter(processing_status__in=statuses).update(
+        processing_status=ProductImage.PENDING
+    )
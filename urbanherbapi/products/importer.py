@@ -0,0 +1,298 @@
+import csv
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from .images import sync_primary_images
+from .models import Brand, CatalogChange, CBDEffect, InventoryMovement, Product, ProductImage
+from .search import build_search_document
+from .stock import forget_available_stock, lock_stock, with_available_stock
+from .sync import record_catalog_changes
+
+logger = logging.getLogger(__name__)
+
+# Columns overwritten when the slug already exists; rows are full product records.
+# Stock is not one of them: an existing product's stock only moves through the ledger
+IMPORT_FIELDS = [
+    'name', 'description', 'brand', 'category', 'strain', 'thc_content', 'cbd_content',
+    'benefits', 'price', 'discount_price', 'lab_tested', 'weight', 'dosage',
+    'ingredients', 'usage_instructions', 'warning', 'featured', 'search_document', 'updated_at',
+    'thc_value', 'thc_unit', 'cbd_value', 'cbd_unit', 'effective_price',
+]
+TEXT_FIELDS = [
+    'thc_content', 'cbd_content', 'weight', 'dosage', 'ingredients', 'usage_instructions', 'warning',
+]
+MAX_REPORTED_ERRORS = 100
+LIST_SEPARATOR = '|'
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', ''}
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed else 0.0
+
+
+def read_rows(stream, fmt):
+    """Yield rows lazily from a CSV or JSON Lines text stream.
+
+    CSV rows are dicts; JSON lines are yielded undecoded, so a malformed
+    line is rejected by clean_row like any other bad row.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def parse_list(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(LIST_SEPARATOR) if item.strip()]
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value if value is not None else '').strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise RowError(f"invalid boolean {value!r}")
+
+
+def parse_decimal(value, name, required=False):
+    if value in (None, ''):
+        if required:
+            raise RowError(f"{name} is required")
+        return None
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise RowError(f"invalid {name} {value!r}")
+    if number < 0 or number != number.quantize(Decimal('0.01')):
+        raise RowError(f"invalid {name} {value!r}")
+    return number
+
+
+def clean_row(row):
+    """Validate one raw row (a dict or a JSON line) and return it normalised, or raise RowError."""
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as e:
+            raise RowError(f"invalid JSON: {e}")
+    if not isinstance(row, dict):
+        raise RowError(f"expected an object, got {type(row).__name__}")
+    name = str(row.get('name') or '').strip()
+    brand = str(row.get('brand') or '').strip()
+    if not name:
+        raise RowError("name is required")
+    if not brand:
+        raise RowError("brand is required")
+
+    category = str(row.get('category') or '').strip().upper()
+    if category not in dict(Product.CATEGORY_CHOICES):
+        raise RowError(f"invalid category {row.get('category')!r}")
+    strain = str(row.get('strain') or 'NA').strip().upper()
+    if strain not in dict(Product.STRAIN_CHOICES):
+        raise RowError(f"invalid strain {row.get('strain')!r}")
+
+    try:
+        stock = int(row.get('stock') or 0)
+    except (TypeError, ValueError):
+        raise RowError(f"invalid stock {row.get('stock')!r}")
+    if stock < 0:
+        raise RowError("stock cannot be negative")
+
+    cleaned = {
+        'slug': slugify(row.get('slug') or name),
+        'name': name,
+        'description': str(row.get('description') or ''),
+        'brand': brand,
+        'category': category,
+        'strain': strain,
+        'benefits': parse_list(row.get('benefits')),
+        'effects': parse_list(row.get('effects')),
+        'price': parse_decimal(row.get('price'), 'price', required=True),
+        'discount_price': parse_decimal(row.get('discount_price'), 'discount_price'),
+        'stock': stock,
+        'lab_tested': parse_bool(row.get('lab_tested')),
+        'featured': parse_bool(row.get('featured')),
+        # None means "leave images alone", an empty list removes them
+        'images': parse_list(row['images']) if 'images' in row else None,
+    }
+    if not cleaned['slug']:
+        raise RowError("name does not produce a usable slug")
+    for column in TEXT_FIELDS:
+        cleaned[column] = str(row.get(column) or '')
+    return cleaned
+
+
+class CatalogImporter:
+    """Upserts products chunk by chunk; only the current chunk is held in memory.
+
+    Brands and effects are looked up by name. Both tables are small, so their
+    name -> instance maps are kept for the whole run.
+    """
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.brands = {brand.name: brand for brand in Brand.objects.all()}
+        self.effects = {effect.name: effect for effect in CBDEffect.objects.all()}
+        self.stats = ImportStats()
+
+    def run(self, rows, progress=None):
+        rows = iter(rows)
+        line = 0
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            cleaned = {}
+            for raw in chunk:
+                line += 1
+                try:
+                    row = clean_row(raw)
+                except RowError as e:
+                    self.stats.rejected += 1
+                    if len(self.stats.errors) < MAX_REPORTED_ERRORS:
+                        self.stats.errors.append((line, str(e)))
+                    continue
+                # Last occurrence of a slug wins; one upsert cannot touch a row twice
+                cleaned.pop(row['slug'], None)
+                cleaned[row['slug']] = row
+            if cleaned:
+                self.import_chunk(list(cleaned.values()))
+            self.stats.rows += len(chunk)
+            if progress:
+                progress(self.stats)
+        return self.stats
+
+    @transaction.atomic
+    def import_chunk(self, rows):
+        self.ensure_brands({row['brand'] for row in rows})
+        self.ensure_effects({name for row in rows for name in row['effects']})
+
+        slugs = [row['slug'] for row in rows]
+        existing = set(Product.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+        products = []
+        for row in rows:
+            product = Product(
+                slug=row['slug'],
+                brand=self.brands[row['brand']],
+                stock=row['stock'],
+                **{
+                    name: row[name]
+                    for name in IMPORT_FIELDS
+                    if name in row and name != 'brand'
+                }
+            )
+            # bulk_create skips save(), so derive the computed columns here
+            product.set_potency()
+            product.set_effective_price()
+            # Same order as product.effects.all(), so a later signal refresh is a no-op
+            product.search_document = build_search_document(product, effect_names=sorted(set(row['effects'])))
+            products.append(product)
+
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['slug'],
+            update_fields=IMPORT_FIELDS,
+        )
+        # Conflicting rows do not get their primary key back on every backend
+        ids = dict(Product.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+        self.adjust_stock({ids[row['slug']]: row['stock'] for row in rows if row['slug'] in existing})
+
+        Through = Product.effects.through
+        Through.objects.filter(product_id__in=ids.values()).delete()
+        Through.objects.bulk_create([
+            Through(product_id=ids[row['slug']], cbdeffect_id=self.effects[name].id)
+            for row in rows
+            for name in dict.fromkeys(row['effects'])
+        ])
+
+        with_images = [row for row in rows if row['images'] is not None]
+        ProductImage.objects.filter(product_id__in=[ids[row['slug']] for row in with_images]).delete()
+        ProductImage.objects.bulk_create([
+            ProductImage(
+                product_id=ids[row['slug']],
+                image=url,
+                alt_text=row['name'][:200],
+                is_primary=index == 0,
+            )
+            for row in with_images
+            for index, url in enumerate(row['images'])
+        ])
+        # bulk_create skips the signal that keeps Product.primary_image in step
+        sync_primary_images([ids[row['slug']] for row in with_images])
+        # ... and the one that appends to the mobile sync change log
+        record_catalog_changes(CatalogChange.PRODUCT, ids.values())
+
+        self.stats.created += len(rows) - len(existing)
+        self.stats.updated += len(existing)
+
+    def adjust_stock(self, counts):
+        """Bring existing products to the imported stock count with ADJUSTMENT movements.
+
+        One INSERT per chunk; the movements stay pending until compaction and the
+        command bumps the catalog version once when the import finishes.
+        """
+        # Counts are never negative, so under the lock an adjustment cannot oversell
+        lock_stock(counts)
+        available = dict(
+            with_available_stock(Product.objects.filter(pk__in=counts)).values_list('pk', 'available_stock')
+        )
+        movements = [
+            InventoryMovement(
+                product_id=product_id, kind=InventoryMovement.ADJUSTMENT,
+                quantity=count - available[product_id], note='Catalog import',
+            )
+            for product_id, count in sorted(counts.items())
+            if count != available[product_id]
+        ]
+        InventoryMovement.objects.bulk_create(movements)
+        forget_available_stock([movement.product_id for movement in movements])
+
+    def ensure_brands(self, names):
+        missing = [name for name in names if name not in self.brands]
+        if missing:
+            Brand.objects.bulk_create([Brand(name=name) for name in missing])
+            for brand in Brand.objects.filter(name__in=missing):
+                self.brands.setdefault(brand.name, brand)
+            record_catalog_changes(CatalogChange.BRAND, [self.brands[name].id for name in missing])
+
+    def ensure_effects(self, names):
+        missing = [name for name in names if name not in self.effects]
+        if missing:
+            CBDEffect.objects.bulk_create([CBDEffect(name=name, description='') for name in missing])
+            for effect in CBDEffect.objects.filter(name__in=missing):
+                self.effects.setdefault(effect.name, effect)
+            record_catalog_changes(CatalogChange.EFFECT, [self.effects[name].id for name in missing])
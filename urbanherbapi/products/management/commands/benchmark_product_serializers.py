@@ -0,0 +1,108 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from products.images import sync_primary_images
+from products.models import Brand, CBDEffect, Product, ProductImage, Review
+from products.serializers import ProductCardSerializer, ProductSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compares payload size and serialization time of the full and card product serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10, help='Products per page')
+        parser.add_argument('--reviews', type=int, default=200, help='Reviews per product')
+        parser.add_argument('--images', type=int, default=5, help='Images per product')
+        parser.add_argument('--rounds', type=int, default=5, help='Timing rounds per serializer')
+
+    def handle(self, *args, **options):
+        # Synthetic data lives only inside this transaction and is rolled back afterwards
+        with transaction.atomic():
+            ids = self.create_fixture(options)
+
+            full_qs = Product.objects.filter(id__in=ids).select_related('brand').prefetch_related(
+                'images', 'effects', 'reviews__user'
+            )
+            card_qs = Product.objects.filter(id__in=ids).select_related('brand', 'primary_image')
+
+            rows = [
+                ('ProductSerializer', *self.measure(ProductSerializer, full_qs, options['rounds'])),
+                ('ProductCardSerializer', *self.measure(ProductCardSerializer, card_qs, options['rounds'])),
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{options['products']} products x {options['reviews']} reviews x {options['images']} images"
+        )
+        self.stdout.write(f"{'serializer':<24}{'bytes':>12}{'ms':>10}{'queries':>10}")
+        for name, size, elapsed, queries in rows:
+            self.stdout.write(f'{name:<24}{size:>12}{elapsed:>10.1f}{queries:>10}')
+
+    def measure(self, serializer_class, queryset, rounds):
+        """Return (payload bytes, best wall time in ms, queries) for one page."""
+        best = None
+        for _ in range(rounds):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                payload = JSONRenderer().render(serializer_class(list(queryset.all()), many=True).data)
+                elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return len(payload), best, len(ctx.captured_queries)
+
+    def create_fixture(self, options):
+        brand = Brand.objects.create(name='Benchmark Brand', description='Benchmark brand')
+        effects = [
+            CBDEffect.objects.create(name=f'Benchmark Effect {i}', description='Benchmark effect')
+            for i in range(4)
+        ]
+        users = User.objects.bulk_create([
+            User(email=f'benchmark{i}@example.com', first_name='Bench', last_name=str(i))
+            for i in range(options['reviews'])
+        ])
+
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Benchmark Product {i}',
+                slug=f'benchmark-product-{i}',
+                description='Benchmark description ' * 20,
+                brand=brand,
+                category='TINCTURES',
+                price=Decimal('29.99'),
+                stock=10
+            )
+            for i in range(options['products'])
+        ])
+        for product in products:
+            product.effects.set(effects)
+
+        ProductImage.objects.bulk_create([
+            ProductImage(
+                product=product,
+                image=f'https://example.com/images/{product.slug}-{i}.jpg',
+                alt_text=product.name,
+                is_primary=i == 0
+            )
+            for product in products
+            for i in range(options['images'])
+        ])
+        sync_primary_images([product.id for product in products])
+        Review.objects.bulk_create([
+            Review(
+                product=product,
+                user=user,
+                rating=4,
+                title='Benchmark review',
+                content='Benchmark review content ' * 10
+            )
+            for product in products
+            for user in users
+        ])
+        return [product.id for product in products]
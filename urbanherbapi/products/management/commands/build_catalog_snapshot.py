@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from products.sync import prune_catalog_changes, rebuild_snapshot
+
+class Command(BaseCommand):
+    help = (
+        'Writes a snapshot of the current catalog for the mobile app (run after deploys, or on a schedule) '
+        'and optionally drops change-log rows the snapshot already covers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prune-days', type=int,
+            help='Also delete change-log rows older than this many days; clients behind them re-download the snapshot'
+        )
+
+    def handle(self, *args, **options):
+        snapshot = rebuild_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f'Built catalog snapshot v{snapshot.version} ({len(snapshot.body)} bytes)'
+        ))
+        if options['prune_days'] is not None:
+            pruned = prune_catalog_changes(timezone.now() - timedelta(days=options['prune_days']))
+            self.stdout.write(self.style.SUCCESS(f'Pruned {pruned} change-log rows'))
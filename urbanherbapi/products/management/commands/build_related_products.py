@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from products.cache import bump_catalog_version
+from products.recommendations import DEFAULT_TOP_K, NUMPY_AVAILABLE, build_related_index
+
+class Command(BaseCommand):
+    help = 'Rebuilds the precomputed related products index (run periodically, e.g. nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help='Neighbours to keep per product')
+
+    def handle(self, *args, **options):
+        if not NUMPY_AVAILABLE:
+            raise CommandError('NumPy is required to build the related products index')
+        created = build_related_index(top_k=options['top_k'])
+        # bulk_create sends no signals, so invalidate cached related responses here
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Stored {created} related product entries'))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from products.stock import compact_inventory
+
+class Command(BaseCommand):
+    help = 'Folds pending inventory movements into Product.stock (run as a worker with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Products compacted per transaction')
+        parser.add_argument('--loop', action='store_true', help='Keep compacting new movements')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between passes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            folded = compact_inventory(batch_size=options['batch_size'])
+            if folded or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Compacted {folded} inventory movements'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -32,7 +32,7 @@ class Command(BaseCommand):
                 'thc_content': '0.3%',
                 'cbd_content': '1000mg',
                 'effects': json.dumps(['RELAXING', 'STRESS_RELIEF']),
-                'benefits': json.dumps(['Pain Relief', 'Better Sleep', 'Reduced Anxiety']),
+                'benefits': ['Pain Relief', 'Better Sleep', 'Reduced Anxiety'],
                 'price': '59.99',
                 'stock': 100,
                 'lab_tested': True,
@@ -51,7 +51,7 @@ class Command(BaseCommand):
                 'thc_content': '0.2%',
                 'cbd_content': '18%',
                 'effects': json.dumps(['ENERGIZING', 'FOCUSED']),
-                'benefits': json.dumps(['Energy Boost', 'Mental Clarity', 'Creativity']),
+                'benefits': ['Energy Boost', 'Mental Clarity', 'Creativity'],
                 'price': '29.99',
                 'stock': 50,
                 'lab_tested': True,
@@ -68,7 +68,7 @@ class Command(BaseCommand):
                 'thc_content': '0%',
                 'cbd_content': '25mg per gummy',
                 'effects': json.dumps(['RELAXING', 'SLEEPY']),
-                'benefits': json.dumps(['Stress Relief', 'Better Sleep', 'Calmness']),
+                'benefits': ['Stress Relief', 'Better Sleep', 'Calmness'],
                 'price': '24.99',
                 'stock': 75,
                 'lab_tested': True,
@@ -87,7 +87,7 @@ class Command(BaseCommand):
                 'thc_content': '0%',
                 'cbd_content': '500mg',
                 'effects': json.dumps(['PAIN_RELIEF']),
-                'benefits': json.dumps(['Muscle Relief', 'Joint Support', 'Skin Health']),
+                'benefits': ['Muscle Relief', 'Joint Support', 'Skin Health'],
                 'price': '39.99',
                 'stock': 60,
                 'lab_tested': True,
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from products.feeds import FEED_CHUNK_SIZE, FEED_FORMATS, encode_lines, gzip_stream, render_feed
+from products.models import Product
+
+class Command(BaseCommand):
+    help = 'Writes the whole catalog as NDJSON or CSV, streaming it in bounded memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='Output file, or "-" for stdout')
+        parser.add_argument('--format', choices=list(FEED_FORMATS), default='ndjson')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+        parser.add_argument('--chunk-size', type=int, default=FEED_CHUNK_SIZE, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        stream = encode_lines(render_feed(Product.objects.all(), options['format'], options['chunk_size']))
+        if options['gzip']:
+            stream = gzip_stream(stream)
+
+        if path == '-':
+            output = sys.stdout.buffer
+        else:
+            try:
+                output = open(path, 'wb')
+            except OSError as e:
+                raise CommandError(f'Cannot open {path}: {e}')
+        try:
+            for block in stream:
+                output.write(block)
+        finally:
+            if output is sys.stdout.buffer:
+                output.flush()
+            else:
+                output.close()
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(f'Wrote catalog feed to {path}'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from products.carts import FLUSH_BATCH_SIZE, get_cart_store
+
+class Command(BaseCommand):
+    help = 'Writes changed Redis carts back to the database (run as a worker with --loop when CART_STORE is redis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=FLUSH_BATCH_SIZE, help='Carts flushed per pass')
+        parser.add_argument('--loop', action='store_true', help='Keep flushing changed carts')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds between passes with --loop')
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        if store is None:
+            raise CommandError("Carts are stored in the database; set CART_STORE = 'redis' to use this command")
+
+        while True:
+            flushed = store.flush_dirty(limit=options['batch_size'])
+            if flushed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} carts'))
+            if not options['loop']:
+                break
+            if flushed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from products.images import PILLOW_AVAILABLE, process_pending_images, requeue_images
+from products.models import ProductImage
+
+class Command(BaseCommand):
+    help = 'Generates responsive variants for queued product images (run as a worker with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Images processed per pass')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new images')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+        parser.add_argument('--retry-failed', action='store_true', help='Queue failed images again first')
+
+    def handle(self, *args, **options):
+        if not PILLOW_AVAILABLE:
+            raise CommandError('Pillow is required to process product images')
+        if options['retry_failed']:
+            requeued = requeue_images([ProductImage.FAILED])
+            self.stdout.write(f'Requeued {requeued} failed images')
+
+        while True:
+            processed, failed = process_pending_images(limit=options['limit'])
+            if processed or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Processed {processed} images, {failed} failed'))
+            if not options['loop']:
+                break
+            if not processed and not failed:
+                time.sleep(options['interval'])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from products.cache import bump_catalog_version
+from products.ratings import recompute_ratings
+
+class Command(BaseCommand):
+    help = 'Rebuilds Product.rating, rating_total, review_count and the star histogram from the Review table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='*', type=int, help='Limit the rebuild to these product IDs')
+
+    def handle(self, *args, **options):
+        product_ids = options['product_ids'] or None
+        updated = recompute_ratings(product_ids)
+        # bulk_update sends no signals, so invalidate cached catalog responses here
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed ratings for {updated} products'))
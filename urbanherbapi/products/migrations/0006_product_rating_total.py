@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:41
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("products", "Review")
+
+    totals = {
+        row["product"]: row
+        for row in Review.objects.values("product").annotate(
+            total=Sum("rating"), count=Count("id")
+        )
+    }
+    products = []
+    for product in Product.objects.only("id"):
+        row = totals.get(product.id, {"total": 0, "count": 0})
+        product.rating_total = row["total"]
+        product.review_count = row["count"]
+        product.rating = round(row["total"] / row["count"], 2) if row["count"] else 0
+        products.append(product)
+    Product.objects.bulk_update(
+        products, ["rating", "rating_total", "review_count"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0005_cbdeffect_remove_product_effects_product_effects"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_total",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(
+            backfill_rating_aggregates, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:47
+
+import json
+
+from django.db import migrations, models
+
+
+def backfill_search_documents(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    categories = dict(Product._meta.get_field("category").choices)
+
+    products = []
+    for product in Product.objects.select_related("brand").prefetch_related("effects"):
+        try:
+            benefits = json.loads(product.benefits) if product.benefits else []
+        except (TypeError, ValueError):
+            benefits = []
+        parts = [
+            product.name,
+            product.brand.name,
+            categories.get(product.category, product.category),
+            product.description,
+            " ".join(effect.name for effect in product.effects.all()),
+            " ".join(str(benefit) for benefit in benefits),
+        ]
+        product.search_document = "\n".join(part for part in parts if part)
+        products.append(product)
+    Product.objects.bulk_update(products, ["search_document"], batch_size=500)
+
+
+def install_search_index(apps, schema_editor):
+    from products.search import install_search_index
+
+    install_search_index(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from products.search import uninstall_search_index
+
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0007_product_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_document",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
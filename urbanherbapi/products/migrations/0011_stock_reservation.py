@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def clamp_negative_stock(apps, schema_editor):
+    # Oversold rows from the old read-check-save path would violate the constraint
+    Product = apps.get_model("products", "Product")
+    Product.objects.filter(stock__lt=0).update(stock=0)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0010_related_product"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockReservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("quantity", models.PositiveIntegerField()),
+                ("expires_at", models.DateTimeField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["expires_at"],
+            },
+        ),
+        migrations.RunPython(clamp_negative_stock, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="product",
+            constraint=models.CheckConstraint(
+                check=models.Q(("stock__gte", 0)), name="product_stock_non_negative"
+            ),
+        ),
+        migrations.AddField(
+            model_name="stockreservation",
+            name="cart",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="reservations",
+                to="products.cart",
+            ),
+        ),
+        migrations.AddField(
+            model_name="stockreservation",
+            name="product",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="reservations",
+                to="products.product",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockreservation",
+            index=models.Index(
+                fields=["expires_at"], name="products_st_expires_817182_idx"
+            ),
+        ),
+    ]
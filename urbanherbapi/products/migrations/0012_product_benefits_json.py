@@ -0,0 +1,83 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:01
+
+import json
+
+from django.db import migrations, models
+
+
+def parse_benefits(text):
+    if not text:
+        return []
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return [text]
+    if isinstance(value, list):
+        return value
+    return [value] if value not in (None, "") else []
+
+
+def copy_benefits_forward(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    products = []
+    for product in Product.objects.only("id", "benefits").iterator(chunk_size=500):
+        product.benefits_data = parse_benefits(product.benefits)
+        products.append(product)
+    Product.objects.bulk_update(products, ["benefits_data"], batch_size=500)
+
+
+def copy_benefits_backward(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    products = []
+    for product in Product.objects.only("id", "benefits_data").iterator(chunk_size=500):
+        product.benefits = json.dumps(product.benefits_data or [])
+        products.append(product)
+    Product.objects.bulk_update(products, ["benefits"], batch_size=500)
+
+
+def create_benefits_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        # jsonb_path_ops serves the benefits__contains (@>) filter
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS products_product_benefits_gin "
+            "ON products_product USING gin (benefits jsonb_path_ops)"
+        )
+
+
+def drop_benefits_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS products_product_benefits_gin")
+
+
+def reinstall_search_index(apps, schema_editor):
+    # SQLite rebuilds products_product for these column changes (and for the
+    # stock constraint in 0011), which drops the full-text sync triggers.
+    from products.search import install_search_index
+
+    install_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0011_stock_reservation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="benefits_data",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(copy_benefits_forward, copy_benefits_backward),
+        migrations.RemoveField(
+            model_name="product",
+            name="benefits",
+        ),
+        migrations.RenameField(
+            model_name="product",
+            old_name="benefits_data",
+            new_name="benefits",
+        ),
+        migrations.RunPython(create_benefits_index, drop_benefits_index),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:02
+
+from django.db import migrations, models
+
+
+def backfill_potency(apps, schema_editor):
+    from products.potency import parse_potency
+
+    Product = apps.get_model("products", "Product")
+    products = []
+    for product in Product.objects.only("id", "thc_content", "cbd_content").iterator(
+        chunk_size=500
+    ):
+        product.thc_value, product.thc_unit = parse_potency(product.thc_content)
+        product.cbd_value, product.cbd_unit = parse_potency(product.cbd_content)
+        products.append(product)
+    Product.objects.bulk_update(
+        products, ["thc_value", "thc_unit", "cbd_value", "cbd_unit"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0012_product_benefits_json"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="cbd_unit",
+            field=models.CharField(
+                blank=True,
+                choices=[("PERCENT", "%"), ("MG", "mg")],
+                editable=False,
+                max_length=7,
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="cbd_value",
+            field=models.DecimalField(
+                blank=True, decimal_places=3, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="thc_unit",
+            field=models.CharField(
+                blank=True,
+                choices=[("PERCENT", "%"), ("MG", "mg")],
+                editable=False,
+                max_length=7,
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="thc_value",
+            field=models.DecimalField(
+                blank=True, decimal_places=3, editable=False, max_digits=9, null=True
+            ),
+        ),
+        migrations.RunPython(backfill_potency, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["thc_unit", "thc_value"], name="products_pr_thc_uni_dbf034_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["cbd_unit", "cbd_value"], name="products_pr_cbd_uni_08dbb8_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:04
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_effective_price(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Product.objects.update(effective_price=Coalesce("discount_price", "price"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0013_product_potency"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="product",
+            name="products_pr_price_dbec84_idx",
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="effective_price",
+            field=models.DecimalField(
+                decimal_places=2, default=0, editable=False, max_digits=10
+            ),
+        ),
+        migrations.RunPython(backfill_effective_price, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["effective_price", "id"], name="products_pr_effecti_5873d8_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0014_product_effective_price"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "created_at", "id"],
+                name="products_re_product_42d658_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:13
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_rating_histogram(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Review = apps.get_model("products", "Review")
+
+    fields = {star: f"rating_{star}_count" for star in range(1, 6)}
+    histograms = {
+        row["product"]: row
+        for row in Review.objects.values("product").annotate(
+            **{
+                field: Count("id", filter=Q(rating=star))
+                for star, field in fields.items()
+            }
+        )
+    }
+    products = []
+    for product in Product.objects.filter(pk__in=histograms).only("id"):
+        for field in fields.values():
+            setattr(product, field, histograms[product.id][field])
+        products.append(product)
+    Product.objects.bulk_update(products, list(fields.values()), batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0015_review_product_created_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_1_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_2_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_3_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_4_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_5_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_histogram, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:19
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+import django.db.models.deletion
+
+
+def keep_first_primary_image(apps, schema_editor):
+    ProductImage = apps.get_model("products", "ProductImage")
+    first_primaries = (
+        ProductImage.objects.filter(is_primary=True)
+        .values("product")
+        .annotate(first=Min("id"))
+        .values("first")
+    )
+    ProductImage.objects.filter(is_primary=True).exclude(
+        pk__in=first_primaries
+    ).update(is_primary=False)
+
+
+def backfill_primary_image(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductImage = apps.get_model("products", "ProductImage")
+    first_image = (
+        ProductImage.objects.filter(product=OuterRef("pk"))
+        .order_by("-is_primary", "id")
+        .values("pk")[:1]
+    )
+    Product.objects.update(primary_image=Subquery(first_image))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0017_product_image_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="primary_image",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="products.productimage",
+            ),
+        ),
+        migrations.RunPython(keep_first_primary_image, migrations.RunPython.noop),
+        migrations.RunPython(backfill_primary_image, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="productimage",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_primary", True)),
+                fields=("product",),
+                name="product_single_primary_image",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0019_catalog_change"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventoryMovement",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("receipt", "Receipt"),
+                            ("sale", "Sale"),
+                            ("adjustment", "Adjustment"),
+                            ("reservation", "Reservation"),
+                            ("release", "Reservation release"),
+                        ],
+                        max_length=11,
+                    ),
+                ),
+                ("quantity", models.IntegerField()),
+                ("note", models.CharField(blank=True, max_length=200)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "compacted_at",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="movements",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("compacted_at__isnull", True)),
+                        fields=["product"],
+                        name="inventory_pending_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:52
+
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def seed_pending_stock_levels(apps, schema_editor):
+    # Products without pending movements need no row: their snapshot is their available stock
+    InventoryMovement = apps.get_model("products", "InventoryMovement")
+    Product = apps.get_model("products", "Product")
+    StockLevel = apps.get_model("products", "StockLevel")
+    pending = dict(
+        InventoryMovement.objects.filter(compacted_at__isnull=True)
+        .values("product")
+        .annotate(total=Sum("quantity"))
+        .values_list("product", "total")
+    )
+    StockLevel.objects.bulk_create(
+        StockLevel(product_id=product_id, available=stock + pending[product_id])
+        for product_id, stock in Product.objects.filter(pk__in=pending).values_list(
+            "pk", "stock"
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0020_inventory_movement"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockLevel",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stock_level",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("available", models.IntegerField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="stocklevel",
+            constraint=models.CheckConstraint(
+                check=models.Q(("available__gte", 0)),
+                name="stock_level_available_non_negative",
+            ),
+        ),
+        migrations.RunPython(seed_pending_stock_levels, migrations.RunPython.noop),
+    ]
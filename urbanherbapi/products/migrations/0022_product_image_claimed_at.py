@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0021_stock_level"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productimage",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
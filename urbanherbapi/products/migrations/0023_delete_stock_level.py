@@ -0,0 +1,16 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:26
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0022_product_image_claimed_at"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="StockLevel",
+        ),
+    ]
@@ -1,8 +1,10 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from authentication.models import User
 from django.utils.text import slugify
-import json
+from .potency import POTENCY_UNIT_CHOICES, parse_potency
 
 class Brand(models.Model):
     name = models.CharField(max_length=100)
@@ -68,10 +70,17 @@ class Product(models.Model):
     strain = models.CharField(max_length=20, choices=STRAIN_CHOICES, default='NA')
     thc_content = models.CharField(max_length=20, blank=True)
     cbd_content = models.CharField(max_length=20, blank=True)
+    # Parsed from thc_content/cbd_content on save, for range filtering
+    thc_value = models.DecimalField(max_digits=9, decimal_places=3, null=True, blank=True, editable=False)
+    thc_unit = models.CharField(max_length=7, choices=POTENCY_UNIT_CHOICES, blank=True, editable=False)
+    cbd_value = models.DecimalField(max_digits=9, decimal_places=3, null=True, blank=True, editable=False)
+    cbd_unit = models.CharField(max_length=7, choices=POTENCY_UNIT_CHOICES, blank=True, editable=False)
     effects = models.ManyToManyField(CBDEffect, related_name='products', blank=True)
-    benefits = models.TextField(blank=True)  # Store as JSON string
+    benefits = models.JSONField(default=list, blank=True)  # List of benefit labels
     price = models.DecimalField(max_digits=10, decimal_places=2)
     discount_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # COALESCE(discount_price, price), kept up to date on save so it can be indexed
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     stock = models.IntegerField(default=0)
     lab_tested = models.BooleanField(default=False)
     weight = models.CharField(max_length=20, blank=True)
@@ -86,39 +95,181 @@ class Product(models.Model):
         default=0
     )
     review_count = models.IntegerField(default=0)
+    rating_total = models.IntegerField(default=0)  # Sum of review ratings, kept in step with review_count
+    # Star-rating histogram: number of reviews at each star, kept in step with review_count
+    rating_1_count = models.IntegerField(default=0)
+    rating_2_count = models.IntegerField(default=0)
+    rating_3_count = models.IntegerField(default=0)
+    rating_4_count = models.IntegerField(default=0)
+    rating_5_count = models.IntegerField(default=0)
     featured = models.BooleanField(default=False)
+    # The is_primary image (or the first one), kept in step by sync_primary_images
+    primary_image = models.ForeignKey(
+        'ProductImage', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+'
+    )
+    # Name, brand, description, effects and benefits flattened for full-text search
+    search_document = models.TextField(blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Source field -> columns derived from it in save()
+    DERIVED_FIELDS = {
+        'thc_content': {'thc_value', 'thc_unit'},
+        'cbd_content': {'cbd_value', 'cbd_unit'},
+        'price': {'effective_price'},
+        'discount_price': {'effective_price'},
+    }
+
+    # Review star -> histogram column
+    STAR_COUNT_FIELDS = {star: f'rating_{star}_count' for star in range(1, 6)}
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        self.set_potency()
+        self.set_effective_price()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            for source in list(update_fields):
+                update_fields |= self.DERIVED_FIELDS.get(source, set())
+            kwargs['update_fields'] = update_fields
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
-    def set_benefits(self, benefits_list):
-        self.benefits = json.dumps(benefits_list)
+    def set_effective_price(self):
+        """Store the price the customer actually pays."""
+        self.effective_price = self.discount_price if self.discount_price is not None else self.price
 
-    def get_benefits(self):
-        if self.benefits:
-            return json.loads(self.benefits)
-        return []
+    @property
+    def rating_distribution(self):
+        return {star: getattr(self, field) for star, field in self.STAR_COUNT_FIELDS.items()}
+
+    def set_potency(self):
+        self.thc_value, self.thc_unit = parse_potency(self.thc_content)
+        self.cbd_value, self.cbd_unit = parse_potency(self.cbd_content)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination: one (sort field, id) index per catalog ordering
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['effective_price', 'id']),
+            models.Index(fields=['rating', 'id']),
+            models.Index(fields=['name', 'id']),
+            # Serves Max(updated_at) for catalog Last-Modified headers
+            models.Index(fields=['updated_at']),
+            # Potency range filters compare values within one unit
+            models.Index(fields=['thc_unit', 'thc_value']),
+            models.Index(fields=['cbd_unit', 'cbd_value']),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(stock__gte=0), name='product_stock_non_negative'),
+        ]
 
 class ProductImage(models.Model):
+    PENDING = 'PENDING'
+    PROCESSING = 'PROCESSING'
+    READY = 'READY'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    ]
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
-    image = models.URLField()
+    # Remote original; for uploads it is filled in with the largest variant once processed
+    image = models.URLField(blank=True)
+    upload = models.FileField(upload_to='products/originals/', blank=True)
     alt_text = models.CharField(max_length=200)
     is_primary = models.BooleanField(default=False)
+    # Filled in by the process_images worker
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    blurhash = models.CharField(max_length=64, blank=True, editable=False)
+    srcset = models.JSONField(default=dict, blank=True, editable=False)  # Variant format -> srcset string
+    processing_status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True, editable=False
+    )
+    # When a worker set PROCESSING; old claims are picked up again
+    claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Image for {self.product.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted source so a changed image is queued for reprocessing,
+        # and the product so a moved image resyncs the old product's primary image
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_values', None)
+        moved = loaded and loaded.get('product_id') not in (None, self.product_id)
+        self._moved_from = loaded['product_id'] if moved else None
+        if loaded and (loaded.get('image') != self.image or loaded.get('upload') != self.upload.name):
+            self.processing_status = self.PENDING
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'processing_status'}
+        with transaction.atomic():
+            if self.is_primary:
+                # Demote the previous primary first; the partial unique constraint allows only one
+                ProductImage.objects.filter(
+                    product_id=self.product_id, is_primary=True
+                ).exclude(pk=self.pk).update(is_primary=False)
+            super().save(*args, **kwargs)
+        self._loaded_values = {'product_id': self.product_id, 'image': self.image, 'upload': self.upload.name}
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product'], condition=models.Q(is_primary=True), name='product_single_primary_image'
+            ),
+        ]
+
+class ProductImageVariant(models.Model):
+    """A resized copy of a ProductImage, generated by the process_images worker."""
+    FORMAT_CHOICES = [
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    ]
+
+    image = models.ForeignKey(ProductImage, on_delete=models.CASCADE, related_name='variants')
+    format = models.CharField(max_length=4, choices=FORMAT_CHOICES)
+    file = models.FileField(upload_to='products/variants/')
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()  # Bytes
+
+    def __str__(self):
+        return f"{self.width}w {self.format} of {self.image}"
+
+    class Meta:
+        ordering = ['format', 'width']
+        unique_together = ('image', 'format', 'width')
+
+class RelatedProduct(models.Model):
+    """Precomputed nearest neighbour of a product, rebuilt by build_related_products."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    position = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    def __str__(self):
+        return f"{self.related.name} related to {self.product.name}"
+
+    class Meta:
+        ordering = ['position']
+        unique_together = ('product', 'position')
+
 class Review(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -131,9 +282,32 @@ class Review(models.Model):
     def __str__(self):
         return f"Review for {self.product.name} by {self.user.email}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted product/rating so updates can apply a delta
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Keep the review write and the product rating update in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-created_at']
         unique_together = ('product', 'user')
+        indexes = [
+            # Newest-first review pages for one product (ReviewPagination)
+            models.Index(fields=['product', 'created_at', 'id']),
+        ]
+
+def cart_line_subtotal():
+    """A CartItem's quantity times its product's effective (discount-aware) price, as a database expression."""
+    return models.ExpressionWrapper(
+        models.F('quantity') * models.F('product__effective_price'),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2)
+    )
 
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -144,7 +318,10 @@ class Cart(models.Model):
         return f"Cart for {self.user.email}"
 
     def get_total(self):
-        return sum(item.get_subtotal() for item in self.items.all())
+        """Sum of the line subtotals, from the items_total annotation or one aggregate query."""
+        if hasattr(self, 'items_total'):
+            return self.items_total
+        return self.items.aggregate(total=models.Sum(cart_line_subtotal()))['total'] or Decimal('0')
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -157,7 +334,10 @@ class CartItem(models.Model):
         return f"{self.quantity}x {self.product.name}"
 
     def get_subtotal(self):
-        return self.product.price * self.quantity
+        # Annotated on carts loaded with with_cart_totals(), so the product row is not needed
+        if hasattr(self, 'line_subtotal'):
+            return self.line_subtotal
+        return self.product.effective_price * self.quantity
 
 class Wishlist(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -167,3 +347,89 @@ class Wishlist(models.Model):
 
     def __str__(self):
         return f"Wishlist for {self.user.email}"
+
+class StockReservation(models.Model):
+    """Stock held for a cart during checkout; a RESERVATION movement already took the quantity off."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    # SET_NULL so holds from deleted carts still get their stock back when they expire
+    cart = models.ForeignKey(Cart, on_delete=models.SET_NULL, null=True, blank=True, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name} until {self.expires_at}"
+
+    class Meta:
+        ordering = ['expires_at']
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+class InventoryMovement(models.Model):
+    """Append-only stock ledger. Product.stock is the snapshot of every compacted movement;
+    available stock is that snapshot plus the pending (not yet compacted) quantities."""
+    RECEIPT = 'receipt'
+    SALE = 'sale'
+    ADJUSTMENT = 'adjustment'
+    RESERVATION = 'reservation'
+    RELEASE = 'release'
+    KIND_CHOICES = [
+        (RECEIPT, 'Receipt'),
+        (SALE, 'Sale'),
+        (ADJUSTMENT, 'Adjustment'),
+        (RESERVATION, 'Reservation'),
+        (RELEASE, 'Reservation release'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='movements')
+    kind = models.CharField(max_length=11, choices=KIND_CHOICES)
+    # Signed: receipts and releases add stock, sales and reservations take it
+    quantity = models.IntegerField()
+    note = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by compact_inventory once the quantity is folded into Product.stock
+    compacted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def __str__(self):
+        return f"{self.quantity:+d} {self.product.name} ({self.kind})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Inventory movements are append-only')
+        super().save(*args, **kwargs)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Available stock sums only the pending movements of a product
+            models.Index(
+                fields=['product'], condition=models.Q(compacted_at__isnull=True), name='inventory_pending_idx'
+            ),
+        ]
+
+class CatalogChange(models.Model):
+    """Append-only log of catalog writes; the latest id is the version mobile clients sync from."""
+    PRODUCT = 'product'
+    BRAND = 'brand'
+    EFFECT = 'effect'
+    KIND_CHOICES = [
+        (PRODUCT, 'Product'),
+        (BRAND, 'Brand'),
+        (EFFECT, 'Effect'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=7, choices=KIND_CHOICES)
+    # Not a foreign key: deletions are logged too
+    object_id = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'changed'
+        return f"{self.kind} {self.object_id} {action} (v{self.id})"
+
+    class Meta:
+        ordering = ['id']
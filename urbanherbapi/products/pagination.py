@@ -0,0 +1,194 @@
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import FloatField, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .models import Product
+
+# Public ordering values -> (sort field, tie-breaker). Each pair has a matching
+# composite index on Product so every page is a single index range scan.
+CATALOG_ORDERINGS = {
+    '-created_at': ('-created_at', '-id'),
+    'created_at': ('created_at', 'id'),
+    # Price sorts by what the customer pays
+    'price': ('effective_price', 'id'),
+    '-price': ('-effective_price', '-id'),
+    'rating': ('rating', 'id'),
+    '-rating': ('-rating', '-id'),
+    'name': ('name', 'id'),
+    '-name': ('-name', '-id'),
+    # Only available while searching; search_rank is annotated by ProductSearchFilter
+    'relevance': ('-search_rank', '-id'),
+}
+DEFAULT_CATALOG_ORDERING = '-created_at'
+
+
+def get_catalog_ordering(request):
+    """Return the requested ordering key, falling back to relevance when searching, else newest first."""
+    searching = bool(request.query_params.get(api_settings.SEARCH_PARAM, '').strip())
+    ordering = request.query_params.get('ordering')
+    if ordering in CATALOG_ORDERINGS and (ordering != 'relevance' or searching):
+        return ordering
+    return 'relevance' if searching else DEFAULT_CATALOG_ORDERING
+
+
+def get_filter_signature(request):
+    """Hash the query parameters that change which products match, ignoring paging and ordering."""
+    ignored = {'page', 'page_size', 'cursor', 'ordering'}
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists() if key not in ignored
+        for value in values
+    )
+    return hashlib.md5(json.dumps(params).encode()).hexdigest()
+
+
+class CachedCountPaginator(DjangoPaginator):
+    """Paginator that serves COUNT(*) from the cache when a cache key is given."""
+
+    def __init__(self, object_list, per_page, cache_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_key = cache_key
+
+    @cached_property
+    def count(self):
+        if self.cache_key is None:
+            return super().count
+        count = cache.get(self.cache_key)
+        if count is None:
+            count = super().count
+            cache.set(self.cache_key, count, settings.CATALOG_COUNT_CACHE_TTL)
+        return count
+
+
+class CatalogPageNumberPagination(PageNumberPagination):
+    """Page-number pagination whose total count is cached per filter signature."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_cache_key = f'catalog:count:{get_filter_signature(request)}'
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        # PageNumberPagination builds its paginator through this hook
+        return CachedCountPaginator(object_list, per_page, cache_key=self.count_cache_key)
+
+
+class CatalogPagination(BasePagination):
+    """Keyset pagination over (sort field, id) for the product catalog.
+
+    Each page is fetched with ``WHERE (field, id) > (last_field, last_id)``
+    instead of an OFFSET, and no COUNT(*) is run, so page 500 costs the same
+    as page 1. Passing ``?page=N`` switches to classic page-number pagination
+    for clients that need totals and random access; that total is cached per
+    filter signature so it costs at most one COUNT(*).
+    """
+    page_size = api_settings.PAGE_SIZE or 10
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = get_catalog_ordering(request)
+        queryset = queryset.order_by(*CATALOG_ORDERINGS[self.ordering])
+
+        if self.page_query_param in request.query_params:
+            self.page_paginator = CatalogPageNumberPagination()
+            return self.page_paginator.paginate_queryset(queryset, request, view)
+        self.page_paginator = None
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self.get_position(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.page_paginator is not None:
+            return self.page_paginator.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_position(self, instance):
+        field_name = CATALOG_ORDERINGS[self.ordering][0].lstrip('-')
+        return {'o': self.ordering, 'v': getattr(instance, field_name), 'id': instance.pk}
+
+    def get_position_filter(self, position):
+        field, _ = CATALOG_ORDERINGS[self.ordering]
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        field_name = field.lstrip('-')
+        return (
+            Q(**{f'{field_name}__{lookup}': position['v']})
+            | Q(**{field_name: position['v'], f'id__{lookup}': position['id']})
+        )
+
+    def get_sort_field(self):
+        field_name = CATALOG_ORDERINGS[self.ordering][0].lstrip('-')
+        if field_name == 'search_rank':
+            return FloatField()
+        return Product._meta.get_field(field_name)
+
+    def encode_cursor(self, position):
+        # str() keeps full microsecond precision for datetimes and exact Decimals
+        raw = json.dumps(position, default=str, separators=(',', ':'))
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = json.loads(urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            if position['o'] != self.ordering:
+                raise ValueError('Cursor belongs to a different ordering')
+            position['v'] = self.get_sort_field().to_python(position['v'])
+            position['id'] = int(position['id'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+
+class ReviewPagination(CursorPagination):
+    """Newest-first keyset pagination for a product's reviews.
+
+    Pages are read off the (product, created_at, id) index of Review; the
+    cursor carries the last created_at seen, so deep pages cost no more than
+    the first and no COUNT(*) is run.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
@@ -0,0 +1,35 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+PERCENT = 'PERCENT'
+MG = 'MG'
+POTENCY_UNIT_CHOICES = [
+    (PERCENT, '%'),
+    (MG, 'mg'),
+]
+
+# "0.3%", "<0.3%", "1000mg", "25mg per gummy", "1.5 g", "18"
+POTENCY_RE = re.compile(
+    r'^\s*(?:<=?|≤|~|approx\.?)?\s*(?P<value>\d+(?:[.,]\d+)?)'
+    r'(?:\s*(?P<unit>%|mg|g)(?![a-z])|(?!\s*[a-z]))',
+    re.IGNORECASE
+)
+
+
+def parse_potency(text):
+    """Parse free-text potency into (Decimal value, unit), or (None, '') if unreadable.
+
+    Bare numbers are read as percentages, grams are converted to mg, and
+    anything after the unit ("per gummy") is ignored.
+    """
+    match = POTENCY_RE.match(text or '')
+    if not match:
+        return None, ''
+    try:
+        value = Decimal(match.group('value').replace(',', '.'))
+    except InvalidOperation:
+        return None, ''
+    unit = (match.group('unit') or '%').lower()
+    if unit == 'g':
+        return value * 1000, MG
+    return value, MG if unit == 'mg' else PERCENT
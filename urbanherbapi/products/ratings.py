@@ -0,0 +1,68 @@
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import CatalogChange, Product, Review
+from .sync import record_catalog_changes
+
+
+def apply_review_delta(product_id, rating_delta, count_delta, star_deltas=None):
+    """Shift a product's rating aggregates in a single UPDATE.
+
+    star_deltas maps a star (1-5) to the change in its histogram column.
+    Every column is computed from F() expressions, so concurrent reviews on
+    the same product never overwrite each other's contribution.
+    """
+    new_total = F('rating_total') + rating_delta
+    new_count = F('review_count') + count_delta
+    star_counts = {
+        Product.STAR_COUNT_FIELDS[star]: F(Product.STAR_COUNT_FIELDS[star]) + delta
+        for star, delta in (star_deltas or {}).items() if delta
+    }
+    Product.objects.filter(pk=product_id).update(
+        **star_counts,
+        rating_total=new_total,
+        review_count=new_count,
+        rating=Case(
+            # The WHEN clause sees the pre-update row, so this is "no reviews left"
+            When(review_count__lte=-count_delta, then=Value(0.0)),
+            default=ExpressionWrapper(
+                Cast(new_total, FloatField()) / new_count,
+                output_field=FloatField()
+            ),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def recompute_ratings(product_ids=None):
+    """Rebuild rating aggregates from the Review table. Returns the number of products updated."""
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+
+    star_fields = Product.STAR_COUNT_FIELDS
+    totals = {
+        row['product']: row
+        for row in Review.objects.filter(product__in=products)
+        .values('product')
+        .annotate(
+            total=Sum('rating'),
+            count=Count('id'),
+            **{field: Count('id', filter=Q(rating=star)) for star, field in star_fields.items()}
+        )
+    }
+
+    fields = ['rating', 'rating_total', 'review_count', *star_fields.values()]
+    updated = []
+    for product in products.only('id', *fields):
+        row = totals.get(product.id, {'total': 0, 'count': 0})
+        product.rating_total = row['total']
+        product.review_count = row['count']
+        product.rating = round(row['total'] / row['count'], 2) if row['count'] else 0
+        for field in star_fields.values():
+            setattr(product, field, row.get(field, 0))
+        updated.append(product)
+
+    Product.objects.bulk_update(updated, fields, batch_size=500)
+    record_catalog_changes(CatalogChange.PRODUCT, [product.id for product in updated])
+    return len(updated)
@@ -0,0 +1,124 @@
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+
+from .facets import PRICE_BUCKETS
+from .models import Product, RelatedProduct
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy is not installed. Related product index building will be disabled.")
+
+DEFAULT_TOP_K = 4
+
+# Relative weight of each feature group in the similarity score. Effects are
+# spread over however many a product has, so one shared effect out of many
+# counts for less than a single matching effect.
+FEATURE_WEIGHTS = {
+    'category': 3.0,
+    'effects': 2.0,
+    'strain': 1.0,
+    'brand': 1.0,
+    'price': 1.0,
+}
+
+
+def get_price_band(price):
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        if price >= low and (high is None or price < high):
+            return index
+    return 0
+
+
+def build_feature_matrix(rows, effect_map):
+    """One-hot encode products into an L2-normalised float32 matrix, one row per product."""
+    columns = {}
+
+    def column(group, value):
+        return columns.setdefault((group, value), len(columns))
+
+    weights = FEATURE_WEIGHTS
+    entries = []
+    for row_index, row in enumerate(rows):
+        entries.append((row_index, column('category', row['category']), weights['category']))
+        entries.append((row_index, column('strain', row['strain']), weights['strain']))
+        entries.append((row_index, column('brand', row['brand_id']), weights['brand']))
+        entries.append((row_index, column('price', get_price_band(row['effective_price'])), weights['price']))
+        effects = effect_map.get(row['id'], ())
+        for effect_id in effects:
+            entries.append((row_index, column('effect', effect_id), weights['effects'] / len(effects)))
+
+    matrix = np.zeros((len(rows), len(columns)), dtype=np.float32)
+    for row_index, column_index, weight in entries:
+        matrix[row_index, column_index] = weight
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def nearest_neighbours(matrix, top_k, block_size=1024):
+    """Yield (row, [(neighbour_row, score), ...]) using cosine similarity, best first.
+
+    Similarities are computed one block of rows at a time so memory stays at
+    block_size x n rather than the full n x n matrix.
+    """
+    count = matrix.shape[0]
+    k = min(top_k, count - 1)
+    if k <= 0:
+        return
+    for start in range(0, count, block_size):
+        stop = min(start + block_size, count)
+        scores = matrix[start:stop] @ matrix.T
+        # Never recommend a product to itself
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for offset, row_candidates in enumerate(candidates):
+            row_scores = scores[offset, row_candidates]
+            order = np.argsort(-row_scores, kind='stable')
+            yield start + offset, [
+                (int(row_candidates[i]), float(row_scores[i])) for i in order
+            ]
+
+
+def build_related_index(top_k=DEFAULT_TOP_K, batch_size=1000):
+    """Rebuild the RelatedProduct table with the top_k most similar products for each product."""
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("NumPy is required to build the related product index")
+
+    rows = list(
+        Product.objects.order_by('id').values('id', 'category', 'strain', 'brand_id', 'effective_price')
+    )
+    effect_map = defaultdict(list)
+    through = Product.effects.through.objects.values_list('product_id', 'cbdeffect_id')
+    for product_id, effect_id in through.iterator():
+        effect_map[product_id].append(effect_id)
+
+    matrix = build_feature_matrix(rows, effect_map)
+    logger.info("Building related products for %s products over %s features", *matrix.shape)
+
+    created = 0
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        batch = []
+        for row_index, neighbours in nearest_neighbours(matrix, top_k):
+            product_id = rows[row_index]['id']
+            for position, (neighbour_index, score) in enumerate(neighbours):
+                batch.append(RelatedProduct(
+                    product_id=product_id,
+                    related_id=rows[neighbour_index]['id'],
+                    position=position,
+                    score=score,
+                ))
+            if len(batch) >= batch_size:
+                RelatedProduct.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        RelatedProduct.objects.bulk_create(batch)
+        created += len(batch)
+    return created
@@ -0,0 +1,223 @@
+import logging
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'products_product_fts'
+MAX_SEARCH_TERMS = 8
+
+# PostgreSQL keeps the tsvector in a generated column, so the database rebuilds
+# it whenever name or search_document change. Name is weighted above the rest.
+POSTGRES_INSTALL_SQL = [
+    f"""
+    ALTER TABLE products_product ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(search_document, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS products_product_search_vector_gin '
+    'ON products_product USING gin (search_vector)',
+]
+POSTGRES_UNINSTALL_SQL = [
+    'DROP INDEX IF EXISTS products_product_search_vector_gin',
+    'ALTER TABLE products_product DROP COLUMN IF EXISTS search_vector',
+]
+
+# SQLite (development) uses an external-content FTS5 table kept in sync by triggers.
+SQLITE_INSTALL_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, search_document, content='products_product', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, search_document)
+        VALUES (new.id, new.name, new.search_document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, search_document)
+        VALUES ('delete', old.id, old.name, old.search_document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, search_document
+    ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, search_document)
+        VALUES ('delete', old.id, old.name, old.search_document);
+        INSERT INTO {FTS_TABLE}(rowid, name, search_document)
+        VALUES (new.id, new.name, new.search_document);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+_backends = {}
+
+
+def install_search_index(connection):
+    """Create the database-side full-text index for the connection's vendor."""
+    statements = {
+        'postgresql': POSTGRES_INSTALL_SQL,
+        'sqlite': SQLITE_INSTALL_SQL,
+    }.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+    _backends.pop(connection.alias, None)
+
+
+def uninstall_search_index(connection):
+    statements = {
+        'postgresql': POSTGRES_UNINSTALL_SQL,
+        'sqlite': SQLITE_UNINSTALL_SQL,
+    }.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+    _backends.pop(connection.alias, None)
+
+
+def reinstall_sqlite_search_index(using='default', **kwargs):
+    """post_migrate: put the FTS5 sync triggers back after migrations that rebuilt products_product.
+
+    SQLite applies most column and constraint changes by copying the table,
+    which drops its triggers; new and edited products would then never reach
+    the index. Does nothing unless the index was installed (migration 0008).
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if FTS_TABLE not in connection.introspection.table_names(cursor):
+            return
+    install_search_index(connection)
+
+
+def get_search_backend(using='default'):
+    """Return 'postgresql', 'sqlite' or 'basic' depending on what is installed."""
+    if using not in _backends:
+        connection = connections[using]
+        backend = 'basic'
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                columns = connection.introspection.get_table_description(cursor, Product._meta.db_table)
+                if any(column.name == 'search_vector' for column in columns):
+                    backend = 'postgresql'
+            elif connection.vendor == 'sqlite':
+                if FTS_TABLE in connection.introspection.table_names(cursor):
+                    backend = 'sqlite'
+        if backend == 'basic':
+            logger.warning("Full-text index not installed on %s, using substring search", using)
+        _backends[using] = backend
+    return _backends[using]
+
+
+def get_search_terms(query):
+    """Split user input into at most MAX_SEARCH_TERMS lowercase word tokens."""
+    return re.findall(r'\w+', query.lower())[:MAX_SEARCH_TERMS]
+
+
+def build_search_document(product, effect_names=None):
+    """Flatten the searchable text of a product (brand and effects should be preloaded).
+
+    Pass effect_names to build the document for a product whose effects are not saved yet.
+    """
+    if effect_names is None:
+        effect_names = [effect.name for effect in product.effects.all()]
+    benefits = product.benefits if isinstance(product.benefits, list) else []
+    parts = [
+        product.name,
+        product.brand.name,
+        product.get_category_display(),
+        product.description,
+        ' '.join(effect_names),
+        ' '.join(str(benefit) for benefit in benefits),
+    ]
+    return '\n'.join(part for part in parts if part)
+
+
+def refresh_search_documents(queryset, batch_size=500):
+    """Recompute search_document for the given products, writing only changed rows."""
+    changed = []
+    products = queryset.select_related('brand').prefetch_related('effects')
+    for product in products.iterator(chunk_size=batch_size):
+        document = build_search_document(product)
+        if document != product.search_document:
+            product.search_document = document
+            changed.append(product)
+    Product.objects.bulk_update(changed, ['search_document'], batch_size=batch_size)
+    return len(changed)
+
+
+def search_products(queryset, terms):
+    """Filter a product queryset to matches and annotate a ``search_rank`` (higher is better)."""
+    table = Product._meta.db_table
+    backend = get_search_backend(queryset.db)
+
+    if backend == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return queryset.filter(
+            RawSQL(
+                f'"{table}"."search_vector" @@ to_tsquery(%s, %s)',
+                (SEARCH_CONFIG, tsquery),
+                output_field=BooleanField()
+            )
+        ).annotate(
+            # float8 so the rank round-trips exactly through pagination cursors
+            search_rank=RawSQL(
+                f'ts_rank("{table}"."search_vector", to_tsquery(%s, %s))::float8',
+                (SEARCH_CONFIG, tsquery),
+                output_field=FloatField()
+            )
+        )
+
+    if backend == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(
+            RawSQL(
+                f'"{table}"."id" IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+                (match,),
+                output_field=BooleanField()
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id")',
+                (match,),
+                output_field=FloatField()
+            )
+        )
+
+    for term in terms:
+        queryset = queryset.filter(search_document__icontains=term)
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """Full-text product search over the precomputed search document."""
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        terms = get_search_terms(request.query_params.get(self.search_param, ''))
+        if not terms:
+            return queryset
+        return search_products(queryset, terms)
@@ -1,8 +1,12 @@
 from rest_framework import serializers
-from .models import Product, Brand, ProductImage, Review, Cart, CartItem, Wishlist, CBDEffect
-from django.db.models import Avg
+from .models import Product, Brand, ProductImage, Review, Cart, CartItem, Wishlist, CBDEffect, StockReservation
 import json
 
+# Reviews embedded in the product detail response
+DETAIL_REVIEW_COUNT = 5
+# Most operations accepted by one cart/batch/ request
+MAX_CART_OPERATIONS = 100
+
 class BrandSerializer(serializers.ModelSerializer):
     class Meta:
         model = Brand
@@ -12,6 +16,14 @@ class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
         fields = '__all__'
+        read_only_fields = ['product']
+
+    def validate(self, attrs):
+        image = attrs.get('image', getattr(self.instance, 'image', ''))
+        upload = attrs.get('upload', getattr(self.instance, 'upload', None))
+        if not image and not upload:
+            raise serializers.ValidationError('Provide an image URL or upload a file.')
+        return attrs
 
 class ReviewSerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source='user.email', read_only=True)
@@ -33,9 +45,10 @@ class CBDEffectSerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
-    average_rating = serializers.FloatField(read_only=True)
+    reviews = serializers.SerializerMethodField()
+    average_rating = serializers.FloatField(source='rating', read_only=True)
     review_count = serializers.IntegerField(read_only=True)
+    rating_distribution = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     effects = CBDEffectSerializer(many=True, read_only=True)
     brand = BrandSerializer(read_only=True)
     price = serializers.DecimalField(max_digits=10, decimal_places=2)
@@ -45,14 +58,22 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             'id', 'name', 'slug', 'description', 'category', 'strain',
-            'thc_content', 'cbd_content', 'effects', 'benefits',
-            'price', 'discount_price', 'stock', 'featured',
+            'thc_content', 'cbd_content', 'thc_value', 'thc_unit',
+            'cbd_value', 'cbd_unit', 'effects', 'benefits',
+            'price', 'discount_price', 'effective_price', 'stock', 'featured',
             'created_at', 'updated_at', 'images', 'reviews',
-            'average_rating', 'review_count', 'brand', 'lab_tested',
+            'average_rating', 'review_count', 'rating_distribution', 'brand', 'lab_tested',
             'weight', 'dosage', 'ingredients', 'usage_instructions',
             'warning'
         ]
 
+    def get_reviews(self, instance):
+        # Only the newest few are embedded; the reviews endpoint pages through the rest
+        reviews = getattr(instance, 'latest_reviews', None)
+        if reviews is None:
+            reviews = instance.reviews.select_related('user').order_by('-created_at', '-id')[:DETAIL_REVIEW_COUNT]
+        return ReviewSerializer(reviews, many=True, context=self.context).data
+
     def to_representation(self, instance):
         ret = super().to_representation(instance)
         
@@ -60,28 +81,53 @@ class ProductSerializer(serializers.ModelSerializer):
         ret['price'] = float(instance.price)
         ret['stock'] = int(instance.stock)
         
-        # Convert JSON strings to lists for effects and benefits
-        try:
-            ret['benefits'] = json.loads(instance.benefits) if instance.benefits else []
-        except (TypeError, json.JSONDecodeError):
-            ret['benefits'] = []
-
         # Ensure arrays are initialized
         ret['images'] = ret.get('images', [])
         ret['effects'] = ret.get('effects', [])
         ret['reviews'] = ret.get('reviews', [])
 
-        # Calculate average rating and review count
-        ret['average_rating'] = self.get_average_rating(instance)
-        ret['review_count'] = self.get_review_count(instance)
-
         return ret
 
-    def get_average_rating(self, obj):
-        return float(obj.reviews.aggregate(Avg('rating'))['rating__avg'] or 0.0)
+class ProductCardSerializer(serializers.ModelSerializer):
+    """Compact product representation for grids, carts and wishlists."""
+    brand_name = serializers.CharField(source='brand.name', read_only=True)
+    price = serializers.FloatField(read_only=True)
+    discount_price = serializers.FloatField(read_only=True)
+    effective_price = serializers.FloatField(read_only=True)
+    average_rating = serializers.FloatField(source='rating', read_only=True)
+    in_stock = serializers.SerializerMethodField()
+    primary_image = serializers.SerializerMethodField()
+    primary_image_srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'slug', 'category', 'strain', 'brand_name',
+            'price', 'discount_price', 'effective_price', 'average_rating',
+            'review_count', 'stock', 'in_stock', 'featured', 'primary_image',
+            'primary_image_srcset'
+        ]
+
+    def get_in_stock(self, obj):
+        return obj.stock > 0
 
-    def get_review_count(self, obj):
-        return obj.reviews.count()
+    def get_primary_image(self, obj):
+        # Denormalized on Product; callers select_related('primary_image')
+        return obj.primary_image.image if obj.primary_image else None
+
+    def get_primary_image_srcset(self, obj):
+        return obj.primary_image.srcset if obj.primary_image else {}
+
+class ProductSyncSerializer(ProductCardSerializer):
+    """Product as stored by the mobile app: the card plus what its detail screen shows offline."""
+    brand = serializers.PrimaryKeyRelatedField(read_only=True)
+    effects = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta(ProductCardSerializer.Meta):
+        fields = ProductCardSerializer.Meta.fields + [
+            'brand', 'effects', 'description', 'thc_content', 'cbd_content', 'benefits',
+            'lab_tested', 'weight', 'dosage', 'updated_at'
+        ]
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
     effects = serializers.ListField(child=serializers.CharField(), required=False)
@@ -91,16 +137,21 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
         model = Product
         fields = '__all__'
 
+    def get_fields(self):
+        fields = super().get_fields()
+        # Once a product exists its stock only changes through inventory movements
+        if self.instance is not None:
+            fields['stock'].read_only = True
+        return fields
+
     def to_internal_value(self, data):
-        # Convert lists to JSON strings for effects and benefits
+        # Convert lists to JSON strings for effects
         if 'effects' in data:
             data['effects'] = json.dumps(data['effects'])
-        if 'benefits' in data:
-            data['benefits'] = json.dumps(data['benefits'])
         return super().to_internal_value(data)
 
 class CartItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = ProductCardSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(),
         source='product',
@@ -132,8 +183,31 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'items', 'total', 'created_at', 'updated_at']
         read_only_fields = ['user']
 
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'remove', 'set'])
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'remove' and 'quantity' not in attrs:
+            raise serializers.ValidationError({'quantity': 'This field is required for add and set.'})
+        return attrs
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        if len(operations) > MAX_CART_OPERATIONS:
+            raise serializers.ValidationError(f'At most {MAX_CART_OPERATIONS} operations per batch.')
+        return operations
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'product', 'quantity', 'expires_at']
+
 class WishlistSerializer(serializers.ModelSerializer):
-    products = ProductSerializer(many=True, read_only=True)
+    products = ProductCardSerializer(many=True, read_only=True)
     product_ids = serializers.PrimaryKeyRelatedField(
         many=True,
         queryset=Product.objects.all(),
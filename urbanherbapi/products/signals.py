@@ -0,0 +1,127 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .images import sync_primary_images
+from .models import Brand, CatalogChange, CBDEffect, Product, ProductImage, ProductImageVariant, Review
+from .ratings import apply_review_delta, recompute_ratings
+from .search import refresh_search_documents
+from .sync import record_catalog_changes
+
+SEARCH_FIELDS = {'name', 'description', 'category', 'benefits', 'brand', 'brand_id'}
+
+# Any write to these invalidates cached catalog data (facets, responses)
+CATALOG_MODELS = [Product, ProductImage, Review, Brand, CBDEffect]
+
+# Models whose rows mobile clients sync, and their change-log kind
+SYNC_KINDS = {Product: CatalogChange.PRODUCT, Brand: CatalogChange.BRAND, CBDEffect: CatalogChange.EFFECT}
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Fold a new or edited review into its product's rating aggregates."""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    old_product_id = loaded.get('product_id')
+    old_rating = loaded.get('rating')
+
+    if created:
+        apply_review_delta(instance.product_id, instance.rating, 1, {instance.rating: 1})
+    elif old_product_id is None or old_rating is None:
+        # The persisted rating is unknown (never loaded or deferred), so rebuild instead
+        recompute_ratings([instance.product_id])
+    elif old_product_id != instance.product_id:
+        apply_review_delta(old_product_id, -old_rating, -1, {old_rating: -1})
+        apply_review_delta(instance.product_id, instance.rating, 1, {instance.rating: 1})
+    elif old_rating != instance.rating:
+        apply_review_delta(
+            instance.product_id, instance.rating - old_rating, 0, {old_rating: -1, instance.rating: 1}
+        )
+    # Synced products carry their rating
+    record_catalog_changes(CatalogChange.PRODUCT, [instance.product_id, old_product_id])
+
+    instance._loaded_values = {'product_id': instance.product_id, 'rating': instance.rating}
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Remove a deleted review from its product's rating aggregates."""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    rating = loaded.get('rating', instance.rating)
+    product_id = loaded.get('product_id', instance.product_id)
+    apply_review_delta(product_id, -rating, -1, {rating: -1})
+    record_catalog_changes(CatalogChange.PRODUCT, [product_id])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def image_changed(sender, instance, raw=False, **kwargs):
+    """Keep Product.primary_image pointing at the product's primary image."""
+    if raw:
+        return
+    product_ids = {instance.product_id, getattr(instance, '_moved_from', None)} - {None}
+    sync_primary_images(product_ids)
+    record_catalog_changes(CatalogChange.PRODUCT, product_ids)
+
+
+@receiver(post_delete, sender=ProductImageVariant)
+def image_variant_deleted(sender, instance, **kwargs):
+    """Remove the variant file along with its row (also on cascades from ProductImage)."""
+    if instance.file:
+        instance.file.delete(save=False)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Rebuild the product's search document when its text may have changed."""
+    if raw or (update_fields is not None and not SEARCH_FIELDS & set(update_fields)):
+        return
+    refresh_search_documents(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=Product.effects.through)
+def product_effects_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # instance is a CBDEffect; a reverse clear does not report which products were affected
+        products = Product.objects.filter(pk__in=pk_set) if pk_set else Product.objects.all()
+    else:
+        products = Product.objects.filter(pk=instance.pk)
+    refresh_search_documents(products)
+    record_catalog_changes(CatalogChange.PRODUCT, products.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Brand)
+def brand_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        refresh_search_documents(instance.products.all())
+
+
+@receiver(post_save, sender=CBDEffect)
+def effect_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        refresh_search_documents(instance.products.all())
+
+
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+def log_sync_change(sender, instance, signal, raw=False, **kwargs):
+    """Append a product, brand or effect write to the mobile sync change log."""
+    if raw:
+        return
+    deleted = signal is post_delete
+    record_catalog_changes(SYNC_KINDS[sender], [instance.pk], deleted=deleted)
+    if sender is Brand and not deleted:
+        # Synced products carry their brand name
+        record_catalog_changes(CatalogChange.PRODUCT, instance.products.values_list('id', flat=True))
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_saved_{model.__name__}')
+    post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_deleted_{model.__name__}')
+m2m_changed.connect(catalog_changed, sender=Product.effects.through, dispatch_uid='catalog_effects_changed')
+for model in SYNC_KINDS:
+    post_save.connect(log_sync_change, sender=model, dispatch_uid=f'sync_saved_{model.__name__}')
+    post_delete.connect(log_sync_change, sender=model, dispatch_uid=f'sync_deleted_{model.__name__}')
@@ -0,0 +1,228 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .models import CatalogChange, InventoryMovement, Product, StockReservation
+from .sync import record_catalog_changes
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, quantity):
+        self.product_id = product_id
+        self.quantity = quantity
+        super().__init__(f"Not enough stock for product {product_id} (requested {quantity})")
+
+
+# First key of the PostgreSQL advisory locks that serialize stock checks per product
+STOCK_LOCK_NAMESPACE = 0x5354
+# Most products one /products/stock/ request may ask about
+MAX_STOCK_LOOKUP_IDS = 100
+
+
+def pending_movements():
+    """Subquery: the sum of a product's movements not yet folded into Product.stock."""
+    return InventoryMovement.objects.filter(
+        product=OuterRef('pk'), compacted_at__isnull=True
+    ).order_by().values('product').annotate(total=Sum('quantity')).values('total')
+
+
+def with_available_stock(queryset):
+    """Annotate a Product queryset with available_stock (snapshot plus pending movements)."""
+    return queryset.annotate(available_stock=F('stock') + Coalesce(Subquery(pending_movements()), 0))
+
+
+def available_stock(product_id):
+    """Snapshot plus pending movements, read in one statement; None for an unknown product."""
+    return with_available_stock(Product.objects.filter(pk=product_id)).values_list(
+        'available_stock', flat=True
+    ).first()
+
+
+def stock_cache_key(product_id):
+    return f'stock:{product_id}'
+
+
+def get_available_stock(product_ids):
+    """product id -> available stock, each cached for STOCK_CACHE_TTL seconds.
+
+    This is where fresh stock comes from; catalog responses show the
+    compacted snapshot and only change when compaction bumps the version.
+    """
+    keys = {stock_cache_key(product_id): product_id for product_id in product_ids}
+    levels = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [product_id for product_id in keys.values() if product_id not in levels]
+    if missing:
+        fresh = dict(with_available_stock(Product.objects.filter(pk__in=missing)).values_list('pk', 'available_stock'))
+        cache.set_many({stock_cache_key(product_id): value for product_id, value in fresh.items()}, settings.STOCK_CACHE_TTL)
+        levels.update(fresh)
+    return levels
+
+
+def forget_available_stock(product_ids):
+    """Drop the cached stock of these products once the current transaction commits."""
+    keys = [stock_cache_key(product_id) for product_id in product_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def lock_stock(product_ids):
+    """Serialize stock checks on these products until the transaction ends, without locking their rows.
+
+    PostgreSQL takes a transaction-scoped advisory lock per product, in id
+    order so concurrent callers cannot deadlock. SQLite needs none: it runs
+    one write transaction at a time.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for product_id in sorted(set(product_ids)):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [STOCK_LOCK_NAMESPACE, product_id])
+
+
+def append_movement(movement):
+    """Save a new ledger movement, or raise InsufficientStock.
+
+    Movements that add stock are plain inserts. Ones that take stock hold
+    the product's stock lock while they check snapshot plus pending, so two
+    checkouts can never both sell the last unit; the product row itself is
+    neither locked nor written.
+    """
+    product_id = movement.product_id
+    with transaction.atomic():
+        if movement.quantity < 0:
+            lock_stock([product_id])
+            stock = available_stock(product_id)
+            if stock is None or stock + movement.quantity < 0:
+                raise InsufficientStock(product_id, -movement.quantity)
+        movement.save()
+        forget_available_stock([product_id])
+    return movement
+
+
+def decrement_stock(product_id, quantity, kind=InventoryMovement.SALE, note=''):
+    """Take quantity off a product's available stock, or raise InsufficientStock."""
+    return append_movement(InventoryMovement(product_id=product_id, kind=kind, quantity=-quantity, note=note))
+
+
+def increment_stock(product_id, quantity, kind=InventoryMovement.RECEIPT, note=''):
+    return append_movement(InventoryMovement(product_id=product_id, kind=kind, quantity=quantity, note=note))
+
+
+def compact_inventory(batch_size=500):
+    """Fold pending movements into Product.stock, batch_size products per transaction.
+
+    Returns the number of movements folded. Each product takes one UPDATE
+    per batch however many sales it had since the last run.
+    """
+    folded = 0
+    while True:
+        with transaction.atomic():
+            product_ids = list(
+                InventoryMovement.objects.filter(compacted_at__isnull=True)
+                .order_by('product_id').values_list('product_id', flat=True).distinct()[:batch_size]
+            )
+            if not product_ids:
+                break
+            movements = list(
+                InventoryMovement.objects.filter(product_id__in=product_ids, compacted_at__isnull=True)
+                .values_list('id', 'product_id', 'quantity')
+            )
+            deltas = defaultdict(int)
+            for _, product_id, quantity in movements:
+                deltas[product_id] += quantity
+            now = timezone.now()
+            for product_id, delta in sorted(deltas.items()):
+                if delta:
+                    Product.objects.filter(pk=product_id).update(stock=F('stock') + delta, updated_at=now)
+            InventoryMovement.objects.filter(id__in=[row[0] for row in movements]).update(compacted_at=now)
+            changed = [product_id for product_id, delta in deltas.items() if delta]
+            if changed:
+                # update() sends no signals, so invalidate cached catalog responses here,
+                # once per batch: the snapshot stock they show only moves now
+                bump_catalog_version()
+                record_catalog_changes(CatalogChange.PRODUCT, changed)
+        folded += len(movements)
+        logger.debug("Compacted %s inventory movements for %s products", len(movements), len(product_ids))
+    return folded
+
+
+def reserve_stock(product_id, quantity, cart=None, ttl=None):
+    """Hold stock for ttl seconds (STOCK_RESERVATION_TTL by default)."""
+    ttl = settings.STOCK_RESERVATION_TTL if ttl is None else ttl
+    with transaction.atomic():
+        decrement_stock(product_id, quantity, kind=InventoryMovement.RESERVATION)
+        return StockReservation.objects.create(
+            product_id=product_id,
+            cart=cart,
+            quantity=quantity,
+            expires_at=timezone.now() + timedelta(seconds=ttl)
+        )
+
+
+def reserve_cart(cart, ttl=None):
+    """Replace the cart's holds with fresh ones covering every item, all or nothing."""
+    with transaction.atomic():
+        release_cart_reservations(cart)
+        # Consistent product order keeps concurrent reservations from deadlocking
+        items = cart.items.order_by('product_id').values_list('product_id', 'quantity')
+        return [
+            reserve_stock(product_id, quantity, cart=cart, ttl=ttl)
+            for product_id, quantity in items
+        ]
+
+
+def release_reservation(reservation):
+    """Return a hold's stock. Safe to call twice: only the caller that deletes it restocks."""
+    with transaction.atomic():
+        deleted, _ = StockReservation.objects.filter(pk=reservation.pk).delete()
+        if deleted:
+            increment_stock(reservation.product_id, reservation.quantity, kind=InventoryMovement.RELEASE)
+    return bool(deleted)
+
+
+def release_cart_reservations(cart):
+    released = 0
+    for reservation in StockReservation.objects.filter(cart=cart):
+        released += release_reservation(reservation)
+    return released
+
+
+def confirm_cart_reservations(cart):
+    """Drop the cart's holds without restocking, once the order has been placed."""
+    deleted, _ = StockReservation.objects.filter(cart=cart).delete()
+    return deleted
+
+
+def release_expired_reservations(batch_size=500, now=None):
+    """Restock and delete expired holds, batch_size at a time. Returns holds released."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.filter(expires_at__lte=now)
+                .order_by('expires_at')
+                # Concurrent sweepers take disjoint batches instead of waiting on each other
+                .select_for_update(skip_locked=True)
+                .values_list('id', 'product_id', 'quantity')[:batch_size]
+            )
+            if not batch:
+                break
+            StockReservation.objects.filter(id__in=[row[0] for row in batch]).delete()
+            quantities = defaultdict(int)
+            for _, product_id, quantity in batch:
+                quantities[product_id] += quantity
+            for product_id, quantity in sorted(quantities.items()):
+                increment_stock(product_id, quantity, kind=InventoryMovement.RELEASE)
+        released += len(batch)
+        logger.debug("Released %s expired stock reservations", len(batch))
+    return released
@@ -0,0 +1,191 @@
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import Avg, Count, FloatField, Sum
+from django.db.models.functions import Coalesce
+
+from .cache import get_catalog_version
+from .models import Brand, CBDEffect, Product
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUGGESTIONS = 8
+MAX_SUGGESTIONS = 20
+# Prefixes matching more keys than this get their best suggestions precomputed
+PRECOMPUTE_THRESHOLD = 128
+# Seconds between catalog version checks; within this window the index is served as is
+VERSION_CHECK_INTERVAL = 5
+# Rebuild in a thread after catalog changes and keep serving the old index meanwhile
+REBUILD_IN_BACKGROUND = True
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    type: str
+    id: int
+    label: str
+    slug: str
+    rank: tuple
+
+    def as_dict(self):
+        data = {'type': self.type, 'id': self.id, 'label': self.label}
+        if self.slug:
+            data['slug'] = self.slug
+        return data
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', (text or '').lower()))
+
+
+class SuggestionIndex:
+    """Prefix index over product, brand and effect names.
+
+    Every name is indexed once per word, by the text from that word to the
+    end, so "dream o" finds "Blue Dream Oil". Keys are kept sorted, so the
+    keys sharing a prefix form one contiguous range found with two bisects.
+    Suggestions are numbered best first, which makes the top N of a range
+    its N smallest positions; ranges too large to scan per request have
+    their top N computed up front.
+    """
+
+    def __init__(self, suggestions, version=None):
+        self.version = version
+        self.suggestions = sorted(suggestions, key=lambda suggestion: suggestion.rank, reverse=True)
+        keyed = sorted(
+            (key, position)
+            for position, suggestion in enumerate(self.suggestions)
+            for key in self.keys_for(suggestion.label)
+        )
+        self.keys = [key for key, _ in keyed]
+        self.positions = [position for _, position in keyed]
+        self.top = self.precompute()
+
+    @staticmethod
+    def keys_for(label):
+        words = normalize(label).split(' ')
+        return {' '.join(words[index:]) for index in range(len(words)) if words[index]}
+
+    def best(self, start, stop, limit):
+        return heapq.nsmallest(limit, set(self.positions[start:stop]))
+
+    def precompute(self):
+        """Top suggestions for every prefix matching more than PRECOMPUTE_THRESHOLD keys."""
+        top = {}
+        # (start, stop, length): a range of keys sharing their first `length` characters
+        pending = [(0, len(self.keys), 0)]
+        while pending:
+            start, stop, length = pending.pop()
+            length += 1
+            index = start
+            while index < stop:
+                key = self.keys[index]
+                if len(key) < length:
+                    # Equal to the parent prefix, already counted there
+                    index += 1
+                    continue
+                prefix = key[:length]
+                end = bisect_left(self.keys, prefix + '\uffff', index, stop)
+                if end - index > PRECOMPUTE_THRESHOLD:
+                    top[prefix] = self.best(index, end, MAX_SUGGESTIONS)
+                    pending.append((index, end, length))
+                index = end
+        return top
+
+    def search(self, query, limit=DEFAULT_SUGGESTIONS):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        if prefix in self.top:
+            positions = self.top[prefix][:limit]
+        else:
+            start = bisect_left(self.keys, prefix)
+            stop = bisect_left(self.keys, prefix + '\uffff', lo=start)
+            positions = self.best(start, stop, limit)
+        return [self.suggestions[position] for position in positions]
+
+    @classmethod
+    def build(cls, version=None):
+        suggestions = []
+        products = Product.objects.order_by().values_list('id', 'name', 'slug', 'rating', 'review_count')
+        for product_id, name, slug, rating, review_count in products.iterator(chunk_size=2000):
+            suggestions.append(Suggestion('product', product_id, name, slug, (float(rating), review_count)))
+
+        # Brands and effects rank by how well their products are rated and reviewed
+        for model, kind in ((Brand, 'brand'), (CBDEffect, 'effect')):
+            rows = model.objects.order_by().annotate(
+                avg_rating=Coalesce(Avg('products__rating'), 0, output_field=FloatField()),
+                reviews=Coalesce(Sum('products__review_count'), 0),
+                product_count=Count('products'),
+            ).filter(product_count__gt=0).values_list('id', 'name', 'avg_rating', 'reviews')
+            for row_id, name, avg_rating, reviews in rows:
+                suggestions.append(Suggestion(kind, row_id, name, '', (float(avg_rating), reviews)))
+        return cls(suggestions, version)
+
+
+_index = None
+_checked_at = 0.0
+_rebuilding = False
+_lock = threading.Lock()
+
+
+def _rebuild(version):
+    global _index
+    started = time.monotonic()
+    index = SuggestionIndex.build(version)
+    _index = index
+    logger.info(
+        "Built suggestion index v%s with %s entries in %.0fms",
+        version, len(index.suggestions), (time.monotonic() - started) * 1000
+    )
+
+
+def _rebuild_in_background(version):
+    global _rebuilding
+    try:
+        _rebuild(version)
+    except Exception as e:
+        logger.error("Suggestion index rebuild failed: %s", e)
+    finally:
+        _rebuilding = False
+        connection.close()
+
+
+def get_suggestion_index():
+    """Return this process's index, refreshing it after the catalog version changes."""
+    global _checked_at, _rebuilding
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return _index
+    _checked_at = now
+    version = get_catalog_version()
+    if _index is not None and _index.version == version:
+        return _index
+    with _lock:
+        if _index is None or not REBUILD_IN_BACKGROUND:
+            _rebuild(version)
+        elif not _rebuilding:
+            _rebuilding = True
+            threading.Thread(target=_rebuild_in_background, args=(version,), daemon=True).start()
+    return _index
+
+
+def warm_suggestion_index():
+    """Build the index at process start so the first keystroke does not pay for it."""
+    try:
+        get_suggestion_index()
+    except Exception as e:
+        # Database or cache not reachable yet; the first request builds it instead
+        logger.warning("Could not build suggestion index at startup: %s", e)
+
+
+def reset_suggestion_index():
+    global _index, _checked_at
+    _index = None
+    _checked_at = 0.0
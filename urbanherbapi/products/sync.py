@@ -0,0 +1,266 @@
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils import timezone
+
+from .models import Brand, CatalogChange, CBDEffect, Product
+from .serializers import BrandSerializer, CBDEffectSerializer, ProductSyncSerializer
+
+logger = logging.getLogger(__name__)
+
+# Most change-log rows folded into one /catalog/changes/ response; clients follow has_more
+MAX_CHANGES_PER_SYNC = 1000
+# Seconds between version checks; within this window the snapshot is served as is
+VERSION_CHECK_INTERVAL = 5
+# Snapshot files kept on disk besides the current one
+SNAPSHOTS_KEPT = 2
+SNAPSHOT_CHUNK_SIZE = 2000
+# Seconds a catalog transaction may take to commit; newer change ids are not served yet
+CHANGE_COMMIT_WINDOW = 10
+
+
+def record_catalog_changes(kind, object_ids, deleted=False):
+    """Append rows to the change log in the current transaction.
+
+    The rows commit or roll back with the write they describe, so no change
+    is lost to a crash after commit. Ids are taken at insert time, not
+    commit time; get_sync_version only hands out ids every earlier
+    transaction has had time to commit.
+    """
+    object_ids = {object_id for object_id in object_ids if object_id is not None}
+    if not object_ids:
+        return
+    CatalogChange.objects.bulk_create([
+        CatalogChange(kind=kind, object_id=object_id, deleted=deleted) for object_id in sorted(object_ids)
+    ])
+
+
+def get_sync_version():
+    """The newest change id that is safe to sync up to, 0 for an empty log.
+
+    A row logged in the last CHANGE_COMMIT_WINDOW seconds may have committed
+    ahead of a lower id that is still in flight, and a client that moved
+    past it would never see that one. Versions therefore stop below the
+    first recent row.
+    """
+    cutoff = timezone.now() - timedelta(seconds=CHANGE_COMMIT_WINDOW)
+    first_recent = CatalogChange.objects.filter(created_at__gte=cutoff).order_by('id').values_list('id', flat=True).first()
+    settled = CatalogChange.objects.order_by('-id')
+    if first_recent is not None:
+        settled = settled.filter(id__lt=first_recent)
+    return settled.values_list('id', flat=True).first() or 0
+
+
+def sync_products_queryset():
+    return Product.objects.select_related('primary_image').prefetch_related('effects').order_by('id')
+
+
+def build_snapshot(version):
+    """Serialize the whole catalog as of `version` into gzipped JSON bytes."""
+    products = [
+        ProductSyncSerializer(product).data
+        for product in sync_products_queryset().iterator(chunk_size=SNAPSHOT_CHUNK_SIZE)
+    ]
+    document = {
+        'version': version,
+        'generated_at': timezone.now(),
+        'products': products,
+        'brands': BrandSerializer(Brand.objects.order_by('id'), many=True).data,
+        'effects': CBDEffectSerializer(CBDEffect.objects.order_by('id'), many=True).data,
+    }
+    body = json.dumps(document, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+class CatalogSnapshot:
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body  # gzip-compressed JSON
+
+
+def get_snapshot_dir():
+    return Path(settings.CATALOG_SNAPSHOT_DIR)
+
+
+def snapshot_path(version):
+    return get_snapshot_dir() / f'catalog-{version}.json.gz'
+
+
+def write_snapshot(snapshot):
+    directory = get_snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    # Write then rename, so other processes never read a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(snapshot.body)
+    os.replace(tmp_path, snapshot_path(snapshot.version))
+
+    older = sorted(
+        (path for path in directory.glob('catalog-*.json.gz') if path != snapshot_path(snapshot.version)),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True
+    )
+    for path in older[SNAPSHOTS_KEPT:]:
+        path.unlink(missing_ok=True)
+
+
+def read_latest_snapshot():
+    """The newest snapshot on disk, if any."""
+    try:
+        paths = list(get_snapshot_dir().glob('catalog-*.json.gz'))
+    except OSError:
+        return None
+    versions = []
+    for path in paths:
+        try:
+            versions.append((int(path.name[len('catalog-'):-len('.json.gz')]), path))
+        except ValueError:
+            continue
+    if not versions:
+        return None
+    version, path = max(versions)
+    return CatalogSnapshot(version, path.read_bytes())
+
+
+_snapshot = None
+_checked_at = 0.0
+_rebuilding = False
+_lock = threading.Lock()
+
+
+def rebuild_snapshot(version=None):
+    """Build, store and start serving a snapshot of the current catalog."""
+    global _snapshot
+    started = time.monotonic()
+    version = get_sync_version() if version is None else version
+    snapshot = CatalogSnapshot(version, build_snapshot(version))
+    write_snapshot(snapshot)
+    _snapshot = snapshot
+    logger.info(
+        "Built catalog snapshot v%s (%s bytes) in %.0fms",
+        version, len(snapshot.body), (time.monotonic() - started) * 1000
+    )
+    return snapshot
+
+
+def _rebuild_in_background(version):
+    global _rebuilding
+    try:
+        rebuild_snapshot(version)
+    except Exception as e:
+        logger.error("Catalog snapshot rebuild failed: %s", e)
+    finally:
+        _rebuilding = False
+        connection.close()
+
+
+def get_catalog_snapshot():
+    """Return the snapshot to serve, rebuilding it in the background after catalog changes.
+
+    A snapshot a few changes old is still correct to hand out: it carries
+    its own version, and the client's next delta sync covers the gap.
+    """
+    global _snapshot, _checked_at, _rebuilding
+    now = time.monotonic()
+    if _snapshot is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return _snapshot
+    _checked_at = now
+    version = get_sync_version()
+    if _snapshot is not None and _snapshot.version == version:
+        return _snapshot
+    with _lock:
+        if _snapshot is None:
+            # Another process may already have written it
+            _snapshot = read_latest_snapshot()
+        if _snapshot is None:
+            rebuild_snapshot(version)
+        elif _snapshot.version != version and not _rebuilding:
+            _rebuilding = True
+            threading.Thread(target=_rebuild_in_background, args=(version,), daemon=True).start()
+    return _snapshot
+
+
+def reset_catalog_snapshot():
+    global _snapshot, _checked_at
+    _snapshot = None
+    _checked_at = 0.0
+
+
+class SyncVersionGone(Exception):
+    """The requested version is older than the retained change log (or from another database)."""
+
+
+def get_catalog_changes(since):
+    """Products, brands and effects upserted or deleted after version `since`.
+
+    Several changes to the same object collapse to its current state. At
+    most MAX_CHANGES_PER_SYNC log rows are read per call; `version` is the
+    last one read and `has_more` says whether to ask again from there.
+    """
+    oldest = CatalogChange.objects.order_by('id').values_list('id', flat=True).first()
+    latest = get_sync_version()
+    if since > latest or (oldest is not None and since < oldest - 1):
+        raise SyncVersionGone(since)
+
+    changes = list(
+        CatalogChange.objects.filter(id__gt=since, id__lte=latest).order_by('id')
+        .values_list('id', 'kind', 'object_id', 'deleted')[:MAX_CHANGES_PER_SYNC + 1]
+    )
+    has_more = len(changes) > MAX_CHANGES_PER_SYNC
+    changes = changes[:MAX_CHANGES_PER_SYNC]
+    version = changes[-1][0] if changes else since
+
+    # Last entry per object wins
+    final = {}
+    for _, kind, object_id, deleted in changes:
+        final[kind, object_id] = deleted
+
+    def ids(kind, deleted):
+        return sorted(object_id for (k, object_id), d in final.items() if k == kind and d == deleted)
+
+    products = list(sync_products_queryset().filter(pk__in=ids(CatalogChange.PRODUCT, False)))
+    brands = list(Brand.objects.filter(pk__in=ids(CatalogChange.BRAND, False)).order_by('id'))
+    effects = list(CBDEffect.objects.filter(pk__in=ids(CatalogChange.EFFECT, False)).order_by('id'))
+
+    def deleted_ids(kind, found):
+        # Logged as deleted, or changed and gone by now
+        present = {obj.pk for obj in found}
+        return sorted(set(ids(kind, True)) | (set(ids(kind, False)) - present))
+
+    return {
+        'since': since,
+        'version': version,
+        'has_more': has_more,
+        'products': ProductSyncSerializer(products, many=True).data,
+        'brands': BrandSerializer(brands, many=True).data,
+        'effects': CBDEffectSerializer(effects, many=True).data,
+        'deleted': {
+            'products': deleted_ids(CatalogChange.PRODUCT, products),
+            'brands': deleted_ids(CatalogChange.BRAND, brands),
+            'effects': deleted_ids(CatalogChange.EFFECT, effects),
+        },
+    }
+
+
+def prune_catalog_changes(before):
+    """Drop change-log rows older than `before` that the newest snapshot on disk already covers.
+
+    The row carrying the snapshot's own version is kept, so the log never
+    empties and versions stay monotonic. Clients synced to an older version
+    get a 410 from /catalog/changes/ and download the snapshot again.
+    """
+    snapshot = read_latest_snapshot()
+    if snapshot is None:
+        return 0
+    deleted, _ = CatalogChange.objects.filter(created_at__lt=before, id__lt=snapshot.version).delete()
+    return deleted
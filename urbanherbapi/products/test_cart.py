@@ -0,0 +1,252 @@
+import os
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .carts import REDIS_AVAILABLE, CartState, RedisCartStore, cart_fields, get_cart_store, render_cart, save_cart_items
+from .models import Cart, CartItem, Product, StockReservation, Wishlist
+from .serializers import CartSerializer
+from .test_catalog import CatalogTestCase
+
+if REDIS_AVAILABLE:
+    import redis
+
+
+class CartPricingTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.cart = Cart.objects.create(user=self.user)
+        sale = self.create_product('Sale Oil', price=Decimal('80.00'), discount_price=Decimal('20.00'))
+        full = self.create_product('Full Oil', price=Decimal('15.50'))
+        CartItem.objects.create(cart=self.cart, product=sale, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=full, quantity=1)
+
+    def test_totals_use_effective_price(self):
+        response = self.api.get(reverse('cart-current'))
+        self.assertEqual(response.status_code, 200)
+        subtotals = {item['product']['slug']: item['subtotal'] for item in response.data['items']}
+        self.assertEqual(subtotals, {'sale-oil': '40.00', 'full-oil': '15.50'})
+        self.assertEqual(response.data['total'], '55.50')
+
+    def test_totals_are_summed_by_the_database(self):
+        self.create_product('Extra Oil')
+        for product in Product.objects.exclude(cartitem__cart=self.cart):
+            CartItem.objects.create(cart=self.cart, product=product, quantity=1)
+        # One query for the cart and its total, one for the items, their subtotals and products
+        with self.assertNumQueries(2):
+            response = self.api.get(reverse('cart-current'))
+        self.assertEqual(response.data['total'], '85.49')
+
+        # Without the annotation the total is still one aggregate, discount included
+        cart = Cart.objects.get(pk=self.cart.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(cart.get_total(), Decimal('85.49'))
+
+
+class CartStateTests(CatalogTestCase):
+    """The Redis cart's database and rendering halves; fields arrive as strings, as from Redis."""
+    def setUp(self):
+        super().setUp()
+        self.cart = Cart.objects.create(user=self.user)
+        self.oil = self.create_product('Hot Oil', price=Decimal('30.00'), discount_price=Decimal('25.00'))
+        self.balm = self.create_product('Hot Balm', price=Decimal('12.50'))
+        self.gummies = self.create_product('Hot Gummies', price=Decimal('9.99'))
+
+    def state(self, quantities, updated_at=None):
+        fields = {
+            'cart': str(self.cart.pk),
+            'created': self.cart.created_at.isoformat(),
+            'updated': (updated_at or timezone.now()).isoformat(),
+        }
+        for position, (product, quantity) in enumerate(quantities, 1):
+            fields[f'q:{product.pk}'] = str(quantity)
+            fields[f'o:{product.pk}'] = str(position)
+        return CartState(self.user.pk, fields)
+
+    def test_fields_round_trip(self):
+        CartItem.objects.create(cart=self.cart, product=self.balm, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.oil, quantity=1)
+        fields = {name: str(value) for name, value in cart_fields(self.cart).items()}
+        self.assertEqual(CartState(self.user.pk, fields).quantities, {self.balm.pk: 2, self.oil.pk: 1})
+
+    def test_render_matches_serializer(self):
+        CartItem.objects.create(cart=self.cart, product=self.oil, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.balm, quantity=1)
+        expected = CartSerializer(Cart.objects.get(pk=self.cart.pk)).data
+
+        rendered = render_cart(self.state([(self.oil, 2), (self.balm, 1)], updated_at=self.cart.updated_at))
+        for item in expected['items']:
+            item['id'] = None
+        self.assertEqual(JSONRenderer().render(rendered), JSONRenderer().render(expected))
+
+        # Product cards come from the catalog cache on the next render
+        with self.assertNumQueries(0):
+            render_cart(self.state([(self.balm, 3)]))
+
+    def test_save_creates_updates_and_deletes_items(self):
+        kept = CartItem.objects.create(cart=self.cart, product=self.oil, quantity=1)
+        CartItem.objects.create(cart=self.cart, product=self.balm, quantity=1)
+
+        state = self.state([(self.oil, 4), (self.gummies, 2)])
+        self.assertTrue(save_cart_items(state))
+        self.assertEqual(
+            sorted(self.cart.items.values_list('id', 'product_id', 'quantity')),
+            sorted([(kept.pk, self.oil.pk, 4), (CartItem.objects.get(product=self.gummies).pk, self.gummies.pk, 2)])
+        )
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.updated_at, state.updated_at)
+
+    def test_older_state_is_not_saved(self):
+        newer = self.state([(self.oil, 1)])
+        save_cart_items(newer)
+        self.assertFalse(save_cart_items(self.state([(self.balm, 5)], updated_at=newer.updated_at - timedelta(seconds=1))))
+        self.assertEqual(list(self.cart.items.values_list('product_id', flat=True)), [self.oil.pk])
+
+
+@skipUnless(REDIS_AVAILABLE and os.getenv('CART_REDIS_TEST_URL'), 'Set CART_REDIS_TEST_URL to a scratch Redis database')
+class RedisCartStoreTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client_redis = redis.Redis.from_url(os.getenv('CART_REDIS_TEST_URL'), decode_responses=True)
+        self.client_redis.flushdb()
+        self.addCleanup(self.client_redis.flushdb)
+        settings_override = override_settings(CART_STORE='redis')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        store_patch = mock.patch('products.carts._store', RedisCartStore(self.client_redis))
+        store_patch.start()
+        self.addCleanup(store_patch.stop)
+
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.oil = self.create_product('Redis Oil', price=Decimal('20.00'), stock=5)
+        self.balm = self.create_product('Redis Balm', price=Decimal('7.50'), stock=5)
+
+    def test_taps_stay_in_redis_until_flushed(self):
+        # The first tap loads the cart; product cards are cached as they are first seen
+        self.api.post(reverse('cart-add'), {'product_id': self.oil.pk, 'quantity': 1})
+        self.api.post(reverse('cart-add'), {'product_id': self.balm.pk, 'quantity': 1})
+        with self.assertNumQueries(0):
+            self.api.post(reverse('cart-add'), {'product_id': self.oil.pk, 'quantity': 2})
+            response = self.api.post(reverse('cart-update-quantity'), {'product_id': self.balm.pk, 'quantity': 2})
+        self.assertEqual([item['quantity'] for item in response.data['items']], [3, 2])
+        self.assertEqual(response.data['total'], '75.00')
+        self.assertFalse(CartItem.objects.exists())
+
+        self.assertEqual(get_cart_store().flush_dirty(), 1)
+        self.assertEqual(
+            sorted(CartItem.objects.values_list('product_id', 'quantity')),
+            sorted([(self.oil.pk, 3), (self.balm.pk, 2)])
+        )
+
+    def test_unknown_product_is_taken_back_out(self):
+        self.api.post(reverse('cart-add'), {'product_id': self.oil.pk, 'quantity': 1})
+        response = self.api.post(reverse('cart-add'), {'product_id': self.balm.pk + 100, 'quantity': 1})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(get_cart_store().read(self.user).quantities, {self.oil.pk: 1})
+
+    def test_database_cart_is_loaded_and_checkout_flushes(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.oil, quantity=1)
+        response = self.api.post(reverse('cart-add'), {'product_id': self.oil.pk, 'quantity': 1})
+        self.assertEqual(response.data['items'][0]['quantity'], 2)
+
+        response = self.api.post(reverse('cart-update-quantity'), {'product_id': self.balm.pk, 'quantity': 1})
+        self.assertEqual(response.status_code, 404)
+
+        self.assertEqual(self.api.post(reverse('cart-reserve')).status_code, 200)
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+
+    def test_wishlist_moves_into_the_redis_cart(self):
+        wishlist = Wishlist.objects.create(user=self.user)
+        wishlist.products.add(self.oil)
+        response = self.api.post(
+            reverse('wishlist-move-to-cart', kwargs={'pk': wishlist.pk}), {'product_id': self.oil.pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(get_cart_store().read(self.user).quantities, {self.oil.pk: 1})
+
+    def test_batch_is_one_script_call(self):
+        self.api.post(reverse('cart-add'), {'product_id': self.oil.pk, 'quantity': 1})
+        self.api.post(reverse('cart-add'), {'product_id': self.balm.pk, 'quantity': 1})
+        operations = [
+            {'op': 'remove', 'product_id': self.oil.pk},
+            {'op': 'add', 'product_id': self.balm.pk, 'quantity': 2},
+            {'op': 'set', 'product_id': self.oil.pk, 'quantity': 5},
+        ]
+        with self.assertNumQueries(0):
+            response = self.api.post(reverse('cart-batch'), {'operations': operations}, format='json')
+        self.assertEqual(
+            [(item['product']['slug'], item['quantity']) for item in response.data['items']],
+            [('redis-balm', 3), ('redis-oil', 5)]
+        )
+
+
+class CartBatchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.oil = self.create_product('Batch Oil', price=Decimal('20.00'))
+        self.balm = self.create_product('Batch Balm', price=Decimal('7.50'))
+        self.gummies = self.create_product('Batch Gummies', price=Decimal('5.00'))
+
+    def batch(self, *operations):
+        return self.api.post(reverse('cart-batch'), {'operations': list(operations)}, format='json')
+
+    def test_operations_apply_in_order(self):
+        cart = Cart.objects.create(user=self.user)
+        kept = CartItem.objects.create(cart=cart, product=self.oil, quantity=1)
+        CartItem.objects.create(cart=cart, product=self.balm, quantity=3)
+
+        response = self.batch(
+            {'op': 'add', 'product_id': self.oil.pk, 'quantity': 2},
+            {'op': 'remove', 'product_id': self.balm.pk},
+            {'op': 'add', 'product_id': self.gummies.pk, 'quantity': 1},
+            {'op': 'set', 'product_id': self.gummies.pk, 'quantity': 4},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['product']['slug'], item['quantity']) for item in response.data['items']],
+            [('batch-oil', 3), ('batch-gummies', 4)]
+        )
+        self.assertEqual(response.data['total'], '80.00')
+        # Existing rows are updated in place
+        self.assertEqual(CartItem.objects.get(product=self.oil).pk, kept.pk)
+
+    def test_query_count_does_not_grow_with_operations(self):
+        operations = [
+            {'op': 'add', 'product_id': product.pk, 'quantity': 1}
+            for product in (self.oil, self.balm, self.gummies)
+        ]
+        self.batch(*operations)
+        # Products, cart (get_or_create, lock), items, one bulk UPDATE, cart timestamp,
+        # savepoint pair and the response (cart with its total, items with their products)
+        with self.assertNumQueries(10):
+            self.batch(*operations)
+        with self.assertNumQueries(10):
+            self.batch(*operations, *operations, *operations)
+
+    def test_unknown_product_rejects_the_whole_batch(self):
+        response = self.batch(
+            {'op': 'add', 'product_id': self.oil.pk, 'quantity': 1},
+            {'op': 'add', 'product_id': 999999, 'quantity': 1},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['product_ids'], [999999])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_operations_are_validated(self):
+        self.assertEqual(self.batch().status_code, 400)
+        self.assertEqual(self.batch({'op': 'set', 'product_id': self.oil.pk}).status_code, 400)
+        self.assertEqual(self.batch({'op': 'add', 'product_id': self.oil.pk, 'quantity': 0}).status_code, 400)
+        self.assertEqual(self.batch({'op': 'swap', 'product_id': self.oil.pk}).status_code, 400)
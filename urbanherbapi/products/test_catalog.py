@@ -0,0 +1,232 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .cache import CATALOG_VERSION_KEY, bump_catalog_version, get_catalog_last_modified, get_catalog_version
+from .models import Brand, CatalogChange, CBDEffect, Product, ProductImage, Review
+
+User = get_user_model()
+
+
+def delete_sample_catalog():
+    """Drop the rows migration 0002_sample_data seeds, so tests start from an empty catalog."""
+    Product.objects.all().delete()
+    Brand.objects.all().delete()
+    CBDEffect.objects.all().delete()
+    CatalogChange.objects.all().delete()
+
+
+class CatalogTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        delete_sample_catalog()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.brand = Brand.objects.create(name='Catalog Brand', description='Catalog brand')
+        self.user = User.objects.create_user(email='catalog_user@example.com', password='testpass123')
+
+    def create_product(self, name, **kwargs):
+        kwargs.setdefault('description', f'{name} description')
+        kwargs.setdefault('category', 'TINCTURES')
+        kwargs.setdefault('price', Decimal('29.99'))
+        kwargs.setdefault('stock', 10)
+        return Product.objects.create(name=name, brand=kwargs.pop('brand', self.brand), **kwargs)
+
+
+class ProductCardTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('Card Oil', discount_price=Decimal('19.99'))
+        ProductImage.objects.create(product=self.product, image='https://example.com/a.jpg', alt_text='a')
+        ProductImage.objects.create(
+            product=self.product, image='https://example.com/b.jpg', alt_text='b', is_primary=True
+        )
+        Review.objects.create(product=self.product, user=self.user, rating=4, title='Ok', content='Ok')
+
+    def test_list_returns_cards(self):
+        response = self.client.get(reverse('product-list'))
+        card = response.data['results'][0]
+
+        self.assertNotIn('reviews', card)
+        self.assertNotIn('description', card)
+        self.assertEqual(card['brand_name'], 'Catalog Brand')
+        self.assertEqual(card['primary_image'], 'https://example.com/b.jpg')
+        self.assertEqual(card['effective_price'], 19.99)
+        self.assertEqual(card['average_rating'], 4.0)
+        self.assertTrue(card['in_stock'])
+
+    def test_retrieve_returns_full_product(self):
+        response = self.client.get(reverse('product-detail', kwargs={'slug': self.product.slug}))
+
+        self.assertEqual(len(response.data['reviews']), 1)
+        self.assertEqual(len(response.data['images']), 2)
+        self.assertEqual(response.data['brand']['name'], 'Catalog Brand')
+
+
+class CatalogPaginationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        # Repeated prices and names force the id tie-breaker to do its job
+        for i in range(25):
+            self.create_product(f'Product {i % 7}', slug=f'product-{i}', price=Decimal(10 + i % 3))
+
+    def walk(self, params):
+        seen = []
+        response = self.client.get(reverse('product-list'), params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(card['id'] for card in response.data['results'])
+            if not response.data['next']:
+                return seen
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_walks_every_ordering_without_gaps(self):
+        expected = set(Product.objects.values_list('id', flat=True))
+        for ordering in ['-created_at', 'price', '-price', 'rating', 'name', '-name']:
+            with self.subTest(ordering=ordering):
+                seen = self.walk({'ordering': ordering})
+                self.assertEqual(len(seen), len(expected))
+                self.assertEqual(set(seen), expected)
+
+    def test_cursor_respects_sort_order(self):
+        seen = self.walk({'ordering': '-price'})
+        prices = [Product.objects.get(pk=pk).price for pk in seen]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+
+    def test_page_number_mode_is_still_available(self):
+        response = self.client.get(reverse('product-list'), {'page': 2})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('product-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class CatalogQueryCountTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(15):
+            product = self.create_product(f'Counted {i}', category='EDIBLES' if i % 2 else 'TINCTURES')
+            ProductImage.objects.create(product=product, image=f'https://example.com/{i}.jpg', alt_text='x')
+        # Seed Last-Modified once so only the list itself is counted
+        get_catalog_last_modified()
+
+    def test_cursor_list_queries(self):
+        # One page of products joined to brand and primary image
+        with self.assertNumQueries(1):
+            self.client.get(reverse('product-list'), {'category': 'EDIBLES'})
+
+    def test_page_list_counts_once_then_hits_cache(self):
+        url = reverse('product-list')
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'category': 'EDIBLES', 'page': 1})
+        self.assertEqual(response.data['count'], 7)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'category': 'EDIBLES', 'page': 1, 'ordering': 'price'})
+        self.assertEqual(response.data['count'], 7)
+
+        # A different filter set has its own count
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'category': 'TINCTURES', 'page': 1})
+        self.assertEqual(response.data['count'], 8)
+
+
+class CatalogResponseCacheTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('Cached Oil')
+
+    def test_read_endpoints_served_from_cache(self):
+        for url in [
+            reverse('product-list'),
+            reverse('product-detail', kwargs={'slug': self.product.slug}),
+            reverse('brand-list'),
+            reverse('effect-list'),
+        ]:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(first.data, second.data)
+
+    def test_catalog_writes_invalidate(self):
+        url = reverse('product-detail', kwargs={'slug': self.product.slug})
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=self.user, rating=2, title='Meh', content='Meh')
+        response = self.client.get(url)
+        self.assertEqual(response.data['review_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=self.product, image='https://example.com/new.jpg', alt_text='new')
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['images']), 1)
+
+
+class ConditionalGetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('Conditional Oil')
+
+    def test_not_modified_without_queries(self):
+        for url in [
+            reverse('product-list'),
+            reverse('product-detail', kwargs={'slug': self.product.slug}),
+            reverse('brand-list'),
+        ]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                etag = response['ETag']
+
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_catalog(self):
+        url = reverse('product-detail', kwargs={'slug': self.product.slug})
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock = 0
+            self.product.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_lost_version_counter_does_not_reuse_versions(self):
+        url = reverse('product-detail', kwargs={'slug': self.product.slug})
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_catalog_version()
+        version, etag = get_catalog_version(), self.client.get(url)['ETag']
+
+        cache.delete(CATALOG_VERSION_KEY)
+        self.assertGreater(get_catalog_version(), version)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_not_modified(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('user-profile')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.urls import reverse
+
+from .models import Brand, CBDEffect
+from .test_catalog import CatalogTestCase
+
+
+class ProductFacetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_brand = Brand.objects.create(name='Other Brand')
+        self.sleep = CBDEffect.objects.create(name='Sleep', description='Sleep')
+        self.focus = CBDEffect.objects.create(name='Focus', description='Focus')
+
+        oil = self.create_product('Oil', price=Decimal('20.00'), strain='CBD')
+        oil.effects.add(self.sleep)
+        gummies = self.create_product('Gummies', category='EDIBLES', price=Decimal('30.00'))
+        gummies.effects.add(self.sleep, self.focus)
+        self.create_product('Flower', category='FLOWERS', price=Decimal('120.00'), brand=self.other_brand)
+
+    def facets(self, **params):
+        response = self.client.get(reverse('product-facets'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def counts(self, facet):
+        return {row['value']: row['count'] for row in facet}
+
+    def test_unfiltered_facets(self):
+        data = self.facets()
+        self.assertEqual(self.counts(data['category']), {'TINCTURES': 1, 'EDIBLES': 1, 'FLOWERS': 1})
+        self.assertEqual(self.counts(data['strain']), {'CBD': 1, 'NA': 2})
+        self.assertEqual(self.counts(data['brand']), {self.brand.id: 2, self.other_brand.id: 1})
+        self.assertEqual(self.counts(data['effect']), {self.sleep.id: 2, self.focus.id: 1})
+        self.assertEqual([bucket['count'] for bucket in data['price']], [1, 1, 0, 1])
+
+    def test_facet_ignores_its_own_filter(self):
+        data = self.facets(category='EDIBLES')
+        # Other categories stay selectable, while the remaining facets narrow down
+        self.assertEqual(self.counts(data['category']), {'TINCTURES': 1, 'EDIBLES': 1, 'FLOWERS': 1})
+        self.assertEqual(self.counts(data['effect']), {self.sleep.id: 1, self.focus.id: 1})
+        self.assertEqual(self.counts(data['brand']), {self.brand.id: 1})
+
+    def test_products_matching_several_effects_count_once(self):
+        # The effects join yields one row per matching effect
+        data = self.facets(effects=[self.sleep.id, self.focus.id])
+        self.assertEqual(self.counts(data['category']), {'TINCTURES': 1, 'EDIBLES': 1})
+        self.assertEqual(self.counts(data['strain']), {'CBD': 1, 'NA': 1})
+        self.assertEqual(self.counts(data['brand']), {self.brand.id: 2})
+        self.assertEqual([bucket['count'] for bucket in data['price']], [1, 1, 0, 0])
+
+    def test_cached_until_catalog_changes(self):
+        self.facets()
+        with self.assertNumQueries(0):
+            self.facets()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_product('Vape', category='VAPES')
+        data = self.facets()
+        self.assertEqual(self.counts(data['category'])['VAPES'], 1)
@@ -0,0 +1,78 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from .cache import get_catalog_last_modified
+from .feeds import accepts_gzip
+from .models import ProductImage
+from .test_catalog import CatalogTestCase
+
+
+class ProductFeedTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.oil = self.create_product('Feed Oil', discount_price=Decimal('19.99'))
+        ProductImage.objects.create(product=self.oil, image='https://example.com/a.jpg', alt_text='a')
+        ProductImage.objects.create(
+            product=self.oil, image='https://example.com/b.jpg', alt_text='b', is_primary=True
+        )
+        self.balm = self.create_product('Feed Balm', category='TOPICALS')
+
+    def test_ndjson_feed(self):
+        get_catalog_last_modified()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('product-feed'))
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['slug'] for row in rows], [self.oil.slug, self.balm.slug])
+        self.assertEqual(rows[0]['brand'], self.brand.name)
+        self.assertEqual(rows[0]['discount_price'], '19.99')
+        self.assertEqual(rows[0]['image'], 'https://example.com/b.jpg')
+        self.assertIsNone(rows[1]['image'])
+
+    def test_gzipped_csv_feed_with_filters(self):
+        response = self.client.get(
+            reverse('product-feed'), {'output': 'csv', 'category': 'TOPICALS'}, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row['slug'] for row in rows], [self.balm.slug])
+        self.assertEqual(rows[0]['discount_price'], '')
+
+    def test_gzipped_feed_has_a_weak_etag(self):
+        url = reverse('product-feed')
+        plain = self.client.get(url)['ETag']
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        self.assertFalse(plain.startswith('W/'))
+        self.assertEqual(compressed, f'W/{plain}')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=compressed)
+        self.assertEqual(response.status_code, 304)
+
+    def test_gzip_refused_with_zero_quality(self):
+        response = self.client.get(reverse('product-feed'), HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertTrue(accepts_gzip('br, *;q=0.5'))
+        self.assertFalse(accepts_gzip('*, gzip;q=0'))
+        self.assertFalse(accepts_gzip('identity'))
+
+    def test_unknown_output(self):
+        response = self.client.get(reverse('product-feed'), {'output': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'feed.ndjson.gz')
+            call_command('export_catalog', path, '--gzip', stdout=io.StringIO())
+            with gzip.open(path, 'rt') as handle:
+                slugs = [json.loads(line)['slug'] for line in handle]
+        self.assertEqual(slugs, [self.oil.slug, self.balm.slug])
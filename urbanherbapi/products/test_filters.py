@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+from django.urls import reverse
+
+from .models import Product
+from .test_catalog import CatalogTestCase
+
+
+class ProductFilterTests(CatalogTestCase):
+    def slugs(self, **params):
+        response = self.client.get(reverse('product-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(product['slug'] for product in response.data['results'])
+
+    def test_benefit_filter_matches_whole_elements(self):
+        self.create_product('Sleep Oil', benefits=['Better Sleep', 'Calm'])
+        self.create_product('Calm Balm', benefits=['Calm'])
+        self.create_product('Plain Oil')
+
+        self.assertEqual(self.slugs(benefit='Calm'), ['calm-balm', 'sleep-oil'])
+        self.assertEqual(self.slugs(benefit='Better Sleep'), ['sleep-oil'])
+        self.assertEqual(self.slugs(benefit='Sleep'), [])
+
+    def test_benefits_returned_as_stored(self):
+        product = self.create_product('Listed Oil', benefits=['Focus', 'Energy'])
+        response = self.client.get(reverse('product-detail', kwargs={'slug': product.slug}))
+        self.assertEqual(response.data['benefits'], ['Focus', 'Energy'])
+
+
+class PotencyFilterTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_product('Strong Flower', category='FLOWERS', thc_content='0.3%', cbd_content='18%')
+        self.create_product('Mild Flower', category='FLOWERS', thc_content='<0.3%', cbd_content='9 %')
+        self.create_product('Oil 1000', thc_content='0.2%', cbd_content='1000mg')
+        self.create_product('Gummies', category='EDIBLES', cbd_content='25mg per gummy')
+
+    def slugs(self, **params):
+        response = self.client.get(reverse('product-list'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(product['slug'] for product in response.data['results'])
+
+    def test_potency_is_parsed_on_save(self):
+        product = self.create_product('Parsed', thc_content='1.5 g', cbd_content='n/a')
+        self.assertEqual((product.thc_value, product.thc_unit), (Decimal('1500'), 'MG'))
+        self.assertEqual((product.cbd_value, product.cbd_unit), (None, ''))
+
+        product.cbd_content = '12%'
+        product.save(update_fields=['cbd_content'])
+        product.refresh_from_db()
+        self.assertEqual((product.cbd_value, product.cbd_unit), (Decimal('12'), 'PERCENT'))
+
+    def test_percent_ranges(self):
+        self.assertEqual(self.slugs(min_cbd='15'), ['strong-flower'])
+        self.assertEqual(self.slugs(min_cbd='5%', max_cbd='10%'), ['mild-flower'])
+        self.assertEqual(self.slugs(max_thc='0.25'), ['oil-1000'])
+
+    def test_milligram_ranges_only_match_milligrams(self):
+        self.assertEqual(self.slugs(min_cbd='500mg'), ['oil-1000'])
+        self.assertEqual(self.slugs(max_cbd='100mg'), ['gummies'])
+
+    def test_invalid_potency(self):
+        response = self.client.get(reverse('product-list'), {'min_thc': 'lots'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('min_thc', response.data)
+
+
+class EffectivePriceTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_product('Sale Oil', price=Decimal('80.00'), discount_price=Decimal('20.00'))
+        self.create_product('Full Oil', price=Decimal('40.00'))
+        self.create_product('Dear Oil', price=Decimal('60.00'))
+
+    def slugs(self, **params):
+        response = self.client.get(reverse('product-list'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [product['slug'] for product in response.data['results']]
+
+    def test_effective_price_follows_discount(self):
+        product = Product.objects.get(slug='full-oil')
+        self.assertEqual(product.effective_price, Decimal('40.00'))
+        product.discount_price = Decimal('35.00')
+        product.save(update_fields=['discount_price'])
+        product.refresh_from_db()
+        self.assertEqual(product.effective_price, Decimal('35.00'))
+
+    def test_price_range_uses_effective_price(self):
+        self.assertEqual(sorted(self.slugs(max_price='30')), ['sale-oil'])
+        self.assertEqual(sorted(self.slugs(min_price='30', max_price='50')), ['full-oil'])
+
+    def test_price_ordering_uses_effective_price(self):
+        self.assertEqual(self.slugs(ordering='price'), ['sale-oil', 'full-oil', 'dear-oil'])
+        self.assertEqual(self.slugs(ordering='-price'), ['dear-oil', 'full-oil', 'sale-oil'])
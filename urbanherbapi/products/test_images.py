@@ -0,0 +1,278 @@
+import io
+import shutil
+import tempfile
+import socket
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .blurhash import encode_blurhash
+from .cache import get_catalog_last_modified
+from .images import CLAIM_TIMEOUT, ImageProcessingError, check_source_url, process_pending_images, source_opener
+from .models import Brand, Product, ProductImage, ProductImageVariant
+from .test_catalog import delete_sample_catalog
+
+User = get_user_model()
+
+
+def make_image_bytes(width, height, image_format='PNG'):
+    image = Image.new('RGB', (width, height))
+    image.putdata([(x * 255 // width, y * 255 // height, 128) for y in range(height) for x in range(width)])
+    buffer = io.BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class FakeResponse(io.BytesIO):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def resolve_to(address):
+    """Make every host name resolve to address (None: no lookup is expected)."""
+    if address is None:
+        return mock.patch('socket.getaddrinfo', side_effect=AssertionError('unexpected lookup'))
+    family = socket.AF_INET6 if ':' in address else socket.AF_INET
+    return mock.patch('socket.getaddrinfo', return_value=[(family, socket.SOCK_STREAM, 6, '', (address, 80))])
+
+
+class ImagePipelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        delete_sample_catalog()
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+        brand = Brand.objects.create(name='Image Brand')
+        self.product = Product.objects.create(
+            name='Pictured Oil', description='Pictured', brand=brand,
+            category='TINCTURES', price=Decimal('29.99'), stock=5
+        )
+
+    def test_upload_is_queued_then_processed(self):
+        admin = User.objects.create_superuser(email='images_admin@example.com', password='adminpass123')
+        client = APIClient()
+        client.force_authenticate(admin)
+        upload = SimpleUploadedFile('oil.png', make_image_bytes(800, 400), content_type='image/png')
+
+        response = client.post(
+            reverse('product-images', kwargs={'product_pk': self.product.pk}),
+            {'upload': upload, 'alt_text': 'Oil', 'is_primary': True},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['processing_status'], ProductImage.PENDING)
+        self.assertEqual(response.data['srcset'], {})
+
+        self.assertEqual(process_pending_images(), (1, 0))
+
+        image = ProductImage.objects.get(pk=response.data['id'])
+        self.assertEqual(image.processing_status, ProductImage.READY)
+        self.assertEqual((image.width, image.height), (800, 400))
+        self.assertEqual(len(image.blurhash), 28)
+        variants = list(image.variants.all())
+        self.assertEqual(
+            sorted((variant.format, variant.width, variant.height) for variant in variants),
+            [('jpeg', 320, 160), ('jpeg', 640, 320), ('jpeg', 800, 400),
+             ('webp', 320, 160), ('webp', 640, 320), ('webp', 800, 400)]
+        )
+        self.assertTrue(all(variant.size > 0 for variant in variants))
+        self.assertEqual(image.srcset['webp'].count('w,'), 2)
+        self.assertTrue(image.srcset['jpeg'].endswith('800w'))
+        # Uploads get the largest JPEG as their plain URL, without being queued again
+        self.assertTrue(image.image.endswith('.jpeg'))
+        self.assertEqual(ProductImage.objects.filter(processing_status=ProductImage.PENDING).count(), 0)
+
+        detail = APIClient().get(reverse('product-detail', kwargs={'slug': self.product.slug}))
+        self.assertEqual(detail.data['images'][0]['srcset'], image.srcset)
+        cards = APIClient().get(reverse('product-list'))
+        self.assertEqual(cards.data['results'][0]['primary_image_srcset'], image.srcset)
+
+    def test_remote_image_is_fetched(self):
+        image = ProductImage.objects.create(
+            product=self.product, image='https://cdn.example.com/oil.jpg', alt_text='Oil'
+        )
+        with resolve_to('93.184.216.34'), mock.patch.object(
+            source_opener, 'open', return_value=FakeResponse(make_image_bytes(300, 300, 'JPEG'))
+        ):
+            call_command('process_images', stdout=io.StringIO())
+
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, ProductImage.READY)
+        self.assertEqual(image.image, 'https://cdn.example.com/oil.jpg')
+        # Smaller than every configured width: a single variant at the original size
+        self.assertEqual(list(image.variants.values_list('width', flat=True)), [300, 300])
+
+    def test_only_public_http_sources_are_fetched(self):
+        for url, address in [
+            ('file:///etc/passwd', None),
+            ('ftp://cdn.example.com/oil.jpg', None),
+            ('http://127.0.0.1/oil.jpg', '127.0.0.1'),
+            ('http://metadata.internal/latest', '169.254.169.254'),
+            ('https://intranet.example.com/oil.jpg', '10.0.0.7'),
+            ('http://[::1]/oil.jpg', '::1'),
+        ]:
+            with self.subTest(url=url), resolve_to(address), self.assertRaises(ImageProcessingError):
+                check_source_url(url)
+        with resolve_to('93.184.216.34'):
+            check_source_url('https://cdn.example.com/oil.jpg')
+
+    def test_private_source_fails_without_a_request(self):
+        image = ProductImage.objects.create(product=self.product, image='http://10.0.0.7/oil.jpg', alt_text='Oil')
+        with resolve_to('10.0.0.7'), mock.patch.object(source_opener, 'open') as fetch:
+            self.assertEqual(process_pending_images(), (0, 1))
+        fetch.assert_not_called()
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, ProductImage.FAILED)
+
+    def test_abandoned_claims_are_taken_over(self):
+        stale, fresh = [
+            ProductImage.objects.create(
+                product=self.product, alt_text=name,
+                upload=SimpleUploadedFile(f'{name}.png', make_image_bytes(100, 100))
+            )
+            for name in ('stale', 'fresh')
+        ]
+        now = timezone.now()
+        ProductImage.objects.filter(pk=stale.pk).update(
+            processing_status=ProductImage.PROCESSING, claimed_at=now - timedelta(seconds=CLAIM_TIMEOUT + 1)
+        )
+        ProductImage.objects.filter(pk=fresh.pk).update(processing_status=ProductImage.PROCESSING, claimed_at=now)
+
+        self.assertEqual(process_pending_images(), (1, 0))
+        self.assertEqual(
+            dict(ProductImage.objects.values_list('alt_text', 'processing_status')),
+            {'stale': ProductImage.READY, 'fresh': ProductImage.PROCESSING}
+        )
+
+    def test_undecodable_image_fails_and_can_be_retried(self):
+        image = ProductImage.objects.create(
+            product=self.product, alt_text='Broken',
+            upload=SimpleUploadedFile('broken.png', b'not an image')
+        )
+        self.assertEqual(process_pending_images(), (0, 1))
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, ProductImage.FAILED)
+
+        image.upload = SimpleUploadedFile('fixed.png', make_image_bytes(100, 50))
+        image.save()
+        self.assertEqual(image.processing_status, ProductImage.PENDING)
+        self.assertEqual(process_pending_images(), (1, 0))
+
+    def test_reprocessing_replaces_variants_and_files(self):
+        image = ProductImage.objects.create(
+            product=self.product, alt_text='Oil',
+            upload=SimpleUploadedFile('oil.png', make_image_bytes(400, 400))
+        )
+        process_pending_images()
+        old_files = [variant.file for variant in ProductImageVariant.objects.filter(image=image)]
+
+        image = ProductImage.objects.get(pk=image.pk)
+        image.upload = SimpleUploadedFile('oil2.png', make_image_bytes(200, 200))
+        image.save()
+        process_pending_images()
+
+        self.assertEqual(list(image.variants.values_list('width', flat=True)), [200, 200])
+        self.assertFalse(any(old.storage.exists(old.name) for old in old_files))
+
+
+class BlurhashTests(TestCase):
+    def test_solid_colour(self):
+        # A DC-only hash is the size flag, a zero AC maximum and the colour as 0xFF0000
+        pixels = [(255, 0, 0)] * 16
+        self.assertEqual(encode_blurhash(pixels, 4, 4, 1, 1), '00TI:j')
+
+    def test_component_count_is_encoded(self):
+        pixels = [(x * 60, y * 60, 100) for y in range(4) for x in range(4)]
+        blurhash = encode_blurhash(pixels, 4, 4, 4, 3)
+        self.assertEqual(blurhash[0], 'L')
+        self.assertEqual(len(blurhash), 6 + 2 * 11)
+
+
+class PrimaryImageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        delete_sample_catalog()
+
+    def setUp(self):
+        cache.clear()
+        brand = Brand.objects.create(name='Primary Brand')
+        self.product = Product.objects.create(
+            name='Primary Oil', description='Primary', brand=brand,
+            category='TINCTURES', price=Decimal('19.99'), stock=5
+        )
+
+    def add_image(self, name, is_primary=False, product=None):
+        return ProductImage.objects.create(
+            product=product or self.product, image=f'https://cdn.example.com/{name}.jpg',
+            alt_text=name, is_primary=is_primary
+        )
+
+    def primary(self):
+        self.product.refresh_from_db()
+        return self.product.primary_image
+
+    def test_first_image_until_one_is_marked_primary(self):
+        first = self.add_image('first')
+        self.assertEqual(self.primary(), first)
+        second = self.add_image('second', is_primary=True)
+        self.assertEqual(self.primary(), second)
+
+    def test_single_primary_per_product(self):
+        first = self.add_image('first', is_primary=True)
+        second = self.add_image('second', is_primary=True)
+
+        first.refresh_from_db()
+        self.assertFalse(first.is_primary)
+        self.assertEqual(self.primary(), second)
+        self.assertEqual(self.product.images.filter(is_primary=True).count(), 1)
+
+    def test_falls_back_when_primary_is_removed(self):
+        first = self.add_image('first')
+        second = self.add_image('second', is_primary=True)
+
+        second.delete()
+        self.assertEqual(self.primary(), first)
+        first.delete()
+        self.assertIsNone(self.primary())
+
+    def test_moving_an_image_resyncs_both_products(self):
+        other = Product.objects.create(
+            name='Other Oil', description='Other', brand=self.product.brand,
+            category='TINCTURES', price=Decimal('9.99')
+        )
+        image = ProductImage.objects.get(pk=self.add_image('moved', is_primary=True).pk)
+        image.product = other
+        image.save()
+
+        self.assertIsNone(self.primary())
+        other.refresh_from_db()
+        self.assertEqual(other.primary_image, image)
+
+    def test_list_uses_primary_image_without_prefetch(self):
+        self.add_image('first')
+        self.add_image('second', is_primary=True)
+        get_catalog_last_modified()
+
+        with self.assertNumQueries(1):
+            response = APIClient().get(reverse('product-list'))
+        self.assertEqual(response.data['results'][0]['primary_image'], 'https://cdn.example.com/second.jpg')
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .models import Brand, CBDEffect, InventoryMovement, Product, ProductImage
+from .search import build_search_document
+from .stock import available_stock
+from .test_catalog import delete_sample_catalog
+
+CSV_CATALOG = """slug,name,brand,category,strain,price,discount_price,stock,effects,benefits,images,lab_tested
+night-oil,Night Oil,Moon Co,tinctures,indica,39.99,,12,Sleep|Calm,Rest|Recovery,https://example.com/n1.jpg|https://example.com/n2.jpg,yes
+day-gummies,Day Gummies,Sun Co,EDIBLES,SATIVA,19.50,15.00,40,Focus,,,no
+broken,Broken,Sun Co,NOT_A_CATEGORY,,10,,1,,,,
+"""
+
+
+class ImportCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        delete_sample_catalog()
+
+    def import_file(self, content, suffix, **options):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(os.unlink, handle.name)
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_catalog', handle.name, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv_import(self):
+        stdout, stderr = self.import_file(CSV_CATALOG, '.csv', chunk_size=2)
+        self.assertIn('2 created, 0 updated, 1 rejected', stdout)
+        self.assertIn('Row 3: invalid category', stderr)
+
+        oil = Product.objects.get(slug='night-oil')
+        self.assertEqual(oil.brand.name, 'Moon Co')
+        self.assertEqual(oil.category, 'TINCTURES')
+        self.assertEqual(oil.price, Decimal('39.99'))
+        self.assertTrue(oil.lab_tested)
+        self.assertEqual(oil.benefits, ['Rest', 'Recovery'])
+        self.assertEqual(sorted(oil.effects.values_list('name', flat=True)), ['Calm', 'Sleep'])
+        self.assertEqual(
+            list(oil.images.order_by('-is_primary', 'id').values_list('image', 'is_primary')),
+            [('https://example.com/n1.jpg', True), ('https://example.com/n2.jpg', False)]
+        )
+        self.assertEqual(oil.search_document, build_search_document(oil))
+        self.assertEqual(Brand.objects.count(), 2)
+
+    def test_malformed_json_lines_are_rejected(self):
+        content = '\n'.join([
+            '{"name": "Good Oil", "brand": "Moon Co", "category": "TINCTURES", "price": 10}',
+            '{"name": "Cut off',
+            '["not", "an", "object"]',
+            '{"name": "Late Oil", "brand": "Moon Co", "category": "TINCTURES", "price": 11}',
+        ])
+        stdout, stderr = self.import_file(content, '.jsonl')
+        self.assertIn('2 created, 0 updated, 2 rejected', stdout)
+        self.assertIn('Row 2: invalid JSON', stderr)
+        self.assertIn('Row 3: expected an object, got list', stderr)
+        self.assertEqual(sorted(Product.objects.values_list('slug', flat=True)), ['good-oil', 'late-oil'])
+
+    def test_reimport_updates_in_place(self):
+        self.import_file(CSV_CATALOG, '.csv')
+        created_at = Product.objects.get(slug='night-oil').created_at
+
+        rows = [
+            {'slug': 'night-oil', 'name': 'Night Oil 2', 'brand': 'Moon Co', 'category': 'TINCTURES',
+             'price': '35.00', 'stock': 3, 'effects': ['Sleep']},
+            {'name': 'Fresh Balm', 'brand': 'Moon Co', 'category': 'TOPICALS', 'price': 12},
+        ]
+        stdout, _ = self.import_file('\n'.join(json.dumps(row) for row in rows), '.jsonl')
+        self.assertIn('1 created, 1 updated, 0 rejected', stdout)
+
+        oil = Product.objects.get(slug='night-oil')
+        self.assertEqual(oil.name, 'Night Oil 2')
+        # The new count is a ledger adjustment, not an overwrite of the snapshot
+        self.assertEqual(oil.stock, 12)
+        self.assertEqual(available_stock(oil.pk), 3)
+        self.assertEqual(
+            list(oil.movements.values_list('kind', 'quantity')), [(InventoryMovement.ADJUSTMENT, -9)]
+        )
+        self.assertEqual(oil.created_at, created_at)
+        self.assertEqual(list(oil.effects.values_list('name', flat=True)), ['Sleep'])
+        # Rows without an images column keep their existing images
+        self.assertEqual(oil.images.count(), 2)
+        self.assertTrue(Product.objects.filter(slug='fresh-balm').exists())
+        self.assertEqual(Brand.objects.count(), 2)
+        self.assertEqual(CBDEffect.objects.count(), 3)
+        self.assertEqual(ProductImage.objects.count(), 2)
@@ -0,0 +1,202 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .cache import get_catalog_last_modified
+from .models import Brand, Product, Review
+from .test_catalog import delete_sample_catalog
+
+User = get_user_model()
+
+
+class RatingAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        delete_sample_catalog()
+
+    def setUp(self):
+        cache.clear()
+        self.brand = Brand.objects.create(name='Rating Brand')
+        self.product = Product.objects.create(
+            name='Rated Oil',
+            description='Rated description',
+            brand=self.brand,
+            category='TINCTURES',
+            price=Decimal('29.99'),
+            stock=10
+        )
+        self.users = [
+            User.objects.create_user(email=f'rater{i}@example.com', password='testpass123')
+            for i in range(3)
+        ]
+
+    def review(self, user, rating, product=None):
+        return Review.objects.create(
+            product=product or self.product,
+            user=user,
+            rating=rating,
+            title='Review',
+            content='Content'
+        )
+
+    def test_create_updates_aggregates(self):
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 4)
+        self.review(self.users[2], 4)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.review_count, 3)
+        self.assertEqual(self.product.rating_total, 13)
+        self.assertEqual(self.product.rating, Decimal('4.33'))
+
+    def test_update_applies_rating_delta(self):
+        self.review(self.users[0], 5)
+        review = self.review(self.users[1], 3)
+
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 1
+        review.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.review_count, 2)
+        self.assertEqual(self.product.rating, Decimal('3.00'))
+
+    def test_delete_removes_review(self):
+        first = self.review(self.users[0], 5)
+        second = self.review(self.users[1], 2)
+
+        first.delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.review_count, 1)
+        self.assertEqual(self.product.rating, Decimal('2.00'))
+
+        Review.objects.filter(pk=second.pk).delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.review_count, 0)
+        self.assertEqual(self.product.rating_total, 0)
+        self.assertEqual(self.product.rating, Decimal('0.00'))
+
+    def test_recompute_ratings_repairs_drift(self):
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 3)
+        Product.objects.filter(pk=self.product.pk).update(rating=0, rating_total=0, review_count=0)
+
+        call_command('recompute_ratings', stdout=open('/dev/null', 'w'))
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.review_count, 2)
+        self.assertEqual(self.product.rating, Decimal('4.00'))
+
+    def test_list_query_count_is_independent_of_reviews(self):
+        client = APIClient()
+        url = reverse('product-list')
+        self.review(self.users[0], 5)
+        get_catalog_last_modified()
+
+        with CaptureQueriesContext(connection) as baseline:
+            client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                product = Product.objects.create(
+                    name=f'Extra {i}', description='Extra', brand=self.brand,
+                    category='EDIBLES', price=Decimal('9.99')
+                )
+                for user in self.users:
+                    self.review(user, 4, product=product)
+
+        with self.assertNumQueries(len(baseline.captured_queries)):
+            response = client.get(url)
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(response.data['results'][0]['average_rating'], 4.0)
+        self.assertEqual(response.data['results'][0]['review_count'], 3)
+
+
+class RatingHistogramTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        delete_sample_catalog()
+
+    def setUp(self):
+        cache.clear()
+        self.brand = Brand.objects.create(name='Histogram Brand')
+        self.product = Product.objects.create(
+            name='Histogram Oil', description='Histogram', brand=self.brand,
+            category='TINCTURES', price=Decimal('29.99'), stock=10
+        )
+        self.users = [
+            User.objects.create_user(email=f'starrer{i}@example.com', password='testpass123')
+            for i in range(3)
+        ]
+
+    def review(self, user, rating, product=None):
+        return Review.objects.create(
+            product=product or self.product, user=user, rating=rating, title='Review', content='Content'
+        )
+
+    def distribution(self, product=None):
+        product = product or self.product
+        product.refresh_from_db()
+        return product.rating_distribution
+
+    def test_histogram_follows_review_writes(self):
+        first = self.review(self.users[0], 5)
+        self.review(self.users[1], 5)
+        self.review(self.users[2], 2)
+        self.assertEqual(self.distribution(), {1: 0, 2: 1, 3: 0, 4: 0, 5: 2})
+
+        first = Review.objects.get(pk=first.pk)
+        first.rating = 3
+        first.save()
+        self.assertEqual(self.distribution(), {1: 0, 2: 1, 3: 1, 4: 0, 5: 1})
+
+        other = Product.objects.create(
+            name='Other Oil', description='Other', brand=self.brand,
+            category='TINCTURES', price=Decimal('9.99')
+        )
+        first.product = other
+        first.save()
+        self.assertEqual(self.distribution(), {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+        self.assertEqual(self.distribution(other), {1: 0, 2: 0, 3: 1, 4: 0, 5: 0})
+
+        first.delete()
+        self.assertEqual(self.distribution(other), {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+
+    def test_recompute_rebuilds_histogram(self):
+        self.review(self.users[0], 4)
+        self.review(self.users[1], 1)
+        Product.objects.filter(pk=self.product.pk).update(rating_4_count=7, rating_1_count=0)
+
+        call_command('recompute_ratings', str(self.product.pk), stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(self.distribution(), {1: 1, 2: 0, 3: 0, 4: 1, 5: 0})
+
+    def test_detail_returns_distribution_without_aggregates(self):
+        self.review(self.users[0], 4)
+        self.review(self.users[1], 5)
+        url = reverse('product-detail', kwargs={'slug': self.product.slug})
+        get_catalog_last_modified()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(url)
+        self.assertEqual(response.data['rating_distribution'], {'1': 0, '2': 0, '3': 0, '4': 1, '5': 1})
+        self.assertFalse(any('GROUP BY' in query['sql'] for query in queries.captured_queries))
+
+    def test_min_rating_filter(self):
+        low = Product.objects.create(
+            name='Low Oil', description='Low', brand=self.brand,
+            category='TINCTURES', price=Decimal('9.99')
+        )
+        self.review(self.users[0], 5)
+        self.review(self.users[1], 4)
+        self.review(self.users[2], 2, product=low)
+
+        response = APIClient().get(reverse('product-list'), {'min_rating': 4})
+        self.assertEqual([product['slug'] for product in response.data['results']], [self.product.slug])
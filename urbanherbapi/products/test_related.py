@@ -0,0 +1,56 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.urls import reverse
+
+from .cache import get_catalog_last_modified
+from .models import Brand, CBDEffect, RelatedProduct
+from .recommendations import NUMPY_AVAILABLE, build_related_index
+from .test_catalog import CatalogTestCase
+
+
+@skipUnless(NUMPY_AVAILABLE, 'NumPy is not installed')
+class RelatedProductTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        other_brand = Brand.objects.create(name='Other Brand')
+        sleep = CBDEffect.objects.create(name='Sleep', description='Sleep')
+        focus = CBDEffect.objects.create(name='Focus', description='Focus')
+
+        self.oil = self.create_product('Night Oil', strain='INDICA')
+        self.oil.effects.add(sleep)
+        self.twin = self.create_product('Night Drops', strain='INDICA', price=Decimal('32.00'))
+        self.twin.effects.add(sleep)
+        self.cousin = self.create_product('Day Drops', strain='SATIVA', brand=other_brand)
+        self.cousin.effects.add(focus)
+        self.stranger = self.create_product(
+            'Focus Flower', category='FLOWERS', strain='SATIVA', price=Decimal('150.00'), brand=other_brand
+        )
+        self.stranger.effects.add(focus)
+
+    def related(self, product):
+        response = self.client.get(reverse('product-related', kwargs={'slug': product.slug}))
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_neighbours_ranked_by_similarity(self):
+        self.assertEqual(build_related_index(top_k=2), 8)
+        entries = RelatedProduct.objects.filter(product=self.oil)
+        self.assertEqual([entry.related_id for entry in entries], [self.twin.id, self.cousin.id])
+        self.assertGreater(entries[0].score, entries[1].score)
+        self.assertFalse(RelatedProduct.objects.filter(product=self.oil, related=self.oil).exists())
+
+    def test_related_reads_precomputed_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            build_related_index(top_k=3)
+        get_catalog_last_modified()
+        with self.assertNumQueries(1):
+            related = self.related(self.oil)
+        self.assertEqual(related, [self.twin.id, self.cousin.id, self.stranger.id])
+
+    def test_falls_back_to_category_without_index(self):
+        self.assertEqual(set(self.related(self.oil)), {self.twin.id, self.cousin.id})
+
+    def test_unknown_product(self):
+        response = self.client.get(reverse('product-related', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .cache import get_catalog_last_modified
+from .models import Brand, Product, Review
+from .serializers import DETAIL_REVIEW_COUNT
+from .test_catalog import delete_sample_catalog
+
+User = get_user_model()
+
+
+class ReviewLoadingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        delete_sample_catalog()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        brand = Brand.objects.create(name='Review Brand', description='Review brand')
+        self.product = Product.objects.create(
+            name='Reviewed Oil', description='Reviewed', brand=brand,
+            category='TINCTURES', price=Decimal('29.99'), stock=10
+        )
+        self.reviews = [
+            Review.objects.create(
+                product=self.product,
+                user=User.objects.create_user(email=f'reviewer{index}@example.com', password='testpass123'),
+                rating=index % 5 + 1, title=f'Review {index}', content='Content',
+            )
+            for index in range(12)
+        ]
+        self.newest_first = [review.id for review in sorted(
+            self.reviews, key=lambda review: (review.created_at, review.id), reverse=True
+        )]
+        get_catalog_last_modified()
+
+    def test_detail_embeds_latest_reviews_only(self):
+        url = reverse('product-detail', kwargs={'slug': self.product.slug})
+        with self.assertNumQueries(4):
+            # product + images + effects + latest reviews with their users
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [review['id'] for review in response.data['reviews']],
+            self.newest_first[:DETAIL_REVIEW_COUNT]
+        )
+        self.assertEqual(response.data['review_count'], 12)
+        self.assertIn('user_email', response.data['reviews'][0])
+
+    def test_reviews_endpoint_pages_by_cursor(self):
+        url = reverse('product-reviews', kwargs={'slug': self.product.slug})
+        seen = []
+        response = self.client.get(url, {'page_size': 5})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(review['id'] for review in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, self.newest_first)
+
+    def test_reviews_page_query_count(self):
+        url = reverse('product-reviews', kwargs={'slug': self.product.slug})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_reviews_for_unknown_product(self):
+        url = reverse('product-reviews', kwargs={'slug': 'missing'})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_invalid_cursor(self):
+        url = reverse('product-reviews', kwargs={'slug': self.product.slug})
+        self.assertEqual(self.client.get(url, {'cursor': 'nonsense'}).status_code, 404)
@@ -0,0 +1,79 @@
+from django.db import connection
+from django.urls import reverse
+
+from . import search
+from .models import Brand, CBDEffect
+from .test_catalog import CatalogTestCase
+
+
+class ProductSearchTests(CatalogTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        # The index is rolled back with the class transaction
+        search._backends.clear()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.relaxation = CBDEffect.objects.create(name='Relaxation', description='Calm')
+        self.oil = self.create_product('Calm Night Oil', description='A soothing tincture')
+        self.oil.effects.add(self.relaxation)
+        self.gummies = self.create_product(
+            'Sunrise Gummies', category='EDIBLES', description='Pairs well with calm mornings'
+        )
+        other_brand = Brand.objects.create(name='Greenleaf Botanicals')
+        self.balm = self.create_product('Muscle Balm', category='TOPICALS', brand=other_brand)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('product-list'), {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [card['id'] for card in response.data['results']]
+
+    def test_backend_is_full_text(self):
+        self.assertEqual(search.get_search_backend(), connection.vendor)
+
+    def test_matches_effects_brand_and_prefixes(self):
+        self.assertEqual(self.search('relax'), [self.oil.id])
+        self.assertEqual(self.search('greenle'), [self.balm.id])
+        self.assertEqual(self.search('edibles'), [self.gummies.id])
+        self.assertEqual(self.search('nothing-like-this'), [])
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search('calm'), [self.oil.id, self.gummies.id])
+
+    def test_document_follows_related_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.relaxation.name = 'Tranquility'
+            self.relaxation.save()
+        self.assertEqual(self.search('tranquil'), [self.oil.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.oil.effects.clear()
+        self.assertEqual(self.search('tranquil'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.balm.name = 'Recovery Stick'
+            self.balm.save()
+        self.assertEqual(self.search('recovery'), [self.balm.id])
+
+    def test_relevance_cursor_pagination(self):
+        for i in range(12):
+            self.create_product(f'Calm Extra {i}')
+        response = self.client.get(reverse('product-list'), {'search': 'calm'})
+        seen = [card['id'] for card in response.data['results']]
+        response = self.client.get(response.data['next'])
+        seen += [card['id'] for card in response.data['results']]
+        self.assertEqual(len(seen), 14)
+        self.assertEqual(len(set(seen)), 14)
+
+    def test_facets_respect_search(self):
+        response = self.client.get(reverse('product-facets'), {'search': 'calm'})
+        counts = {row['value']: row['count'] for row in response.data['category']}
+        self.assertEqual(counts, {'TINCTURES': 1, 'EDIBLES': 1})
+
+    def test_substring_fallback_without_index(self):
+        search._backends[connection.alias] = 'basic'
+        try:
+            self.assertEqual(self.search('sunrise'), [self.gummies.id])
+        finally:
+            search._backends.pop(connection.alias)
@@ -0,0 +1,184 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Cart, CartItem, InventoryMovement, Product, StockReservation
+from .stock import (
+    InsufficientStock, available_stock, compact_inventory, decrement_stock, increment_stock,
+    release_expired_reservations, release_reservation, reserve_stock, with_available_stock
+)
+from .serializers import ProductCreateUpdateSerializer
+from .test_catalog import CatalogTestCase
+
+
+class StockServiceTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('Stock Oil', stock=5)
+
+    def stock(self):
+        return available_stock(self.product.pk)
+
+    def test_decrement_is_conditional(self):
+        decrement_stock(self.product.id, 5)
+        self.assertEqual(self.stock(), 0)
+        with self.assertRaises(InsufficientStock):
+            decrement_stock(self.product.id, 1)
+        self.assertEqual(self.stock(), 0)
+
+    def test_database_rejects_negative_stock(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.filter(pk=self.product.pk).update(stock=-1)
+
+    def test_reservation_holds_and_releases_stock(self):
+        reservation = reserve_stock(self.product.id, 3)
+        self.assertEqual(self.stock(), 2)
+        with self.assertRaises(InsufficientStock):
+            reserve_stock(self.product.id, 3)
+
+        self.assertTrue(release_reservation(reservation))
+        self.assertFalse(release_reservation(reservation))
+        self.assertEqual(self.stock(), 5)
+
+    def test_sweep_releases_only_expired_holds(self):
+        expired = [reserve_stock(self.product.id, 1, ttl=60) for _ in range(3)]
+        reserve_stock(self.product.id, 1, ttl=3600)
+        self.assertEqual(self.stock(), 1)
+
+        released = release_expired_reservations(batch_size=2, now=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(released, len(expired))
+        self.assertEqual(self.stock(), 4)
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+
+class InventoryLedgerTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('Ledger Oil', stock=5)
+
+    def snapshot(self):
+        return Product.objects.values_list('stock', flat=True).get(pk=self.product.pk)
+
+    def test_movements_are_pending_until_compacted(self):
+        decrement_stock(self.product.id, 2)
+        decrement_stock(self.product.id, 1)
+        increment_stock(self.product.id, 10, note='PO 1042')
+        # Sales append rows; the product row is not written
+        self.assertEqual(self.snapshot(), 5)
+        self.assertEqual(available_stock(self.product.id), 12)
+        self.assertEqual(with_available_stock(Product.objects.filter(pk=self.product.pk)).get().available_stock, 12)
+
+        self.assertEqual(compact_inventory(), 3)
+        self.assertEqual(self.snapshot(), 12)
+        self.assertEqual(available_stock(self.product.id), 12)
+        self.assertFalse(InventoryMovement.objects.filter(compacted_at__isnull=True).exists())
+        self.assertEqual(compact_inventory(), 0)
+
+    def test_checks_see_pending_movements(self):
+        decrement_stock(self.product.id, 4)
+        with self.assertRaises(InsufficientStock):
+            decrement_stock(self.product.id, 2)
+        compact_inventory()
+        with self.assertRaises(InsufficientStock):
+            decrement_stock(self.product.id, 2)
+        decrement_stock(self.product.id, 1)
+        self.assertEqual(available_stock(self.product.id), 0)
+
+    def test_ledger_records_every_kind(self):
+        reservation = reserve_stock(self.product.id, 2)
+        release_reservation(reservation)
+        decrement_stock(self.product.id, 1)
+        self.assertEqual(
+            list(self.product.movements.values_list('kind', 'quantity')),
+            [(InventoryMovement.RESERVATION, -2), (InventoryMovement.RELEASE, 2), (InventoryMovement.SALE, -1)]
+        )
+
+    def test_movements_are_append_only(self):
+        movement = decrement_stock(self.product.id, 1)
+        movement.quantity = -3
+        with self.assertRaises(ValueError):
+            movement.save()
+
+    def test_compaction_batches_by_product(self):
+        other = self.create_product('Ledger Balm', stock=1)
+        decrement_stock(self.product.id, 1)
+        decrement_stock(other.id, 1)
+        increment_stock(other.id, 4)
+        # Per batch: savepoint, pending products, movements, one stock UPDATE,
+        # mark compacted, log the change, release; then the empty final pass
+        with self.assertNumQueries(7 * 2 + 3):
+            self.assertEqual(compact_inventory(batch_size=1), 3)
+        self.assertEqual(self.snapshot(), 4)
+        self.assertEqual(Product.objects.get(pk=other.pk).stock, 4)
+
+
+class StockEndpointTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.product = self.create_product('Checkout Oil', stock=2)
+        self.cart = Cart.objects.create(user=self.user)
+
+    def test_update_stock_refuses_to_oversell(self):
+        url = reverse('product-update-stock', kwargs={'slug': self.product.slug})
+        response = self.api.post(url, {'quantity': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock'], 0)
+        response = self.api.post(url, {'quantity': 1})
+        self.assertEqual(response.status_code, 400)
+
+    def test_product_update_leaves_stock_alone(self):
+        serializer = ProductCreateUpdateSerializer(self.product, data={'stock': 50, 'price': '12.00'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)
+        self.assertEqual(str(self.product.price), '12.00')
+
+    def test_live_stock_lookup(self):
+        url = reverse('product-stock')
+        detail = reverse('product-detail', kwargs={'slug': self.product.slug})
+        self.assertEqual(self.api.get(url, {'ids': self.product.pk}).data, {str(self.product.pk): 2})
+        etag = self.api.get(detail)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            decrement_stock(self.product.id, 1)
+
+        # A sale clears the product's cached stock but leaves the catalog version alone
+        self.assertEqual(self.api.get(url, {'ids': self.product.pk}).data, {str(self.product.pk): 1})
+        self.assertEqual(self.api.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            compact_inventory()
+        self.assertEqual(self.api.get(detail).data['stock'], 1)
+
+        self.assertEqual(self.api.get(url, {'ids': 'x'}).status_code, 400)
+        self.assertEqual(self.api.get(url).status_code, 400)
+
+    def test_reserve_is_all_or_nothing(self):
+        other = self.create_product('Checkout Gummies', stock=1)
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=other, quantity=2)
+
+        response = self.api.post(reverse('cart-reserve'))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['product_id'], other.id)
+        self.assertEqual(available_stock(self.product.pk), 2)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_reserve_and_release(self):
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=2)
+        response = self.api.post(reverse('cart-reserve'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(available_stock(self.product.pk), 0)
+
+        # Reserving again replaces the hold rather than stacking a second one
+        self.assertEqual(self.api.post(reverse('cart-reserve')).status_code, 200)
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+        response = self.api.post(reverse('cart-release'))
+        self.assertEqual(response.data, {'released': 1})
+        self.assertEqual(available_stock(self.product.pk), 2)
@@ -0,0 +1,63 @@
+import time
+from unittest import mock
+
+from django.urls import reverse
+
+from .models import CBDEffect
+from .suggest import Suggestion, SuggestionIndex, reset_suggestion_index
+from .test_catalog import CatalogTestCase
+
+
+class SuggestTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        reset_suggestion_index()
+        self.addCleanup(reset_suggestion_index)
+        self.dream = self.create_product('Blue Dream Oil', rating=4.5, review_count=10)
+        self.drops = self.create_product('Dream Drops', rating=3.0, review_count=2)
+        self.balm = self.create_product('Calm Balm', rating=5.0, review_count=1)
+        sleep = CBDEffect.objects.create(name='Deep Sleep', description='Sleep')
+        self.drops.effects.add(sleep)
+
+    def suggest(self, q, **params):
+        response = self.client.get(reverse('product-suggest'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(row['type'], row['label']) for row in response.data]
+
+    def test_matches_word_prefixes_ranked_by_rating(self):
+        self.assertEqual(
+            self.suggest('dre'),
+            [('product', 'Blue Dream Oil'), ('product', 'Dream Drops')]
+        )
+        self.assertEqual(self.suggest('dream d'), [('product', 'Dream Drops')])
+        self.assertEqual(self.suggest('CATALOG'), [('brand', 'Catalog Brand')])
+        self.assertEqual(self.suggest('de'), [('effect', 'Deep Sleep')])
+        self.assertEqual(self.suggest('d', limit=1), [('product', 'Blue Dream Oil')])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_served_without_queries_and_refreshed_on_catalog_change(self):
+        self.suggest('calm')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('calm'), [('product', 'Calm Balm')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_product('Calm Gummies', rating=4.0)
+        # Rebuild inline: a background thread would not see this test's transaction
+        with mock.patch.multiple('products.suggest', VERSION_CHECK_INTERVAL=0, REBUILD_IN_BACKGROUND=False):
+            self.assertEqual(
+                self.suggest('calm'),
+                [('product', 'Calm Balm'), ('product', 'Calm Gummies')]
+            )
+
+    def test_large_ranges_are_precomputed(self):
+        suggestions = [
+            Suggestion('product', number, f'Dream {number}', f'dream-{number}', (number % 50, number))
+            for number in range(2000)
+        ]
+        index = SuggestionIndex(suggestions)
+        self.assertIn('dream', index.top)
+        started = time.perf_counter()
+        results = index.search('dream', limit=3)
+        self.assertLess(time.perf_counter() - started, 0.01)
+        self.assertEqual([suggestion.id for suggestion in results], [1999, 1949, 1899])
+        self.assertEqual([suggestion.id for suggestion in index.search('dream 19', limit=2)], [1999, 1949])
@@ -0,0 +1,151 @@
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Brand, CatalogChange, Review
+from .stock import compact_inventory, decrement_stock
+from .sync import (
+    get_catalog_snapshot, get_sync_version, prune_catalog_changes, read_latest_snapshot,
+    rebuild_snapshot, reset_catalog_snapshot
+)
+from .test_catalog import CatalogTestCase
+
+
+class CatalogSyncTests(CatalogTestCase):
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.snapshot_dir, ignore_errors=True)
+        settings_override = override_settings(CATALOG_SNAPSHOT_DIR=self.snapshot_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_catalog_snapshot()
+        self.addCleanup(reset_catalog_snapshot)
+        # Tests run one transaction at a time; nothing is left in flight
+        window_patch = mock.patch('products.sync.CHANGE_COMMIT_WINDOW', 0)
+        window_patch.start()
+        self.addCleanup(window_patch.stop)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            super().setUp()
+            self.oil = self.create_product('Sync Oil', price=Decimal('24.99'))
+            self.balm = self.create_product('Sync Balm')
+
+    def changes(self, since):
+        response = self.client.get(reverse('catalog-changes'), {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_snapshot_is_served_compressed_or_plain(self):
+        response = self.client.get(reverse('catalog-snapshot'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        document = json.loads(gzip.decompress(response.content))
+        self.assertEqual(document['version'], get_sync_version())
+        self.assertEqual([product['name'] for product in document['products']], ['Sync Oil', 'Sync Balm'])
+        self.assertEqual(document['products'][0]['brand'], self.brand.pk)
+        self.assertEqual([brand['name'] for brand in document['brands']], ['Catalog Brand'])
+
+        plain = self.client.get(reverse('catalog-snapshot'), HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(response['ETag'], f"W/{plain['ETag']}")
+        self.assertEqual(json.loads(plain.content), document)
+
+        not_modified = self.client.get(reverse('catalog-snapshot'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_snapshot_is_reused_from_memory_and_disk(self):
+        snapshot = get_catalog_snapshot()
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalog_snapshot(), snapshot)
+
+        # A fresh process picks up the file instead of rebuilding
+        reset_catalog_snapshot()
+        with mock.patch('products.sync.build_snapshot') as build:
+            self.assertEqual(get_catalog_snapshot().body, snapshot.body)
+        build.assert_not_called()
+
+    def test_changes_since_a_version(self):
+        version = get_sync_version()
+        self.assertEqual(self.changes(version)['products'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.oil.price = Decimal('19.99')
+            self.oil.save()
+            self.oil.price = Decimal('17.99')
+            self.oil.save()
+            Review.objects.create(product=self.oil, user=self.user, rating=5, title='Great', content='Great')
+            balm_id = self.balm.pk
+            self.balm.delete()
+            Brand.objects.create(name='New Brand')
+
+        data = self.changes(version)
+        self.assertEqual(data['version'], get_sync_version())
+        self.assertFalse(data['has_more'])
+        # Several changes to one product come back once, as it is now
+        self.assertEqual(len(data['products']), 1)
+        self.assertEqual(str(data['products'][0]['price']), '17.99')
+        self.assertEqual(data['products'][0]['review_count'], 1)
+        self.assertEqual(data['deleted']['products'], [balm_id])
+        self.assertEqual([brand['name'] for brand in data['brands']], ['New Brand'])
+
+        self.assertEqual(self.changes(data['version'])['products'], [])
+
+    def test_stock_updates_are_logged(self):
+        version = get_sync_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            decrement_stock(self.oil.pk, 3)
+        # The change is logged when the sale reaches Product.stock
+        self.assertEqual(self.changes(version)['products'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            compact_inventory()
+        self.assertEqual(self.changes(version)['products'][0]['stock'], 7)
+
+    def test_recent_changes_wait_for_slower_transactions(self):
+        CatalogChange.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+        version = get_sync_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.oil.save()
+        with mock.patch('products.sync.CHANGE_COMMIT_WINDOW', 30):
+            self.assertEqual(get_sync_version(), version)
+            data = self.changes(version)
+            self.assertEqual((data['version'], data['products']), (version, []))
+        self.assertEqual(self.changes(version)['products'][0]['name'], 'Sync Oil')
+
+    def test_changes_are_paged(self):
+        version = get_sync_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            for product in (self.oil, self.balm):
+                product.save()
+
+        with mock.patch('products.sync.MAX_CHANGES_PER_SYNC', 1):
+            first = self.changes(version)
+            self.assertTrue(first['has_more'])
+            second = self.changes(first['version'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(
+            [first['products'][0]['name'], second['products'][0]['name']], ['Sync Oil', 'Sync Balm']
+        )
+
+    def test_invalid_and_expired_versions(self):
+        url = reverse('catalog-changes')
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'since': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'since': get_sync_version() + 1}).status_code, 410)
+
+        rebuild_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.oil.save()
+        logged = CatalogChange.objects.count()
+        self.assertEqual(prune_catalog_changes(timezone.now() + timedelta(seconds=1)), logged - 2)
+        # The row the snapshot was taken at is kept, so deltas from it still work
+        self.assertEqual(self.changes(read_latest_snapshot().version)['products'][0]['name'], 'Sync Oil')
+        self.assertEqual(self.client.get(url, {'since': 0}).status_code, 410)
+        self.assertEqual(CatalogChange.objects.count(), 2)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet, BrandViewSet, ProductImageViewSet, ReviewViewSet, CartViewSet, WishlistViewSet, CBDEffectViewSet
+from .views import ProductViewSet, BrandViewSet, ProductImageViewSet, ReviewViewSet, CartViewSet, WishlistViewSet, CBDEffectViewSet, CatalogSyncViewSet
 
 router = DefaultRouter()
 router.register('products', ProductViewSet, basename='product')
@@ -15,12 +15,23 @@ urlpatterns = [
     
     # Product-specific endpoints
     path('products/<slug:slug>/reviews/', ReviewViewSet.as_view({'get': 'list', 'post': 'create'}), name='product-reviews'),
+    path('products/<int:product_pk>/images/', ProductImageViewSet.as_view({'get': 'list', 'post': 'create'}), name='product-images'),
+    path(
+        'products/<int:product_pk>/images/<int:pk>/',
+        ProductImageViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}),
+        name='product-image-detail'
+    ),
+    
+    # Mobile catalog sync
+    path('catalog/snapshot/', CatalogSyncViewSet.as_view({'get': 'snapshot'}), name='catalog-snapshot'),
+    path('catalog/changes/', CatalogSyncViewSet.as_view({'get': 'changes'}), name='catalog-changes'),
     
     # Cart endpoints
     path('cart/add/', CartViewSet.as_view({'post': 'add'}), name='cart-add'),
     path('cart/remove/', CartViewSet.as_view({'post': 'remove'}), name='cart-remove'),
     path('cart/update-quantity/', CartViewSet.as_view({'post': 'update_quantity'}), name='cart-update-quantity'),
     path('cart/clear/', CartViewSet.as_view({'post': 'clear'}), name='cart-clear'),
+    path('cart/batch/', CartViewSet.as_view({'post': 'batch'}), name='cart-batch'),
     path('cart/current/', CartViewSet.as_view({'get': 'current'}), name='cart-current'),
     
     # Wishlist endpoints
@@ -2,19 +2,46 @@ from django.shortcuts import render
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import APIException, NotFound
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny, IsAuthenticatedOrReadOnly
-from django.db.models import Q, Avg, Count
+from django.db.models import Prefetch, Q
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import Http404
-
-from .models import Product, Brand, ProductImage, Review, Cart, CartItem, Wishlist, CBDEffect
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import quote_etag
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.request import Request
+import copy
+import gzip
+import logging
+
+from .models import Product, Brand, ProductImage, RelatedProduct, Review, Cart, CartItem, Wishlist, CBDEffect
 from .serializers import (
-    ProductSerializer, BrandSerializer, ProductImageSerializer,
+    ProductSerializer, ProductCardSerializer, BrandSerializer, ProductImageSerializer,
     ReviewSerializer, ReviewCreateSerializer, CartItemSerializer,
-    CartSerializer, WishlistSerializer, CBDEffectSerializer,
-    ProductCreateUpdateSerializer
+    CartSerializer, CartBatchSerializer, WishlistSerializer, CBDEffectSerializer,
+    ProductCreateUpdateSerializer, StockReservationSerializer, DETAIL_REVIEW_COUNT
+)
+from .cache import catalog_cache_key, catalog_cached, catalog_conditional, catalog_etag
+from .carts import (
+    CartItemNotFound, CartNotFound, apply_cart_operations, get_cart_store, get_product_cards, render_cart,
+    with_cart_totals
+)
+from .facets import compute_facets
+from .feeds import FEED_FORMATS, accepts_gzip, encode_lines, gzip_stream, render_feed
+from .filters import ProductFilter
+from .pagination import CatalogPagination, ReviewPagination, get_filter_signature
+from .search import ProductSearchFilter
+from .stock import (
+    MAX_STOCK_LOOKUP_IDS, InsufficientStock, available_stock, decrement_stock, get_available_stock,
+    release_cart_reservations, reserve_cart
 )
+from .suggest import DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, get_suggestion_index
+from .sync import SyncVersionGone, get_catalog_changes, get_catalog_snapshot
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
@@ -30,60 +57,41 @@ class BrandViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return [IsAdminUser()]
 
+    @catalog_conditional
+    @catalog_cached
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @catalog_conditional
+    @catalog_cached
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 class ProductViewSet(viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]  # Allow public access to products
     lookup_field = 'slug'
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['name', 'description', 'category']
-    filterset_fields = ['category', 'strain', 'featured']
+    pagination_class = CatalogPagination
+    filter_backends = [ProductSearchFilter, DjangoFilterBackend]
+    filterset_class = ProductFilter
     
     def get_queryset(self):
-        try:
-            print("Starting get_queryset")
-            queryset = Product.objects.all()
-            print(f"Initial product count: {queryset.count()}")
-            
-            # Add select_related and prefetch_related with error handling
-            try:
-                queryset = queryset.select_related('brand').prefetch_related(
-                    'images', 
-                    'effects', 
-                    'reviews'
-                )
-            except Exception as e:
-                print(f"Error in select_related/prefetch_related: {str(e)}")
-                # Continue without the related fields if there's an error
-            
-            # Add annotations with error handling
-            try:
-                queryset = queryset.annotate(
-                    average_rating=Avg('reviews__rating'),
-                    review_count=Count('reviews')
-                )
-            except Exception as e:
-                print(f"Error in annotations: {str(e)}")
-                # Continue without annotations if there's an error
-            
-            print(f"Final product count: {queryset.count()}")
-            return queryset
-            
-        except Exception as e:
-            print(f"Error in get_queryset: {str(e)}")
-            print(f"Error type: {type(e)}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
-            return Product.objects.none()
-
+        queryset = Product.objects.select_related('brand')
+        if self.action in ['list', 'related']:
+            # Cards only need the brand name and the denormalized primary image
+            return queryset.select_related('primary_image')
+        latest_reviews = Review.objects.select_related('user').order_by('-created_at', '-id')
+        return queryset.prefetch_related('images', 'effects', Prefetch(
+            'reviews', queryset=latest_reviews[:DETAIL_REVIEW_COUNT], to_attr='latest_reviews'
+        ))
+
+    @catalog_conditional
+    @catalog_cached
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
-            print(f"Products found: {queryset.count()}")
-            
-            # Apply any filters
-            queryset = self.filter_queryset(queryset)
-            print(f"Products after filtering: {queryset.count()}")
-            
+            queryset = self.filter_queryset(self.get_queryset())
+            logger.debug("Listing products with params %s", request.query_params)
+
             # Get page if paginated
             page = self.paginate_queryset(queryset)
             if page is not None:
@@ -94,13 +102,18 @@ class ProductViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(queryset, many=True)
             return Response(serializer.data)
             
+        except APIException:
+            # Invalid pagination cursor or filter values
+            raise
         except Exception as e:
-            print(f"Error in list view: {str(e)}")
+            logger.error("Error in list view: %s", e)
             return Response(
                 {'error': 'Failed to fetch products', 'detail': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @catalog_conditional
+    @catalog_cached
     def retrieve(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
@@ -113,41 +126,67 @@ class ProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            print(f"Error in retrieve: {str(e)}")
+            logger.error("Error in retrieve: %s", e)
             return Response(
                 {'error': 'Failed to fetch product', 'detail': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
     @action(detail=True, methods=['get'])
+    @catalog_conditional
+    @catalog_cached
     def reviews(self, request, slug=None):
         try:
-            product = self.get_object()
-            reviews = Review.objects.filter(product=product)
-            serializer = ReviewSerializer(reviews, many=True)
-            return Response(serializer.data)
+            reviews = Review.objects.filter(product__slug=slug).select_related('user')
+            paginator = ReviewPagination()
+            page = paginator.paginate_queryset(reviews, request, view=self)
+            if not page and not Product.objects.filter(slug=slug).exists():
+                raise Http404
+            serializer = ReviewSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+        except Http404:
+            return Response(
+                {'error': 'Product not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except APIException:
+            # Invalid cursor
+            raise
         except Exception as e:
-            print(f"Error in reviews action: {str(e)}")
+            logger.error("Error in reviews action: %s", e)
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
     @action(detail=True, methods=['get'])
+    @catalog_conditional
+    @catalog_cached
     def related(self, request, slug=None):
-        print(f"ProductViewSet: Getting related products for slug: {slug}")
+        logger.debug("ProductViewSet: Getting related products for slug: %s", slug)
         try:
-            product = self.get_object()
-            # Get products in the same category
-            related_products = Product.objects.filter(
-                category=product.category
-            ).exclude(
-                id=product.id
-            )[:4]
-            serializer = ProductSerializer(related_products, many=True)
+            # Neighbours are precomputed by build_related_products
+            entries = RelatedProduct.objects.filter(
+                product__slug=slug
+            ).select_related('related__brand', 'related__primary_image')
+            related_products = [entry.related for entry in entries]
+            if not related_products:
+                # Index not built yet or product added since: fall back to same category
+                product = self.get_object()
+                related_products = Product.objects.filter(
+                    category=product.category
+                ).exclude(
+                    id=product.id
+                ).select_related('brand', 'primary_image')[:4]
+            serializer = ProductCardSerializer(related_products, many=True)
             return Response(serializer.data)
+        except Http404:
+            return Response(
+                {'error': 'Product not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         except Exception as e:
-            print(f"ProductViewSet: Error getting related products: {str(e)}")
+            logger.error("ProductViewSet: Error getting related products: %s", e)
             return Response(
                 {'error': 'Failed to get related products'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -156,10 +195,12 @@ class ProductViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return ProductCreateUpdateSerializer
+        if self.action == 'list':
+            return ProductCardSerializer
         return ProductSerializer
 
     @action(detail=True, methods=['post'])
-    def update_stock(self, request, pk=None):
+    def update_stock(self, request, slug=None):
         product = self.get_object()
         quantity = request.data.get('quantity', 0)
 
@@ -173,18 +214,95 @@ class ProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if product.stock < quantity:
+        try:
+            decrement_stock(product.id, quantity)
+        except InsufficientStock:
             return Response(
                 {'error': 'Not enough stock available'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        product.stock -= quantity
-        product.save()
-
+        # Report what is left to sell, not the last compacted count
+        product.stock = available_stock(product.id)
         serializer = self.get_serializer(product)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    @catalog_conditional
+    def facets(self, request):
+        """Counts per category, strain, brand, effect and price bucket for the current filters."""
+        cache_key = catalog_cache_key('facets', get_filter_signature(request))
+        data = cache.get(cache_key)
+        if data is None:
+            data = compute_facets(
+                lambda exclude: self.filter_queryset_without(Product.objects.all(), exclude)
+            )
+            cache.set(cache_key, data, settings.CACHE_TTL)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    @catalog_conditional
+    def feed(self, request):
+        """Whole catalog as NDJSON (default) or CSV (?output=csv), streamed row by row."""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in FEED_FORMATS:
+            return Response(
+                {'error': f"output must be one of: {', '.join(FEED_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type, extension = FEED_FORMATS[output]
+        queryset = self.filter_queryset(Product.objects.all())
+        stream = encode_lines(render_feed(queryset, output))
+        compress = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        response = StreamingHttpResponse(
+            gzip_stream(stream) if compress else stream,
+            content_type=content_type
+        )
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+            # Not byte-identical to the plain feed, so weak, as GZipMiddleware does
+            response['ETag'] = f'W/{quote_etag(catalog_etag(request))}'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        response['Content-Disposition'] = f'attachment; filename="products.{extension}"'
+        return response
+
+    @action(detail=False, methods=['get'], authentication_classes=[], permission_classes=[AllowAny])
+    def suggest(self, request):
+        """Typeahead suggestions for ?q=, served from the in-process index without database queries."""
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_SUGGESTIONS)), MAX_SUGGESTIONS)
+        except ValueError:
+            limit = DEFAULT_SUGGESTIONS
+        index = get_suggestion_index()
+        suggestions = index.search(request.query_params.get('q', ''), max(limit, 1))
+        return Response([suggestion.as_dict() for suggestion in suggestions])
+
+    @action(detail=False, methods=['get'])
+    def stock(self, request):
+        """Live available stock for ?ids=1,2,3; catalog responses show the last compacted count."""
+        try:
+            ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            ids = None
+        if not ids or len(ids) > MAX_STOCK_LOOKUP_IDS:
+            return Response(
+                {'error': f'ids must be 1 to {MAX_STOCK_LOOKUP_IDS} comma-separated product ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({str(product_id): stock for product_id, stock in get_available_stock(ids).items()})
+
+    def filter_queryset_without(self, queryset, params):
+        """Run the filter backends as if the given query parameters had not been sent."""
+        query_params = self.request.query_params.copy()
+        for param in params:
+            query_params.pop(param, None)
+        django_request = copy.copy(self.request._request)
+        django_request.GET = query_params
+        narrowed = Request(django_request)
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(narrowed, queryset, self)
+        return queryset
+
     @action(detail=False, methods=['get'])
     def categories(self, request):
         return Response(Product.category.field.choices)
@@ -193,6 +311,48 @@ class ProductViewSet(viewsets.ModelViewSet):
     def effects(self, request):
         return Response([choice[0] for choice in Product._meta.get_field('effects').choices])
 
+class CatalogSyncViewSet(viewsets.ViewSet):
+    """Offline catalog for the mobile app: a full snapshot plus deltas since a snapshot's version."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        snapshot = get_catalog_snapshot()
+        etag = f'"catalog-{snapshot.version}"'
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        elif accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            response = HttpResponse(snapshot.body, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+            # Not byte-identical to the plain body, so weak
+            etag = f'W/{etag}'
+        else:
+            response = HttpResponse(gzip.decompress(snapshot.body), content_type='application/json')
+        response['ETag'] = etag
+        response['X-Catalog-Version'] = snapshot.version
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        try:
+            since = int(request.query_params['since'])
+            if since < 0:
+                raise ValueError()
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'since must be a catalog version'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            return Response(get_catalog_changes(since))
+        except SyncVersionGone:
+            return Response(
+                {'error': 'Version is no longer available, download the catalog snapshot again'},
+                status=status.HTTP_410_GONE
+            )
+
 class ProductImageViewSet(viewsets.ModelViewSet):
     queryset = ProductImage.objects.all()
     serializer_class = ProductImageSerializer
@@ -202,36 +362,31 @@ class ProductImageViewSet(viewsets.ModelViewSet):
         return ProductImage.objects.filter(product_id=self.kwargs['product_pk'])
 
     def perform_create(self, serializer):
-        product = Product.objects.get(pk=self.kwargs['product_pk'])
+        # New images are queued (PENDING) for the process_images worker
+        product = get_object_or_404(Product, pk=self.kwargs['product_pk'])
         serializer.save(product=product)
 
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ReviewPagination
 
     def get_queryset(self):
-        print("ReviewViewSet: Getting reviews")
+        logger.debug("ReviewViewSet: Getting reviews")
         slug = self.kwargs.get('slug')
         if not slug:
             return Review.objects.none()
-        
-        try:
-            product = Product.objects.get(slug=slug)
-            print(f"ReviewViewSet: Found product {product.name}, returning reviews")
-            return Review.objects.filter(product=product).select_related('user')
-        except Product.DoesNotExist:
-            print(f"ReviewViewSet: Product with slug {slug} not found")
-            return Review.objects.none()
+        return Review.objects.filter(product__slug=slug).select_related('user')
 
     def perform_create(self, serializer):
-        print("ReviewViewSet: Creating review")
+        logger.debug("ReviewViewSet: Creating review")
         slug = self.kwargs.get('slug')
         try:
             product = Product.objects.get(slug=slug)
-            print(f"ReviewViewSet: Found product {product.name}, creating review")
+            logger.debug("ReviewViewSet: Found product %s, creating review", product.name)
             serializer.save(user=self.request.user, product=product)
         except Product.DoesNotExist:
-            print(f"ReviewViewSet: Product with slug {slug} not found")
+            logger.warning("ReviewViewSet: Product with slug %s not found", slug)
             raise NotFound('Product not found')
 
     def get_serializer_class(self):
@@ -245,27 +400,31 @@ class CartViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Get cart for current user"""
-        print(f"CartViewSet: Getting cart for user {self.request.user.email}")
-        return Cart.objects.filter(user=self.request.user).prefetch_related('items__product')
+        logger.debug("CartViewSet: Getting cart for user %s", self.request.user.email)
+        return with_cart_totals(Cart.objects.filter(user=self.request.user))
 
     def perform_create(self, serializer):
         """Create cart for current user"""
-        print(f"CartViewSet: Creating cart for user {self.request.user.email}")
+        logger.debug("CartViewSet: Creating cart for user %s", self.request.user.email)
         serializer.save(user=self.request.user)
 
     @action(detail=False, methods=['get'])
     def current(self, request):
         """Get current user's cart"""
-        print(f"CartViewSet: Getting current cart for user {request.user.email}")
+        logger.debug("CartViewSet: Getting current cart for user %s", request.user.email)
         try:
+            store = get_cart_store()
+            if store is not None:
+                return Response(render_cart(store.read(request.user)))
+
             cart = self.get_queryset().first()
             if not cart:
-                print(f"CartViewSet: No cart found, creating new one for user {request.user.email}")
+                logger.debug("CartViewSet: No cart found, creating new one for user %s", request.user.email)
                 cart = Cart.objects.create(user=request.user)
             serializer = self.get_serializer(cart)
             return Response(serializer.data)
         except Exception as e:
-            print(f"CartViewSet: Error getting current cart: {str(e)}")
+            logger.error("CartViewSet: Error getting current cart: %s", e)
             return Response(
                 {'error': 'Failed to get cart'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -274,7 +433,7 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def add(self, request):
         """Add item to cart"""
-        print(f"CartViewSet: Adding item to cart for user {request.user.email}")
+        logger.debug("CartViewSet: Adding item to cart for user %s", request.user.email)
         try:
             product_id = request.data.get('product_id')
             quantity = int(request.data.get('quantity', 1))
@@ -284,17 +443,33 @@ class CartViewSet(viewsets.ModelViewSet):
                     {'error': 'Product ID is required'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+
+            store = get_cart_store()
+            if store is not None:
+                # Add first and check the product with the cards the response needs anyway,
+                # so a tap costs one script call and one cache read
+                product_id = int(product_id)
+                state = store.add(request.user, product_id, quantity)
+                cards = get_product_cards(list(state.quantities))
+                if product_id not in cards:
+                    store.remove(request.user, product_id)
+                    logger.warning("CartViewSet: Product %s not found", product_id)
+                    return Response(
+                        {'error': 'Product not found'},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+                return Response(render_cart(state, cards))
             
             # Get or create cart
             cart, created = Cart.objects.get_or_create(user=request.user)
             if created:
-                print(f"CartViewSet: Created new cart for user {request.user.email}")
+                logger.debug("CartViewSet: Created new cart for user %s", request.user.email)
             
             # Get product
             try:
                 product = Product.objects.get(id=product_id)
             except Product.DoesNotExist:
-                print(f"CartViewSet: Product {product_id} not found")
+                logger.warning("CartViewSet: Product %s not found", product_id)
                 return Response(
                     {'error': 'Product not found'},
                     status=status.HTTP_404_NOT_FOUND
@@ -308,23 +483,24 @@ class CartViewSet(viewsets.ModelViewSet):
             )
             
             if not created:
-                print(f"CartViewSet: Updating existing cart item quantity")
+                logger.debug("CartViewSet: Updating existing cart item quantity")
                 cart_item.quantity += quantity
                 cart_item.save()
             else:
-                print(f"CartViewSet: Created new cart item")
+                logger.debug("CartViewSet: Created new cart item")
             
-            serializer = self.get_serializer(cart)
+            # Reload with totals and line subtotals computed by the database
+            serializer = self.get_serializer(self.get_queryset().get(pk=cart.pk))
             return Response(serializer.data)
             
         except ValueError:
-            print(f"CartViewSet: Invalid quantity provided")
+            logger.warning("CartViewSet: Invalid quantity provided")
             return Response(
                 {'error': 'Invalid quantity'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            print(f"CartViewSet: Error adding item to cart: {str(e)}")
+            logger.error("CartViewSet: Error adding item to cart: %s", e)
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -333,7 +509,7 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def remove(self, request):
         """Remove item from cart"""
-        print(f"CartViewSet: Removing item from cart for user {request.user.email}")
+        logger.debug("CartViewSet: Removing item from cart for user %s", request.user.email)
         try:
             product_id = request.data.get('product_id')
             if not product_id:
@@ -342,21 +518,26 @@ class CartViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+            store = get_cart_store()
+            if store is not None:
+                return Response(render_cart(store.remove(request.user, int(product_id))))
+
             cart = Cart.objects.get(user=request.user)
             CartItem.objects.filter(cart=cart, product_id=product_id).delete()
-            print(f"CartViewSet: Successfully removed item {product_id} from cart")
+            logger.debug("CartViewSet: Successfully removed item %s from cart", product_id)
             
-            serializer = self.get_serializer(cart)
+            # Reload with totals and line subtotals computed by the database
+            serializer = self.get_serializer(self.get_queryset().get(pk=cart.pk))
             return Response(serializer.data)
             
-        except Cart.DoesNotExist:
-            print(f"CartViewSet: Cart not found for user {request.user.email}")
+        except (Cart.DoesNotExist, CartNotFound):
+            logger.warning("CartViewSet: Cart not found for user %s", request.user.email)
             return Response(
                 {'error': 'Cart not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            print(f"CartViewSet: Error removing item from cart: {str(e)}")
+            logger.error("CartViewSet: Error removing item from cart: %s", e)
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -365,7 +546,7 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def update_quantity(self, request):
         """Update item quantity"""
-        print(f"CartViewSet: Updating quantity for user {request.user.email}")
+        logger.debug("CartViewSet: Updating quantity for user %s", request.user.email)
         try:
             product_id = request.data.get('product_id')
             quantity = int(request.data.get('quantity', 1))
@@ -376,29 +557,34 @@ class CartViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+            store = get_cart_store()
+            if store is not None:
+                return Response(render_cart(store.set_quantity(request.user, int(product_id), quantity)))
+
             cart = Cart.objects.get(user=request.user)
             cart_item = CartItem.objects.get(cart=cart, product_id=product_id)
             cart_item.quantity = quantity
             cart_item.save()
-            print(f"CartViewSet: Successfully updated quantity for item {product_id}")
+            logger.debug("CartViewSet: Successfully updated quantity for item %s", product_id)
             
-            serializer = self.get_serializer(cart)
+            # Reload with totals and line subtotals computed by the database
+            serializer = self.get_serializer(self.get_queryset().get(pk=cart.pk))
             return Response(serializer.data)
             
-        except (Cart.DoesNotExist, CartItem.DoesNotExist):
-            print(f"CartViewSet: Item not found in cart")
+        except (Cart.DoesNotExist, CartItem.DoesNotExist, CartNotFound, CartItemNotFound):
+            logger.warning("CartViewSet: Item not found in cart")
             return Response(
                 {'error': 'Item not found in cart'},
                 status=status.HTTP_404_NOT_FOUND
             )
         except ValueError:
-            print(f"CartViewSet: Invalid quantity provided")
+            logger.warning("CartViewSet: Invalid quantity provided")
             return Response(
                 {'error': 'Invalid quantity'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            print(f"CartViewSet: Error updating quantity: {str(e)}")
+            logger.error("CartViewSet: Error updating quantity: %s", e)
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -407,23 +593,119 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def clear(self, request):
         """Clear cart"""
-        print(f"CartViewSet: Clearing cart for user {request.user.email}")
+        logger.debug("CartViewSet: Clearing cart for user %s", request.user.email)
         try:
+            store = get_cart_store()
+            if store is not None:
+                return Response(render_cart(store.clear(request.user)))
+
             cart = Cart.objects.get(user=request.user)
             cart.items.all().delete()
-            print(f"CartViewSet: Successfully cleared cart")
+            logger.debug("CartViewSet: Successfully cleared cart")
             
-            serializer = self.get_serializer(cart)
+            # Reload with totals and line subtotals computed by the database
+            serializer = self.get_serializer(self.get_queryset().get(pk=cart.pk))
             return Response(serializer.data)
             
+        except (Cart.DoesNotExist, CartNotFound):
+            logger.warning("CartViewSet: Cart not found for user %s", request.user.email)
+            return Response(
+                {'error': 'Cart not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error("CartViewSet: Error clearing cart: %s", e)
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Apply a list of add/remove/set operations at once and return the final cart"""
+        logger.debug("CartViewSet: Applying cart batch for user %s", request.user.email)
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+        product_ids = {operation['product_id'] for operation in operations if operation['op'] != 'remove'}
+        try:
+            store = get_cart_store()
+            if store is not None:
+                cards = get_product_cards(list(product_ids))
+                found = set(cards)
+            else:
+                found = set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+            missing = product_ids - found
+            if missing:
+                logger.warning("CartViewSet: Products %s not found", sorted(missing))
+                return Response(
+                    {'error': 'Product not found', 'product_ids': sorted(missing)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            if store is not None:
+                return Response(render_cart(store.apply(request.user, operations), cards))
+            cart = apply_cart_operations(request.user, operations)
+            serializer = self.get_serializer(self.get_queryset().get(pk=cart.pk))
+            return Response(serializer.data)
+
+        except Exception as e:
+            logger.error("CartViewSet: Error applying cart batch: %s", e)
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['post'])
+    def reserve(self, request):
+        """Hold stock for every cart item during checkout"""
+        logger.debug("CartViewSet: Reserving stock for user %s", request.user.email)
+        try:
+            store = get_cart_store()
+            if store is not None:
+                # Reservations are made from CartItem rows, so write pending taps first
+                store.flush(request.user.pk)
+            cart = Cart.objects.get(user=request.user)
+            reservations = reserve_cart(cart)
+            serializer = StockReservationSerializer(reservations, many=True)
+            return Response(serializer.data)
+
         except Cart.DoesNotExist:
-            print(f"CartViewSet: Cart not found for user {request.user.email}")
+            logger.warning("CartViewSet: Cart not found for user %s", request.user.email)
             return Response(
                 {'error': 'Cart not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except InsufficientStock as e:
+            logger.info("CartViewSet: Could not reserve stock: %s", e)
+            return Response(
+                {'error': 'Not enough stock available', 'product_id': e.product_id},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
-            print(f"CartViewSet: Error clearing cart: {str(e)}")
+            logger.error("CartViewSet: Error reserving stock: %s", e)
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['post'])
+    def release(self, request):
+        """Give back the stock held for this cart"""
+        logger.debug("CartViewSet: Releasing stock for user %s", request.user.email)
+        try:
+            cart = Cart.objects.get(user=request.user)
+            released = release_cart_reservations(cart)
+            return Response({'released': released})
+
+        except Cart.DoesNotExist:
+            logger.warning("CartViewSet: Cart not found for user %s", request.user.email)
+            return Response(
+                {'error': 'Cart not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error("CartViewSet: Error releasing stock: %s", e)
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -434,7 +716,10 @@ class WishlistViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user)
+        return Wishlist.objects.filter(user=self.request.user).prefetch_related(
+            'products__brand',
+            'products__primary_image'
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -524,8 +809,14 @@ class WishlistViewSet(viewsets.ModelViewSet):
         except Product.DoesNotExist:
             return Response({'error': 'Product not found in wishlist'}, status=status.HTTP_404_NOT_FOUND)
 
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        CartItem.objects.get_or_create(cart=cart, product=product)
+        store = get_cart_store()
+        if store is not None:
+            # Like the database path, a product already in the cart keeps its quantity
+            if product.id not in store.read(request.user).quantities:
+                store.add(request.user, product.id, 1)
+        else:
+            cart, created = Cart.objects.get_or_create(user=request.user)
+            CartItem.objects.get_or_create(cart=cart, product=product)
         wishlist.products.remove(product)
 
         serializer = self.get_serializer(wishlist)
@@ -535,3 +826,11 @@ class CBDEffectViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = CBDEffect.objects.all()
     serializer_class = CBDEffectSerializer
     permission_classes = [AllowAny]
+
+    @catalog_cached
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @catalog_cached
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
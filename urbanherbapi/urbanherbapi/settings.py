@@ -206,9 +206,29 @@ CACHES = {
     }
 }
 
+# Carts live in the database by default. 'redis' keeps active carts as Redis
+# hashes and writes them back through the flush_carts worker and at checkout.
+CART_STORE = os.getenv('CART_STORE', 'database')
+# Its own database, never the cache's: carts must survive cache eviction and flushes
+CART_REDIS_URL = os.getenv('CART_REDIS_URL', 'redis://127.0.0.1:6379/2')
+# Idle carts drop out of Redis after 30 days; the database copy remains
+CART_REDIS_TTL = 60 * 60 * 24 * 30
+
 # Cache time to live is 15 minutes
 CACHE_TTL = 60 * 15
 
+# Product list totals are reused for a short while per filter combination
+CATALOG_COUNT_CACHE_TTL = 30
+
+# Checkout stock holds expire after 15 minutes unless the order is placed
+STOCK_RESERVATION_TTL = 60 * 15
+
+# Available stock per product is reused for a few seconds (movements clear it on commit)
+STOCK_CACHE_TTL = 5
+
+# Precompiled catalog snapshots served to the mobile app
+CATALOG_SNAPSHOT_DIR = BASE_DIR / 'catalog_snapshots'
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -281,6 +301,11 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        'products': {
+            'handlers': ['console', 'file'],
+            'level': os.getenv('PRODUCTS_LOG_LEVEL', 'INFO'),
+            'propagate': True,
+        },
     },
 }
 
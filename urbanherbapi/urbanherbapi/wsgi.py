@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'urbanherbapi.settings')
 
 application = get_wsgi_application()
+
+# Load the product typeahead index before the first request needs it
+from products.suggest import warm_suggestion_index  # noqa: E402
+
+warm_suggestion_index()